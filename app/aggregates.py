@@ -0,0 +1,305 @@
+import logging
+import os
+import secrets
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlmodel import Session, delete, select
+
+from app import cache, events, metrics
+from app.models import ChangeLog, Response
+
+logger = logging.getLogger(__name__)
+
+# Agregados en memoria que se mantienen de forma incremental. Se siembran una
+# vez al arrancar (seed) y después se ponen al día leyendo change_log (sync):
+# cada escritura, de este worker o de otro, deja ahí una fila con su `seq`.
+# Así todos los workers de `uvicorn --workers N` convergen al mismo estado y
+# comparten versión y época, y los cursores/ETag valen en cualquiera de ellos.
+CHANGE_LOG_KEEP = int(os.getenv("CHANGE_LOG_KEEP", "20000"))
+SYNC_INTERVAL_SECONDS = float(os.getenv("SYNC_INTERVAL_SECONDS", "1"))
+SYNC_BATCH = 500
+# En PostgreSQL los seq se asignan al insertar y se confirman en otro orden:
+# uno menor puede aparecer después de haber aplicado otros mayores. Los huecos
+# recientes (hasta SYNC_GAP_WINDOW por debajo del último) se vigilan durante
+# SYNC_GAP_TIMEOUT_SECONDS; si alguno aparece se resiembra. Pasado ese tiempo
+# se da por transacción deshecha. En SQLite las escrituras van en serie y no
+# hay huecos.
+SYNC_GAP_WINDOW = 1000
+SYNC_GAP_TIMEOUT_SECONDS = float(os.getenv("SYNC_GAP_TIMEOUT_SECONDS", "30"))
+# identifica a este proceso en change_log (sus eventos SSE ya se publicaron)
+ORIGIN = secrets.token_hex(4)
+
+_stores: List["IncrementalAggregate"] = []
+# contador global de escrituras: sirve para invalidar cachés derivadas
+_write_version = 0
+_sync_lock = threading.RLock()
+_synced_seq = 0
+_files_generation = 0
+_syncs = 0
+# False en procesos que no sirven la API (scripts/archive.py): no hay nada que poner al día
+_seeded = False
+# seq sin confirmar por debajo de _synced_seq -> momento en que se vio el hueco
+_gaps: Dict[int, float] = {}
+
+
+class IncrementalAggregate:
+    """Base para agregados incrementales indexados por id de respuesta.
+
+    Cada subclase traduce una fila a un registro (build) y sabe sumarlo o
+    restarlo de sus acumulados (_add/_remove). Guardar el registro aplicado
+    permite deshacer su aportación cuando la respuesta cambia de estado.
+
+    `version` es el `seq` de change_log del último cambio aplicado y `epoch`
+    el `seq` del último reset, de modo que `cursor` identifica el estado
+    servido en cualquier worker. `floor` es la versión de la última siembra:
+    antes de ella no se conocen los CP vaciados, así que esos cursores no sirven.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._records: Dict[int, object] = {}
+        self.epoch = "0"
+        self.version = 0
+        self.floor = 0
+
+    @property
+    def cursor(self) -> str:
+        return f"{self.epoch}.{self.version}"
+
+    def parse_cursor(self, cursor: Optional[str]) -> Optional[int]:
+        """Devuelve la versión de un cursor de esta época o None si no sirve."""
+        if not cursor:
+            return None
+        epoch, _, version = cursor.partition(".")
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        version = int(version)
+        return version if self.floor <= version <= self.version else None
+
+    def build(self, row: Response):
+        raise NotImplementedError
+
+    def _add(self, record):
+        raise NotImplementedError
+
+    def _remove(self, record):
+        raise NotImplementedError
+
+    def _reset(self):
+        raise NotImplementedError
+
+    def apply(self, row: Response, version: Optional[int] = None):
+        with self._lock:
+            # build() antes de tocar nada: si falla, el store queda como estaba
+            record = self.build(row)
+            self.version = self.version + 1 if version is None else version
+            previous = self._records.pop(row.id, None)
+            if previous is not None:
+                self._remove(previous)
+            if record is not None:
+                self._records[row.id] = record
+                self._add(record)
+
+    def apply_or_drop(self, row: Response, version: int):
+        """apply() sin propagar errores de build(): la fila se anota en el log y
+        deja de contar en este agregado, pero la versión avanza igual para que
+        una fila que no se puede procesar no atasque la sincronización."""
+        try:
+            self.apply(row, version=version)
+        except Exception:
+            logger.exception("%s: no se pudo aplicar la respuesta %s", type(self).__name__, row.id)
+            with self._lock:
+                self.discard(row.id)
+                self.version = version
+
+    def discard(self, response_id: int, version: Optional[int] = None):
+        with self._lock:
+            previous = self._records.pop(response_id, None)
+            if previous is not None:
+                self.version = self.version + 1 if version is None else version
+                self._remove(previous)
+
+    def clear(self, epoch: str = "0", version: int = 0):
+        with self._lock:
+            self._records.clear()
+            self._reset()
+            self.epoch = epoch
+            self.version = version
+            self.floor = version
+
+
+def register(store: IncrementalAggregate) -> IncrementalAggregate:
+    _stores.append(store)
+    return store
+
+
+def log_change(
+    session: Session,
+    kind: str,
+    row: Optional[Response] = None,
+    previous: Optional[str] = None,
+    status: Optional[str] = None,
+):
+    """Añade a la transacción de `session` la fila de change_log de una escritura."""
+    session.add(ChangeLog(
+        kind=kind,
+        response_id=row.id if row is not None else None,
+        status=status or (row.status if row is not None else None),
+        previous=previous,
+        codigo_postal=row.codigo_postal if row is not None else None,
+        origin=ORIGIN,
+    ))
+
+
+def _log_state(session: Session):
+    """(último seq, seq del último reset) de change_log."""
+    last = session.exec(select(func.max(ChangeLog.seq))).one() or 0
+    reset = session.exec(
+        select(func.max(ChangeLog.seq)).where(ChangeLog.kind == "responses.reset")
+    ).one() or 0
+    return last, reset
+
+
+def seed(engine, batch_size: int = 500):
+    """Recorre la tabla una sola vez y alimenta todos los agregados."""
+    global _write_version, _synced_seq, _files_generation, _seeded
+    with _sync_lock:
+        _write_version += 1
+        _files_generation = cache.check_files()
+        with Session(engine) as s:
+            last, reset = _log_state(s)
+            _track_gaps(s, _synced_seq, last)
+            for store in _stores:
+                store.clear(epoch=str(reset), version=last)
+            rows = s.exec(select(Response).order_by(Response.id).execution_options(yield_per=batch_size))
+            for row in rows:
+                for store in _stores:
+                    store.apply_or_drop(row, version=last)
+        _synced_seq = last
+        _seeded = True
+
+
+def _track_gaps(session: Session, low: int, high: int, seen=None):
+    """Anota los seq de (low, high] que aún no están en change_log."""
+    low = max(low, high - SYNC_GAP_WINDOW)
+    if high <= low:
+        return
+    if seen is None:
+        seen = session.exec(select(ChangeLog.seq).where(ChangeLog.seq > low, ChangeLog.seq <= high)).all()
+    now = time.monotonic()
+    for seq in set(range(low + 1, high + 1)) - set(seen):
+        _gaps.setdefault(seq, now)
+
+
+def _late_entries(session: Session) -> List[ChangeLog]:
+    """Entradas de huecos vigilados que ya se confirmaron (y caduca los viejos)."""
+    now = time.monotonic()
+    for seq, since in list(_gaps.items()):
+        if now - since > SYNC_GAP_TIMEOUT_SECONDS:
+            del _gaps[seq]
+    if not _gaps:
+        return []
+    late = session.exec(select(ChangeLog).where(ChangeLog.seq.in_(list(_gaps)))).all()
+    for entry in late:
+        _gaps.pop(entry.seq, None)
+    return late
+
+
+def _publish(entry: ChangeLog):
+    if entry.origin == ORIGIN or entry.kind == "response.archived":
+        return  # el archivado se anuncia una vez por lote (responses.archived)
+    if entry.kind in ("responses.reset", "responses.archived"):
+        events.publish(entry.kind)
+        return
+    data = {"id": entry.response_id, "status": entry.status, "codigo_postal": entry.codigo_postal}
+    if entry.kind == "response.moderated":
+        data["previous"] = entry.previous
+    events.publish(entry.kind, data)
+
+
+def sync(engine, known: Optional[Dict[int, Response]] = None) -> int:
+    """Aplica las entradas de change_log posteriores a la última vista.
+
+    `known` permite pasar las filas que el propio worker acaba de escribir
+    para no releerlas. Si hay que resembrar (otro worker lo pidió, cambió
+    questions.json, la entrada pendiente ya se purgó o se confirmó tarde una
+    con un seq ya superado) se llama a seed().
+    Devuelve el último seq aplicado.
+    """
+    global _write_version, _synced_seq, _syncs
+    with _sync_lock:
+        if cache.check_files() != _files_generation:
+            seed(engine)
+            return _synced_seq
+        with Session(engine) as s:
+            late = _late_entries(s)
+            if late:
+                # aplicarlas ahora bajaría la versión: se reconstruye a la última
+                seed(engine)
+                for entry in late:
+                    _publish(entry)
+                return _synced_seq
+            # span "query": la lectura de BD de la que salen /api/visual/points y
+            # demás agregados (esas rutas ya no consultan la base al servirse)
+            with metrics.span("query"):
+                entries = s.exec(
+                    select(ChangeLog).where(ChangeLog.seq > _synced_seq).order_by(ChangeLog.seq)
+                ).all()
+            if not entries:
+                return _synced_seq
+            # las entradas de reset no se purgan: no cuentan para detectar el retraso
+            first = s.exec(select(func.min(ChangeLog.seq)).where(ChangeLog.kind != "responses.reset")).one() or 0
+            if first > _synced_seq + 1 and _synced_seq > 0:
+                seed(engine)  # el worker se quedó atrás más de CHANGE_LOG_KEEP entradas
+                return _synced_seq
+            if any(entry.kind == "aggregates.reseed" for entry in entries):
+                seed(engine)
+                for entry in entries:
+                    _publish(entry)
+                return _synced_seq
+            _track_gaps(s, _synced_seq, entries[-1].seq, seen=[entry.seq for entry in entries])
+            wanted = {e.response_id for e in entries if e.response_id is not None}
+            rows = {rid: row for rid, row in (known or {}).items() if rid in wanted}
+            missing = sorted(wanted - set(rows))
+            with metrics.span("query"):
+                for offset in range(0, len(missing), SYNC_BATCH):
+                    chunk = missing[offset:offset + SYNC_BATCH]
+                    rows.update({r.id: r for r in s.exec(select(Response).where(Response.id.in_(chunk))).all()})
+            for entry in entries:
+                _write_version += 1
+                if entry.kind == "responses.reset":
+                    for store in _stores:
+                        store.clear(epoch=str(entry.seq), version=entry.seq)
+                elif entry.response_id is not None:
+                    row = rows.get(entry.response_id)
+                    for store in _stores:
+                        if row is None:
+                            store.discard(entry.response_id, version=entry.seq)
+                        else:
+                            store.apply_or_drop(row, version=entry.seq)
+                _synced_seq = entry.seq
+                _publish(entry)
+            _syncs += 1
+            if _syncs % 100 == 0:
+                # las de reset se conservan: de la última sale la época de los cursores
+                s.exec(delete(ChangeLog).where(
+                    ChangeLog.seq <= _synced_seq - CHANGE_LOG_KEEP,
+                    ChangeLog.kind != "responses.reset",
+                ))
+                s.commit()
+        return _synced_seq
+
+
+def write_version() -> int:
+    return _write_version
+
+
+def synced_seq() -> int:
+    return _synced_seq
+
+
+def seeded() -> bool:
+    return _seeded
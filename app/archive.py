@@ -0,0 +1,317 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func
+from sqlalchemy.engine import make_url
+from sqlmodel import Session, select
+
+from app import aggregates, events, questionnaire
+from app.db import build_engine
+from app.models import Response, ResponseArchive
+
+logger = logging.getLogger(__name__)
+
+# Retención de `response`: las filas que ya no se moderan ni se visualizan
+# pasan por lotes a `response_archive`, y después se compacta la base. Todo
+# es opcional: sin variables no se archiva nada salvo a petición (admin, script).
+#   ARCHIVE_DATABASE_URL   -> vacío: tabla response_archive de la misma base;
+#                             con "{survey_id}" (solo SQLite) un fichero por encuesta,
+#                             p. ej. sqlite:///./archivo/encuesta_{survey_id}.db
+#   ARCHIVE_REJECTED_DAYS  -> rechazadas sin cambios desde hace N días (0 = nunca)
+#   ARCHIVE_AFTER_DAYS     -> aprobadas y rechazadas creadas hace más de N días (0 = nunca)
+#   ARCHIVE_OTHER_SURVEYS  -> 1: todo lo de encuestas distintas a la de questions.json
+#   ARCHIVE_INTERVAL_SECONDS -> cada cuánto se ejecuta la política en segundo plano (0 = nunca)
+#   VACUUM_MODE            -> "incremental" (por defecto), "auto" (VACUUM completo si
+#                             hay más de VACUUM_FREE_RATIO de páginas libres) u "off"
+ARCHIVE_DATABASE_URL = os.getenv("ARCHIVE_DATABASE_URL", "")
+ARCHIVE_REJECTED_DAYS = float(os.getenv("ARCHIVE_REJECTED_DAYS", "0"))
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "0"))
+ARCHIVE_OTHER_SURVEYS = os.getenv("ARCHIVE_OTHER_SURVEYS", "0") == "1"
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "0"))
+ARCHIVE_BATCH = int(os.getenv("ARCHIVE_BATCH", "500"))
+ARCHIVE_MAX_PER_RUN = int(os.getenv("ARCHIVE_MAX_PER_RUN", "20000"))
+# pausa entre lotes para que los envíos de los kioscos no esperen al archivado
+ARCHIVE_PAUSE_SECONDS = float(os.getenv("ARCHIVE_PAUSE_SECONDS", "0.05"))
+VACUUM_MODE = os.getenv("VACUUM_MODE", "incremental")
+VACUUM_FREE_RATIO = float(os.getenv("VACUUM_FREE_RATIO", "0.25"))
+VACUUM_PAGES = int(os.getenv("VACUUM_PAGES", "2000"))
+
+_ARCHIVE_COLUMNS = (
+    "id", "survey_id", "payload_json", "status", "created_at", "updated_at",
+    "codigo_postal", "genero", "personaje_importante", "lang", "edad",
+)
+
+_engines: Dict[str, object] = {}
+_engines_lock = threading.Lock()
+_run_lock = threading.Lock()
+last_run: Optional[Dict] = None
+
+
+# --- destino del archivo ---
+
+def _partitioned() -> bool:
+    return "{survey_id}" in ARCHIVE_DATABASE_URL
+
+
+def _archive_engine(url: str):
+    with _engines_lock:
+        engine = _engines.get(url)
+        if engine is None:
+            database = make_url(url).database
+            if url.startswith("sqlite") and database:
+                Path(database).parent.mkdir(parents=True, exist_ok=True)
+            engine = _engines[url] = build_engine(url)
+            ResponseArchive.__table__.create(engine, checkfirst=True)
+        return engine
+
+
+def engine_for(engine, survey_id: int):
+    """Engine donde se archivan las respuestas de `survey_id`."""
+    if not ARCHIVE_DATABASE_URL:
+        return engine
+    return _archive_engine(ARCHIVE_DATABASE_URL.replace("{survey_id}", str(int(survey_id))))
+
+
+def engines(engine, survey_id: Optional[int] = None) -> List:
+    """Engines con archivo para exportar o contar (uno por encuesta si está particionado)."""
+    if not ARCHIVE_DATABASE_URL:
+        return [engine]
+    if not _partitioned():
+        return [_archive_engine(ARCHIVE_DATABASE_URL)]
+    if survey_id is not None:
+        return [engine_for(engine, survey_id)]
+    pattern = Path(make_url(ARCHIVE_DATABASE_URL.replace("{survey_id}", "*")).database or "")
+    prefix, suffix = pattern.name.split("*", 1)
+    found = []
+    for path in sorted(pattern.parent.glob(pattern.name)):
+        survey = path.name[len(prefix): len(path.name) - len(suffix)]
+        if survey.isdigit():
+            found.append(engine_for(engine, int(survey)))
+    return found
+
+
+# --- movimiento por lotes ---
+
+def _insert(session: Session, rows, reason: str, now: datetime):
+    """Copia las filas al archivo. Si ya estaban (reintento tras un fallo
+    del borrado) se sobrescriben con la versión que se acaba de borrar;
+    un id reutilizado por SQLite lleva otro created_at y es otra fila."""
+    if not rows:
+        return
+    table = ResponseArchive.__table__
+    values = [{**{col: getattr(r, col) for col in _ARCHIVE_COLUMNS}, "archived_at": now, "reason": reason} for r in rows]
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["id", "created_at"],
+            set_={col: stmt.excluded[col] for col in (*_ARCHIVE_COLUMNS, "archived_at", "reason") if col not in ("id", "created_at")},
+        )
+        session.execute(stmt, values)
+        return
+    for value in values:
+        existing = session.exec(
+            select(ResponseArchive).where(ResponseArchive.id == value["id"], ResponseArchive.created_at == value["created_at"])
+        ).first()
+        if existing is None:
+            existing = ResponseArchive()
+        for key, item in value.items():
+            setattr(existing, key, item)
+        session.add(existing)
+
+
+def _delete(session: Session, ids: List[int], filters) -> List:
+    """Borra de `response` las filas del lote que aún cumplen `filters` y
+    devuelve su contenido en el momento del borrado. Las que se moderaron
+    o archivó otro worker desde la selección se quedan donde están."""
+    where = (Response.id.in_(ids), *filters)
+    if session.get_bind().dialect.delete_returning:
+        stmt = delete(Response).where(*where).returning(*Response.__table__.c)
+        return session.execute(stmt).all()
+    rows = session.execute(select(*Response.__table__.c).where(*where).with_for_update()).all()
+    if rows:
+        session.execute(delete(Response).where(Response.id.in_([r.id for r in rows])))
+    return rows
+
+
+def _log_moved(session: Session, moved):
+    """change_log en la transacción del borrado. Los resúmenes del timeline
+    no se tocan: archivar no es moderar y la historia se conserva."""
+    for r in moved:
+        aggregates.log_change(session, "response.archived", r, r.status, status="archived")
+    if moved:
+        aggregates.log_change(session, "responses.archived")
+
+
+def _move_survey(engine, survey_id: int, ids: List[int], filters, reason: str, now: datetime) -> int:
+    target = engine_for(engine, survey_id)
+    with Session(engine) as s:
+        moved = _delete(s, ids, filters)
+        if target is engine:
+            # misma base: copia y borrado en una sola transacción
+            _insert(s, moved, reason, now)
+        elif moved:
+            # otra base: la copia se confirma antes que el borrado; si este
+            # falla, el reintento sobrescribe la copia con la fila actual
+            with Session(target) as archived:
+                _insert(archived, moved, reason, now)
+                archived.commit()
+        _log_moved(s, moved)
+        s.commit()
+    return len(moved)
+
+
+def move(engine, filters, reason: str, limit: Optional[int] = ARCHIVE_MAX_PER_RUN) -> int:
+    """Archiva las filas de `response` que cumplen `filters`, por lotes de
+    ARCHIVE_BATCH en orden de id (como mucho `limit`; None = todas)."""
+    total = 0
+    last_id = 0
+    while limit is None or total < limit:
+        size = ARCHIVE_BATCH if limit is None else min(ARCHIVE_BATCH, limit - total)
+        with Session(engine) as s:
+            rows = s.exec(
+                select(Response.id, Response.survey_id)
+                .where(*filters, Response.id > last_id)
+                .order_by(Response.id)
+                .limit(size)
+            ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        now = datetime.utcnow()
+        by_survey: Dict[int, List[int]] = {}
+        for row_id, survey_id in rows:
+            by_survey.setdefault(survey_id, []).append(row_id)
+        for survey_id, ids in by_survey.items():
+            total += _move_survey(engine, survey_id, ids, filters, reason, now)
+        if ARCHIVE_PAUSE_SECONDS > 0:
+            time.sleep(ARCHIVE_PAUSE_SECONDS)
+    if total:
+        if aggregates.seeded():
+            # desde cron (sin agregados sembrados) no hay nada que poner al día:
+            # los workers lo harán leyendo change_log
+            aggregates.sync(engine)
+        events.publish("responses.archived", {"archived": total, "reason": reason})
+    return total
+
+
+def policy() -> List:
+    """(motivo, filtros) de la política configurada por entorno."""
+    now = datetime.utcnow()
+    rules = []
+    if ARCHIVE_REJECTED_DAYS > 0:
+        rules.append(("rejected", [
+            Response.status == "rejected",
+            Response.updated_at < now - timedelta(days=ARCHIVE_REJECTED_DAYS),
+        ]))
+    if ARCHIVE_AFTER_DAYS > 0:
+        rules.append(("aged", [
+            Response.status.in_(("approved", "rejected")),
+            Response.created_at < now - timedelta(days=ARCHIVE_AFTER_DAYS),
+        ]))
+    if ARCHIVE_OTHER_SURVEYS:
+        rules.append(("survey", [Response.survey_id != questionnaire.compiled().survey_id]))
+    return rules
+
+
+# --- compactación ---
+
+def _sqlite_pages(conn) -> Dict:
+    return {
+        "pages": conn.exec_driver_sql("PRAGMA page_count").scalar(),
+        "free": conn.exec_driver_sql("PRAGMA freelist_count").scalar(),
+        "auto_vacuum": conn.exec_driver_sql("PRAGMA auto_vacuum").scalar(),
+    }
+
+
+def compact(engine, analyze: bool = True, full: bool = False) -> Dict:
+    """Devuelve al sistema las páginas libres y actualiza las estadísticas.
+
+    SQLite: `PRAGMA incremental_vacuum` acotado a VACUUM_PAGES (no bloquea
+    lecturas y apenas frena escrituras); el VACUUM completo reescribe el
+    fichero y deja la base en auto_vacuum incremental, así que solo se hace
+    con `full` o, en VACUUM_MODE=auto, si sobran muchas páginas. Después
+    ANALYZE si se movieron filas o `PRAGMA optimize` si no.
+    PostgreSQL: VACUUM (ANALYZE) de response.
+    """
+    dialect = engine.dialect.name
+    vacuum = None if VACUUM_MODE == "off" and not full else "incremental"
+    result = {"dialect": dialect, "vacuum": None, "analyze": analyze}
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if dialect == "sqlite":
+            before = _sqlite_pages(conn)
+            ratio = before["free"] / before["pages"] if before["pages"] else 0
+            if full or (VACUUM_MODE == "auto" and ratio > VACUUM_FREE_RATIO):
+                conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.exec_driver_sql("VACUUM")
+                conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").all()
+                result["vacuum"] = "full"
+            elif vacuum and before["auto_vacuum"] == 2 and before["free"]:
+                # con execute() el módulo sqlite3 solo avanza un paso (una
+                # página); executescript ejecuta el pragma hasta el final
+                conn.connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES});")
+                result["vacuum"] = "incremental"
+            conn.exec_driver_sql("ANALYZE" if analyze else "PRAGMA optimize")
+            result["before"] = before
+            result["after"] = _sqlite_pages(conn)
+        elif dialect == "postgresql":
+            if full:
+                conn.exec_driver_sql("VACUUM (FULL, ANALYZE) response")
+                result["vacuum"] = "full"
+            elif vacuum:
+                conn.exec_driver_sql("VACUUM (ANALYZE) response" if analyze else "VACUUM response")
+                result["vacuum"] = "incremental"
+            elif analyze:
+                conn.exec_driver_sql("ANALYZE response")
+    return result
+
+
+def run(engine, full_vacuum: bool = False) -> Dict:
+    """Aplica la política de retención y compacta. Un solo run a la vez por proceso."""
+    global last_run
+    with _run_lock:
+        started = time.perf_counter()
+        moved = {}
+        for reason, filters in policy():
+            moved[reason] = move(engine, filters, reason)
+        summary = {
+            "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "archived": moved,
+            "compact": compact(engine, analyze=any(moved.values()), full=full_vacuum),
+        }
+        summary["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if any(moved.values()):
+            logger.info("archivado: %s (%s ms)", moved, summary["elapsed_ms"])
+        last_run = summary
+        return summary
+
+
+def stats(engine) -> Dict:
+    """Filas en `response` y en el archivo por encuesta y estado."""
+    def query(model):
+        return select(model.survey_id, model.status, func.count()).group_by(model.survey_id, model.status)
+
+    hot: Dict = {}
+    with Session(engine) as s:
+        for survey_id, status, count in s.exec(query(Response)):
+            hot.setdefault(str(survey_id), {})[status] = count
+    archived: Dict = {}
+    for target in engines(engine):
+        with Session(target) as s:
+            for survey_id, status, count in s.exec(query(ResponseArchive)):
+                by_status = archived.setdefault(str(survey_id), {})
+                by_status[status] = by_status.get(status, 0) + count
+    result = {"hot": hot, "archive": archived, "partitioned": _partitioned(), "last_run": last_run}
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            result["pages"] = _sqlite_pages(conn)
+    return result
@@ -0,0 +1,272 @@
+import gzip
+import hashlib
+import logging
+import os
+import re
+import threading
+import unicodedata
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from app import cache
+
+try:
+    from PIL import Image
+except ImportError:  # dependencia opcional: pip install Pillow
+    Image = None
+
+try:
+    import brotli
+except ImportError:  # dependencia opcional: pip install brotli
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Recursos generados al arrancar (o con scripts/build_assets.py): miniaturas de
+# los retratos con el hash del original en el nombre y copias gzip/brotli de
+# JS/CSS/JSON. Todo lo que lleva hash en la URL se sirve como inmutable.
+APP_DIR = Path(__file__).resolve().parent
+BUILD_DIR = Path(os.getenv("ASSET_BUILD_DIR", str(APP_DIR / "build")))
+PORTRAIT_DIR = APP_DIR / "images" / "personajes"
+PORTRAIT_URL = "/assets/portraits"
+# tarjetas de /visual (160 px) y burbuja de /grid (240 px), a 1x y 2x
+PORTRAIT_WIDTHS = (160, 240, 320, 480)
+PORTRAIT_DEFAULT_WIDTH = 320
+JPEG_QUALITY = int(os.getenv("PORTRAIT_JPEG_QUALITY", "82"))
+WEBP_QUALITY = int(os.getenv("PORTRAIT_WEBP_QUALITY", "80"))
+
+PRECOMPRESS_DIRS = {"static": APP_DIR / "static"}
+PRECOMPRESS_SUFFIXES = {".js", ".css", ".json", ".svg", ".html"}
+PRECOMPRESS_MIN_BYTES = 1024
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+_portraits: Dict[str, Dict] = {}
+_portraits_lock = threading.Lock()
+_static_hashes: Dict[Path, tuple] = {}
+
+
+def content_hash(path: Path, length: int = 10) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+
+def _slug(name: str) -> str:
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "img"
+
+
+def _write_atomic(target: Path, data: bytes):
+    # varios workers pueden generar el mismo fichero a la vez
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, target)
+
+
+def _save_image(image, target: Path, fmt: str, **options):
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    image.save(tmp, fmt, **options)
+    os.replace(tmp, target)
+
+
+def _build_portrait(image_name: str) -> Optional[Dict]:
+    source = PORTRAIT_DIR / image_name
+    if not source.is_file():
+        return None
+    out_dir = BUILD_DIR / "portraits"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    base = f"{_slug(Path(image_name).stem)}.{content_hash(source)}"
+
+    if Image is None:
+        # sin Pillow: copia del original con hash, al menos cacheable
+        target = out_dir / f"{base}{source.suffix.lower()}"
+        if not target.exists():
+            _write_atomic(target, source.read_bytes())
+        return {"image": f"{PORTRAIT_URL}/{target.name}", "srcset": None}
+
+    expected = [out_dir / f"{base}.{w}.{ext}" for w in PORTRAIT_WIDTHS for ext in ("jpg", "webp")]
+    if not all(path.exists() for path in expected):
+        with Image.open(source) as original:
+            original = original.convert("RGB")
+            for width in PORTRAIT_WIDTHS:
+                if width >= original.width:
+                    resized = original
+                else:
+                    height = round(original.height * width / original.width)
+                    resized = original.resize((width, height), Image.LANCZOS)
+                _save_image(resized, out_dir / f"{base}.{width}.jpg", "JPEG",
+                            quality=JPEG_QUALITY, optimize=True, progressive=True)
+                _save_image(resized, out_dir / f"{base}.{width}.webp", "WEBP",
+                            quality=WEBP_QUALITY, method=6)
+
+    return {
+        "image": f"{PORTRAIT_URL}/{base}.{PORTRAIT_DEFAULT_WIDTH}.jpg",
+        "srcset": ", ".join(f"{PORTRAIT_URL}/{base}.{w}.webp {w}w" for w in PORTRAIT_WIDTHS),
+    }
+
+
+def build_portraits(image_names) -> Dict[str, Dict]:
+    """Genera (si faltan) las variantes de cada retrato y devuelve sus URLs."""
+    built = {}
+    for name in sorted(set(image_names)):
+        try:
+            entry = _build_portrait(name)
+        except OSError:
+            logger.exception("no se pudo procesar el retrato %s", name)
+            entry = None
+        if entry:
+            built[name] = entry
+    with _portraits_lock:
+        _portraits.clear()
+        _portraits.update(built)
+    return built
+
+
+def portrait(image_name: str) -> Optional[Dict]:
+    """URLs generadas para un retrato, o None si aún no se han construido."""
+    return _portraits.get(image_name)
+
+
+def _compress_file(source: Path, target_base: Path) -> int:
+    data = source.read_bytes()
+    if len(data) < PRECOMPRESS_MIN_BYTES:
+        return 0
+    target_base.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    variants = [(".gz", lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", lambda raw: brotli.compress(raw, quality=11)))
+    source_mtime = source.stat().st_mtime_ns
+    for ext, compress in variants:
+        target = target_base.with_name(target_base.name + ext)
+        if target.exists() and target.stat().st_mtime_ns >= source_mtime:
+            continue
+        _write_atomic(target, compress(data))
+        written += 1
+    return written
+
+
+def precompress() -> int:
+    """Copias .gz (y .br con brotli) de los ficheros de texto de /static."""
+    written = 0
+    for mount, directory in PRECOMPRESS_DIRS.items():
+        for source in directory.rglob("*"):
+            if source.is_file() and source.suffix in PRECOMPRESS_SUFFIXES:
+                rel = source.relative_to(directory)
+                written += _compress_file(source, BUILD_DIR / "compressed" / mount / rel)
+    return written
+
+
+def build(image_names=()) -> Dict:
+    """Paso de build completo: retratos y precompresión."""
+    BUILD_DIR.mkdir(parents=True, exist_ok=True)
+    portraits = build_portraits(image_names)
+    compressed = precompress()
+    return {"portraits": len(portraits), "compressed": compressed, "pillow": Image is not None}
+
+
+def _version(path: Path) -> Optional[str]:
+    """Hash de contenido que asset_url pone en ?v= (se recalcula si cambia el mtime)."""
+    current = cache.file_stamp(path)
+    if current is None:
+        return None
+    known = _static_hashes.get(path)
+    if known is None or known[0] != current:
+        known = (current, content_hash(path, 8))
+        _static_hashes[path] = known
+    return known[1]
+
+
+def asset_url(mount: str, rel: str) -> str:
+    """URL versionada (?v=hash) de un fichero de /static o /data."""
+    version = _version(APP_DIR / mount / rel)
+    if version is None:
+        return f"/{mount}/{rel}"
+    return f"/{mount}/{rel}?v={version}"
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    """Accept-Encoding como {codificación: q}."""
+    weights = {}
+    for item in header.split(","):
+        token, *params = item.split(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[token] = q
+    return weights
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles con Cache-Control y variantes precomprimidas.
+
+    Las peticiones con el ?v= que daría asset_url (el hash actual del
+    fichero) o los montajes con nombres con hash (`immutable=True`) se
+    cachean un año; el resto, también un ?v= antiguo, se revalida con ETag.
+    """
+
+    def __init__(self, *, compressed_dir: Optional[Path] = None, immutable: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.compressed_dir = compressed_dir
+        self.immutable = immutable
+
+    def _compressed_variant(self, full_path, request_headers: Headers):
+        if self.compressed_dir is None or Path(full_path).suffix not in PRECOMPRESS_SUFFIXES:
+            return None
+        accepted = _accepted_encodings(request_headers.get("accept-encoding", ""))
+        try:
+            rel = Path(full_path).resolve().relative_to(Path(self.directory).resolve())
+        except ValueError:
+            return None
+        source_mtime = os.stat(full_path).st_mtime_ns
+        for encoding, ext in (("br", ".br"), ("gzip", ".gz")):
+            if accepted.get(encoding, accepted.get("*", 0)) <= 0:
+                continue
+            candidate = self.compressed_dir / f"{rel}{ext}"
+            try:
+                candidate_stat = os.stat(candidate)
+            except OSError:
+                continue
+            # una copia más antigua que el original está obsoleta
+            if candidate_stat.st_mtime_ns >= source_mtime:
+                return encoding, candidate, candidate_stat
+        return None
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        request_headers = Headers(scope=scope)
+        variant = self._compressed_variant(full_path, request_headers)
+        if variant is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        else:
+            encoding, candidate, candidate_stat = variant
+            response = FileResponse(candidate, status_code=status_code, stat_result=candidate_stat,
+                                    media_type=guess_type(str(full_path))[0] or "text/plain")
+            response.headers["content-encoding"] = encoding
+        if self.compressed_dir is not None and Path(full_path).suffix in PRECOMPRESS_SUFFIXES:
+            response.headers["vary"] = "Accept-Encoding"
+        versioned = self.immutable
+        if not versioned:
+            requested = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("v")
+            versioned = bool(requested) and requested[-1] == _version(Path(full_path).resolve())
+        response.headers["cache-control"] = IMMUTABLE if versioned else REVALIDATE
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+
+# Cachés derivadas de ficheros (questions.json, zipcode_pix.csv): se recalculan
+# cuando cambia el mtime/tamaño del fichero, comprobado como mucho cada
+# FILE_CHECK_INTERVAL segundos. Cada worker hace su propio stat, así que todos
+# ven la misma versión del fichero sin reiniciar uvicorn.
+FILE_CHECK_INTERVAL = float(os.getenv("FILE_CHECK_INTERVAL", "2"))
+
+_watched = {}
+_lock = threading.Lock()
+# crece cada vez que alguno de los ficheros vigilados cambia
+_generation = 0
+
+
+def file_stamp(path: Path):
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def stamp(path: Path, force: bool = False):
+    """Devuelve el sello vigente del fichero y actualiza la generación si cambió."""
+    global _generation
+    now = time.monotonic()
+    with _lock:
+        entry = _watched.setdefault(path, {"stamp": file_stamp(path), "checked": now})
+        if force or now - entry["checked"] >= FILE_CHECK_INTERVAL:
+            entry["checked"] = now
+            current = file_stamp(path)
+            if current != entry["stamp"]:
+                entry["stamp"] = current
+                _generation += 1
+        return entry["stamp"]
+
+
+def file_cached(path: Path):
+    """Como lru_cache(maxsize=1) para funciones sin argumentos que leen `path`,
+    pero invalidado al cambiar el fichero."""
+
+    def decorator(func):
+        state = {"stamp": object(), "value": None}
+        func_lock = threading.Lock()
+
+        @wraps(func)
+        def wrapper():
+            current = stamp(path)
+            if state["stamp"] != current:
+                with func_lock:
+                    if state["stamp"] != current:
+                        state["value"] = func()
+                        state["stamp"] = current
+            return state["value"]
+
+        def cache_clear():
+            state["stamp"] = object()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
+
+
+def check_files() -> int:
+    """Revisa todos los ficheros vigilados y devuelve la generación actual."""
+    for path in list(_watched):
+        stamp(path)
+    return _generation
+
+
+def generation() -> int:
+    return _generation
@@ -0,0 +1,120 @@
+import json
+from datetime import timezone
+
+from app import questionnaire
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # dependencia opcional: pip install pyarrow
+    pa = pa_ipc = pq = None
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def _field_kinds():
+    """Tipo de cada campo según questions.json: int, list o str."""
+    return questionnaire.compiled().kinds()
+
+
+def _kind_for(key: str) -> str:
+    if key == "__lang":
+        return "category"
+    kinds = _field_kinds()
+    if key in kinds:
+        return kinds[key]
+    for suffix in ("_labels", "_values"):
+        if key.endswith(suffix) and kinds.get(key[: -len(suffix)]) == "list":
+            return "list"
+    return "str"
+
+
+BASE_COLUMNS = ("id", "survey_id", "status", "created_at")
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def _column_names(columns):
+    """Nombre de campo de cada clave del payload: las que coinciden con una
+    columna base (un `id` o `status` dentro del payload) llevan prefijo `payload_`."""
+    taken = set(BASE_COLUMNS) | set(columns)
+    names = []
+    for key in columns:
+        name = key
+        if key in BASE_COLUMNS:
+            name = f"payload_{key}"
+            while name in taken:
+                name = f"payload_{name}"
+            taken.add(name)
+        names.append(name)
+    return names
+
+
+def build_schema(columns):
+    fields = [
+        pa.field("id", pa.int64()),
+        pa.field("survey_id", pa.int64()),
+        pa.field("status", pa.dictionary(pa.int8(), pa.string())),
+        pa.field("created_at", pa.timestamp("s", tz="UTC")),
+    ]
+    types = {
+        "int": pa.int64(),
+        "list": pa.list_(pa.string()),
+        "category": pa.dictionary(pa.int16(), pa.string()),
+        "str": pa.string(),
+    }
+    for key, name in zip(columns, _column_names(columns)):
+        fields.append(pa.field(name, types[_kind_for(key)]))
+    return pa.schema(fields)
+
+
+def _coerce(kind: str, value):
+    if value is None or value == "":
+        return None
+    if kind == "int":
+        try:
+            number = int(float(value))
+        except (TypeError, ValueError, OverflowError):
+            return None
+        return number if INT64_MIN <= number <= INT64_MAX else None
+    if kind == "list":
+        values = value if isinstance(value, list) else [value]
+        return [str(v) for v in values]
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _batch(schema, columns, rows):
+    data = {
+        "id": [r.id for r in rows],
+        "survey_id": [r.survey_id for r in rows],
+        "status": [r.status for r in rows],
+        "created_at": [r.created_at.replace(tzinfo=timezone.utc) for r in rows],
+    }
+    for key, name in zip(columns, _column_names(columns)):
+        kind = _kind_for(key)
+        data[name] = [_coerce(kind, (r.payload_json or {}).get(key)) for r in rows]
+    return pa.RecordBatch.from_pydict(data, schema=schema)
+
+
+def write(rows, columns, fmt: str, sink, batch_size: int = 1000):
+    """Escribe las filas en `sink` como Parquet o Arrow IPC, por lotes."""
+    schema = build_schema(columns)
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa_ipc.new_file(sink, schema)
+    try:
+        pending = []
+        for row in rows:
+            pending.append(row)
+            if len(pending) >= batch_size:
+                writer.write_batch(_batch(schema, columns, pending))
+                pending = []
+        if pending:
+            writer.write_batch(_batch(schema, columns, pending))
+    finally:
+        writer.close()
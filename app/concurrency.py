@@ -0,0 +1,59 @@
+import asyncio
+import os
+
+from anyio import CapacityLimiter, to_thread
+from sqlmodel import SQLModel, Session
+
+try:
+    from sqlmodel.ext.asyncio.session import AsyncSession
+except ImportError:  # sqlalchemy[asyncio] no disponible
+    AsyncSession = None
+
+# Hilos separados por tipo de trabajo, para que cientos de pantallas sondeando
+# no dejen sin hilo a los envíos de los kioscos:
+#   WRITE_THREADS -> persist() de POST /api/responses y del group commit
+#   READ_THREADS  -> consultas de lectura cuando no hay engine asíncrono
+#   CPU_THREADS   -> agregación y serialización de los agregados en memoria
+# Las rutas de administración poco frecuentes siguen en el threadpool de Starlette.
+WRITE_THREADS = int(os.getenv("WRITE_THREADS", "4"))
+READ_THREADS = int(os.getenv("READ_THREADS", "16"))
+CPU_THREADS = int(os.getenv("CPU_THREADS", "4"))
+
+_LIMITS = {"write": WRITE_THREADS, "read": READ_THREADS, "cpu": CPU_THREADS}
+_limiters = {}
+
+
+def _limiter(kind: str) -> CapacityLimiter:
+    # un limitador por bucle de eventos (TestClient crea uno por cliente)
+    loop = asyncio.get_running_loop()
+    entry = _limiters.get(kind)
+    if entry is None or entry[0] is not loop:
+        entry = _limiters[kind] = (loop, CapacityLimiter(_LIMITS[kind]))
+    return entry[1]
+
+
+async def run_write(func, *args):
+    return await to_thread.run_sync(func, *args, limiter=_limiter("write"))
+
+
+async def run_read(func, *args):
+    return await to_thread.run_sync(func, *args, limiter=_limiter("read"))
+
+
+async def run_cpu(func, *args):
+    return await to_thread.run_sync(func, *args, limiter=_limiter("cpu"))
+
+
+async def fetch_all(statement):
+    """Ejecuta una SELECT con el engine asíncrono (DB_ASYNC=1) o, si no hay,
+    en los hilos de lectura. Devuelve lo mismo que `Session.exec(...).all()`."""
+    async_engine = getattr(SQLModel, "async_engine", None)
+    if async_engine is not None:
+        async with AsyncSession(async_engine) as s:
+            return (await s.exec(statement)).all()
+
+    def run():
+        with Session(SQLModel.engine) as s:
+            return s.exec(statement).all()
+
+    return await run_read(run)
@@ -0,0 +1,174 @@
+import logging
+import os
+
+from sqlalchemy import bindparam, event, inspect, select, text
+from sqlalchemy.pool import QueuePool
+from sqlmodel import SQLModel, create_engine
+
+from app import rollups
+from app.models import PAYLOAD_COLUMNS, Response, ResponseRollup, payload_columns
+
+try:
+    from sqlalchemy.ext.asyncio import create_async_engine
+except ImportError:  # requiere greenlet
+    create_async_engine = None
+
+logger = logging.getLogger(__name__)
+
+# Perfil de base de datos seleccionable por entorno:
+#   DATABASE_URL  -> por defecto sqlite:///./encuesta.db (también postgresql://...)
+#   DB_PROFILE    -> "tuned" (WAL + pragmas + pool) o "basic" (comportamiento previo)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./encuesta.db")
+DB_PROFILE = os.getenv("DB_PROFILE", "tuned")
+DB_ECHO = os.getenv("DB_ECHO", "0") == "1"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+# DB_ASYNC=1: las lecturas de sondeo usan un engine asíncrono (pip install
+# aiosqlite, o asyncpg para PostgreSQL) en vez de hilos del threadpool
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def _sqlite_pragmas(dbapi_connection, _connection_record):
+    cursor = dbapi_connection.cursor()
+    # solo surte efecto en bases nuevas: permite liberar páginas por tramos
+    # tras archivar (PRAGMA incremental_vacuum, ver app/archive.py)
+    cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    # WAL: las lecturas de /grid, /visual y /admin no se bloquean tras las escrituras
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def build_engine(url: str = DATABASE_URL, profile: str = DB_PROFILE):
+    """Crea el engine según el perfil. En SQLite el perfil "tuned" activa WAL
+    y un pool de conexiones compartible entre los hilos del threadpool."""
+    is_sqlite = url.startswith("sqlite")
+    if profile != "tuned":
+        return create_engine(url, echo=DB_ECHO)
+    if is_sqlite:
+        engine = create_engine(
+            url,
+            echo=DB_ECHO,
+            poolclass=QueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        )
+        event.listen(engine, "connect", _sqlite_pragmas)
+        return engine
+    return create_engine(
+        url,
+        echo=DB_ECHO,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+    )
+
+
+def async_url(url: str):
+    scheme, sep, rest = url.partition("://")
+    driver = ASYNC_DRIVERS.get(scheme.split("+")[0])
+    return f"{driver}{sep}{rest}" if driver and sep else None
+
+
+def build_async_engine(url: str = DATABASE_URL, profile: str = DB_PROFILE):
+    """Engine asíncrono con la misma configuración que build_engine, o None
+    si falta SQLAlchemy asyncio o el driver (se sigue usando el de hilos)."""
+    target = async_url(url)
+    if create_async_engine is None or target is None:
+        logger.warning("DB_ASYNC=1 sin soporte asyncio para %s; se usan hilos", url.split("://")[0])
+        return None
+    try:
+        if target.startswith("sqlite"):
+            engine = create_async_engine(
+                target,
+                echo=DB_ECHO,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                connect_args={"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+            )
+            if profile == "tuned":
+                event.listen(engine.sync_engine, "connect", _sqlite_pragmas)
+            return engine
+        return create_async_engine(
+            target,
+            echo=DB_ECHO,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_pre_ping=True,
+        )
+    except ImportError as exc:
+        logger.warning("DB_ASYNC=1 pero falta el driver (%s); se usan hilos", exc)
+        return None
+
+
+# Relleno de columnas añadidas a tablas existentes: (tabla, columna) -> SQL
+COLUMN_BACKFILLS = {
+    ("response", "updated_at"): "UPDATE response SET updated_at = created_at WHERE updated_at IS NULL",
+}
+
+
+def _add_missing_columns(engine):
+    """ALTER TABLE ... ADD COLUMN para las columnas nuevas del modelo."""
+    added = []
+    inspector = inspect(engine)
+    for table in SQLModel.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            col_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {col_type}'))
+                backfill = COLUMN_BACKFILLS.get((table.name, column.name))
+                if backfill:
+                    conn.execute(text(backfill))
+            added.append((table.name, column.name))
+    return added
+
+
+def backfill_payload_columns(engine, batch_size: int = 1000):
+    """Rellena las columnas desnormalizadas de filas anteriores a su creación."""
+    table = Response.__table__
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(table.c.id, table.c.payload_json)
+                .where(table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return
+            conn.execute(
+                table.update().where(table.c.id == bindparam("_id")),
+                [{"_id": row_id, **payload_columns(payload)} for row_id, payload in rows],
+            )
+        last_id = rows[-1][0]
+
+
+def ensure_schema(engine):
+    """Crea tablas, columnas e índices que falten (create_all no altera tablas
+    que ya existían en una base creada con una versión anterior)."""
+    had_rollups = inspect(engine).has_table(ResponseRollup.__tablename__)
+    SQLModel.metadata.create_all(engine)
+    added = _add_missing_columns(engine)
+    if any(column in PAYLOAD_COLUMNS for _table, column in added):
+        backfill_payload_columns(engine)
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    if not had_rollups:
+        rollups.rebuild(engine)
@@ -0,0 +1,88 @@
+import asyncio
+import itertools
+import json
+import os
+import threading
+from typing import Optional, Set
+
+# Tamaño de la cola por cliente: si un display se queda atrás se descartan sus
+# eventos más antiguos y se le pide que se resincronice, sin frenar al resto.
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "64"))
+
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def _push(self, event: dict):
+        # Se ejecuta siempre dentro del loop del suscriptor.
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.overflowed = True
+        self.queue.put_nowait(event)
+
+    async def next(self, timeout: float) -> Optional[dict]:
+        """Siguiente evento, un `resync` si se perdieron eventos o None al expirar."""
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if self.overflowed:
+            self.overflowed = False
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            return {"id": event["id"], "type": "resync", "data": {}}
+        return event
+
+
+class EventBus:
+    """Bus en proceso: las rutas publican y cada cliente SSE tiene su cola."""
+
+    def __init__(self, maxsize: int = EVENTS_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+
+    def subscribe(self) -> Subscription:
+        sub = Subscription(asyncio.get_running_loop(), self.maxsize)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_type: str, data: Optional[dict] = None):
+        """Publica desde cualquier hilo (las rutas sync corren en el threadpool)."""
+        event = {"id": next(self._seq), "type": event_type, "data": data or {}}
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub._push, event)
+            except RuntimeError:
+                # loop cerrado: el cliente ya se fue
+                self.unsubscribe(sub)
+
+
+def format_sse(event: dict) -> str:
+    payload = json.dumps(event["data"], ensure_ascii=False, separators=(",", ":"))
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
+
+
+bus = EventBus()
+
+
+def publish(event_type: str, data: Optional[dict] = None):
+    bus.publish(event_type, data)
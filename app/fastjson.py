@@ -0,0 +1,45 @@
+import json
+from datetime import date, datetime
+
+from fastapi.responses import JSONResponse
+
+from app.metrics import span
+
+try:
+    import orjson
+except ImportError:  # dependencia opcional: pip install orjson
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} no es serializable a JSON")
+
+
+def dumps(content) -> bytes:
+    """JSON compacto en UTF-8: orjson si está instalado, json de la stdlib si no.
+
+    orjson no admite enteros de más de 64 bits (payloads sin normalizar): en
+    ese caso se recurre también a la stdlib.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        except (orjson.JSONEncodeError, TypeError):
+            pass
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """Respuesta JSON codificada con dumps(); acepta bytes ya codificados.
+
+    Devolverla directamente desde un endpoint evita jsonable_encoder, que
+    recorre y copia cada payload anidado.
+    """
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        with span("json_render"):
+            return dumps(content)
@@ -0,0 +1,279 @@
+import csv
+import os
+import pickle
+import threading
+from math import atan2, cos, radians, sin, sqrt
+from pathlib import Path
+
+from app import cache
+
+try:
+    import numpy as np
+except ImportError:  # dependencia opcional: sin NumPy se calcula en Python puro
+    np = None
+
+ZIP_CSV = Path(__file__).resolve().parents[1] / "app" / "data" / "zipcode_pix.csv"
+# caché binaria junto al CSV; se regenera cuando cambia su mtime/tamaño
+ZIP_INDEX_CACHE = Path(os.getenv("ZIP_INDEX_CACHE", str(ZIP_CSV.with_suffix(".idx"))))
+INDEX_FORMAT = 1
+BASE_WIDTH = 1920
+BASE_HEIGHT = 1080
+BASE_CENTER = (BASE_WIDTH / 2, BASE_HEIGHT / 2)
+ALAVA_COORD = (42.8467, -2.6720)
+
+# Aproximación de centroides provinciales (lat, lon) para códigos fuera de Álava.
+PROVINCE_CENTROIDS = {
+    "01": (42.8467, -2.6720),  # Álava
+    "02": (38.9833, -1.85),    # Albacete
+    "03": (38.3452, -0.4810),  # Alicante
+    "04": (36.8340, -2.4637),  # Almería
+    "05": (40.6566, -4.6810),  # Ávila
+    "06": (38.8786, -6.9703),  # Badajoz
+    "07": (39.6953, 3.0176),   # Baleares (Palma)
+    "08": (41.3874, 2.1686),   # Barcelona
+    "09": (42.3439, -3.6969),  # Burgos
+    "10": (39.4753, -6.3710),  # Cáceres
+    "11": (36.5164, -6.2994),  # Cádiz
+    "12": (39.9864, -0.0513),  # Castellón
+    "13": (38.9849, -3.9291),  # Ciudad Real
+    "14": (37.8847, -4.7792),  # Córdoba
+    "15": (43.3623, -8.4115),  # A Coruña
+    "16": (40.0704, -2.1374),  # Cuenca
+    "17": (41.9794, 2.8214),   # Girona
+    "18": (37.1773, -3.5986),  # Granada
+    "19": (40.6333, -3.1667),  # Guadalajara
+    "20": (43.3183, -1.9812),  # Gipuzkoa
+    "21": (37.2614, -6.9447),  # Huelva
+    "22": (42.1361, -0.4089),  # Huesca
+    "23": (37.7796, -3.7849),  # Jaén
+    "24": (42.5987, -5.5671),  # León
+    "25": (41.6176, 0.6200),   # Lleida
+    "26": (42.4627, -2.4440),  # La Rioja
+    "27": (43.0097, -7.5560),  # Lugo
+    "28": (40.4168, -3.7038),  # Madrid
+    "29": (36.7213, -4.4214),  # Málaga
+    "30": (37.9922, -1.1307),  # Murcia
+    "31": (42.8196, -1.6440),  # Navarra
+    "32": (42.3383, -7.8639),  # Ourense
+    "33": (43.3619, -5.8494),  # Asturias
+    "34": (42.0097, -4.5288),  # Palencia
+    "35": (28.0997, -15.4134), # Las Palmas
+    "36": (42.4333, -8.6444),  # Pontevedra
+    "37": (40.9701, -5.6635),  # Salamanca
+    "38": (28.4682, -16.2546), # Santa Cruz de Tenerife
+    "39": (43.4623, -3.8099),  # Cantabria
+    "40": (40.9429, -4.1088),  # Segovia
+    "41": (37.3891, -5.9845),  # Sevilla
+    "42": (41.7660, -2.4790),  # Soria
+    "43": (41.1189, 1.2445),   # Tarragona
+    "44": (40.3440, -1.1069),  # Teruel
+    "45": (39.8628, -4.0273),  # Toledo
+    "46": (39.4699, -0.3763),  # Valencia
+    "47": (41.6523, -4.7286),  # Valladolid
+    "48": (43.2630, -2.9350),  # Bizkaia
+    "49": (41.5033, -5.7440),  # Zamora
+    "50": (41.6488, -0.8891),  # Zaragoza
+    "51": (35.8894, -5.3213),  # Ceuta
+    "52": (35.2923, -2.9381),  # Melilla
+}
+
+
+def _bearing_and_distance_km(lat1, lon1, lat2, lon2):
+    R = 6371.0
+    phi1, phi2 = radians(lat1), radians(lat2)
+    dphi = radians(lat2 - lat1)
+    dlambda = radians(lon2 - lon1)
+    a = sin(dphi/2)**2 + cos(phi1)*cos(phi2)*sin(dlambda/2)**2
+    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    distance = R * c
+    y = sin(dlambda) * cos(phi2)
+    x = cos(phi1)*sin(phi2) - sin(phi1)*cos(phi2)*cos(dlambda)
+    bearing = atan2(y, x)
+    return bearing, distance
+
+
+def _edge_position(bearing, dist_km):
+    """Proyecta bearing/distancia hacia el borde de la imagen base."""
+    # Escala la distancia para empujar más hacia el borde (0.4 a 0.95 del radio)
+    radius_base = min(BASE_WIDTH, BASE_HEIGHT) / 2
+    dist_norm = min(dist_km / 900, 1.0)  # 900 km ~ empuja a borde
+    # Empuja un poco más lejos de la masa central (más de la mitad del radio)
+    radius = radius_base * (0.55 + 0.6 * dist_norm)
+    cx, cy = BASE_CENTER
+    x = cx + radius * sin(bearing)  # x aumenta hacia el este
+    y = cy - radius * cos(bearing)  # y aumenta hacia el sur en pantalla
+    # Mantener dentro de los límites de la imagen
+    x = max(0, min(BASE_WIDTH, x))
+    y = max(0, min(BASE_HEIGHT, y))
+    return x, y
+
+
+def _province_fallbacks():
+    """Posición de borde precalculada para cada prefijo de PROVINCE_CENTROIDS."""
+    prefixes = sorted(PROVINCE_CENTROIDS)
+    if np is None:
+        return {
+            prefix: _edge_position(*_bearing_and_distance_km(ALAVA_COORD[0], ALAVA_COORD[1], *PROVINCE_CENTROIDS[prefix]))
+            for prefix in prefixes
+        }
+    coords = np.radians(np.array([PROVINCE_CENTROIDS[p] for p in prefixes], dtype=float))
+    phi1, lam1 = np.radians(ALAVA_COORD[0]), np.radians(ALAVA_COORD[1])
+    phi2, lam2 = coords[:, 0], coords[:, 1]
+    dphi = phi2 - phi1
+    dlambda = lam2 - lam1
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    dist_km = 6371.0 * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    bearing = np.arctan2(
+        np.sin(dlambda) * np.cos(phi2),
+        np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(dlambda),
+    )
+    radius = min(BASE_WIDTH, BASE_HEIGHT) / 2 * (0.55 + 0.6 * np.minimum(dist_km / 900, 1.0))
+    xs = np.clip(BASE_CENTER[0] + radius * np.sin(bearing), 0, BASE_WIDTH)
+    ys = np.clip(BASE_CENTER[1] - radius * np.cos(bearing), 0, BASE_HEIGHT)
+    return {prefix: (float(x), float(y)) for prefix, x, y in zip(prefixes, xs, ys)}
+
+
+def _read_csv(path: Path):
+    """Devuelve listas paralelas (cp, label, x, y) de las filas válidas."""
+    cps, labels, xs, ys = [], [], [], []
+    with path.open(newline="", encoding="utf-8") as fh:
+        for row in csv.DictReader(fh):
+            cp = (row.get("cod_postal") or "").strip()
+            if not cp:
+                continue
+            if len(cp) == 4:
+                cp = cp.zfill(5)
+            try:
+                x = float(row.get("x_px", 0.0))
+                y = float(row.get("y_px", 0.0))
+            except (TypeError, ValueError):
+                x = y = None
+            cps.append(cp)
+            labels.append(row.get("denominacion_cp", cp))
+            xs.append(x)
+            ys.append(y)
+    return cps, labels, xs, ys
+
+
+def _centroids(cps, labels, xs, ys):
+    """{cp: {"codigo_postal", "label", "x", "y"}} con el centroide de sus puntos."""
+    mapping = {}
+    for cp, label in zip(cps, labels):
+        if cp not in mapping:
+            mapping[cp] = {"codigo_postal": cp, "label": label, "x": None, "y": None}
+    valid = [i for i, x in enumerate(xs) if x is not None]
+    if not valid:
+        return mapping
+    if np is None:
+        sums = {}
+        for i in valid:
+            acc = sums.setdefault(cps[i], [0.0, 0.0, 0])
+            acc[0] += xs[i]
+            acc[1] += ys[i]
+            acc[2] += 1
+        for cp, (sx, sy, n) in sums.items():
+            mapping[cp]["x"] = sx / n
+            mapping[cp]["y"] = sy / n
+        return mapping
+    keys, inverse = np.unique(np.array([cps[i] for i in valid]), return_inverse=True)
+    counts = np.bincount(inverse)
+    cx = np.bincount(inverse, weights=np.array([xs[i] for i in valid])) / counts
+    cy = np.bincount(inverse, weights=np.array([ys[i] for i in valid])) / counts
+    for cp, x, y in zip(keys.tolist(), cx.tolist(), cy.tolist()):
+        mapping[cp]["x"] = x
+        mapping[cp]["y"] = y
+    return mapping
+
+
+class GeometryIndex:
+    """Posiciones en píxeles por CP y posiciones de borde por provincia."""
+
+    def __init__(self, postal=None, provinces=None, source=None, origin="empty"):
+        self.postal = postal or {}
+        self.provinces = provinces if provinces is not None else _province_fallbacks()
+        self.source = source
+        self.origin = origin
+
+    def position(self, postal: str):
+        """Entrada de mapa del CP o, si no está en el CSV, su posición de borde."""
+        entry = self.postal.get(postal)
+        if entry and entry.get("x") is not None and entry.get("y") is not None:
+            return entry
+        xy = self.provinces.get(postal[:2]) if postal else None
+        if not xy:
+            return None
+        return {
+            "codigo_postal": postal,
+            "label": f"CP {postal}",
+            "x": xy[0],
+            "y": xy[1],
+            "external": True,
+        }
+
+    def stats(self) -> dict:
+        return {
+            "postal_codes": len(self.postal),
+            "provinces": len(self.provinces),
+            "origin": self.origin,
+            "source": self.source,
+        }
+
+
+def _source_stamp(path: Path):
+    st = path.stat()
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def build_index(csv_path: Path = ZIP_CSV, cache_path: Path = ZIP_INDEX_CACHE, force: bool = False) -> GeometryIndex:
+    """Carga el índice desde la caché binaria si sigue vigente o lo recompila."""
+    if not csv_path.exists():
+        return GeometryIndex()
+    stamp = _source_stamp(csv_path)
+    if not force and cache_path.exists():
+        try:
+            with cache_path.open("rb") as fh:
+                cached = pickle.load(fh)
+            if cached.get("format") == INDEX_FORMAT and cached.get("source") == stamp:
+                return GeometryIndex(cached["postal"], cached["provinces"], stamp, origin="cache")
+        except Exception:
+            pass
+    postal = _centroids(*_read_csv(csv_path))
+    provinces = _province_fallbacks()
+    try:
+        tmp = cache_path.with_suffix(cache_path.suffix + ".tmp")
+        with tmp.open("wb") as fh:
+            pickle.dump(
+                {"format": INDEX_FORMAT, "source": stamp, "postal": postal, "provinces": provinces},
+                fh,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp, cache_path)
+    except OSError:
+        pass  # sin permisos de escritura: se usa el índice en memoria
+    return GeometryIndex(postal, provinces, stamp, origin="csv")
+
+
+_index = None
+_index_stamp = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> GeometryIndex:
+    """Índice vigente; se recarga solo si cambia zipcode_pix.csv (ver app/cache.py)."""
+    global _index, _index_stamp
+    current = cache.stamp(ZIP_CSV)
+    if _index is None or _index_stamp != current:
+        with _index_lock:
+            if _index is None or _index_stamp != current:
+                _index = build_index()
+                _index_stamp = current
+    return _index
+
+
+def reload_index(force: bool = False) -> GeometryIndex:
+    """Vuelve a leer el CSV (o la caché si no cambió) sin reiniciar uvicorn."""
+    global _index, _index_stamp
+    with _index_lock:
+        _index = build_index(force=force)
+        _index_stamp = cache.stamp(ZIP_CSV, force=True)
+    return _index
@@ -1,19 +1,83 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import Depends
 from app.deps import get_current_user
 from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse
 from fastapi.templating import Jinja2Templates
-from sqlmodel import SQLModel, create_engine
+from sqlmodel import SQLModel
 
+from app import aggregates, archive, assets, metrics
+from app.assets import CachedStaticFiles
+from app.db import DB_ASYNC, build_async_engine, build_engine, ensure_schema
+from app.fastjson import FastJSONResponse
 from app.models import Survey, Response
-from app.routers import responses, admin, visual
+from app.questionnaire import compiled as compiled_questionnaire
+from app.routers import responses, admin, visual, events, stats, questionnaire
+from app.writer import WRITE_BATCH, writer
 
-app = FastAPI(title="Encuesta Local")
+logger = logging.getLogger(__name__)
 
-# DB SQLite
-engine = create_engine("sqlite:///./encuesta.db", echo=False)
-SQLModel.metadata.create_all(engine)
+async def _sync_loop():
+    """Pone al día los agregados con las escrituras de otros workers."""
+    while True:
+        await asyncio.sleep(aggregates.SYNC_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(aggregates.sync, SQLModel.engine)
+        except Exception:
+            logger.exception("fallo sincronizando agregados")
+
+
+async def _archive_loop():
+    """Retención periódica: archiva por lotes y compacta (app/archive.py)."""
+    while True:
+        await asyncio.sleep(archive.ARCHIVE_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(archive.run, SQLModel.engine)
+        except Exception:
+            logger.exception("fallo archivando respuestas")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WRITE_BATCH:
+        writer.start()
+    # idempotente: solo genera lo que falte (scripts/build_assets.py lo adelanta)
+    summary = await asyncio.to_thread(assets.build, visual.character_image_names())
+    logger.info("assets: %s", summary)
+    compiled = await asyncio.to_thread(compiled_questionnaire)
+    logger.info("cuestionario %s: %s", compiled.version, ", ".join(compiled.codes))
+    sync_task = asyncio.create_task(_sync_loop()) if aggregates.SYNC_INTERVAL_SECONDS > 0 else None
+    archive_task = asyncio.create_task(_archive_loop()) if archive.ARCHIVE_INTERVAL_SECONDS > 0 else None
+    yield
+    if sync_task:
+        sync_task.cancel()
+    if archive_task:
+        archive_task.cancel()
+    await writer.stop()
+    if SQLModel.async_engine is not None:
+        await SQLModel.async_engine.dispose()
+
+
+app = FastAPI(
+    title="Encuesta Local",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# DB (SQLite por defecto; perfil y URL configurables en app/db.py)
+engine = build_engine()
+ensure_schema(engine)
+metrics.instrument_engine(engine)
 SQLModel.engine = engine  # para usarlo en las rutas
+# lecturas de sondeo con engine asíncrono (opcional, ver app/concurrency.py)
+SQLModel.async_engine = build_async_engine() if DB_ASYNC else None
+if SQLModel.async_engine is not None:
+    metrics.instrument_engine(SQLModel.async_engine.sync_engine)
+aggregates.seed(engine)  # agregados en memoria para /api/visual/points
 
 # Rutas API
 # Rutas API
@@ -21,12 +85,19 @@ app.include_router(responses.router)
 
 app.include_router(admin.router, dependencies=[Depends(get_current_user)])
 app.include_router(visual.router)
+app.include_router(events.router)
+app.include_router(stats.router)
+app.include_router(questionnaire.router)
 
 # Estáticos y plantillas
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-app.mount("/images", StaticFiles(directory="app/images"), name="images")
-app.mount("/data", StaticFiles(directory="app/data"), name="data")
+# /assets: nombres con hash de contenido, cacheables para siempre
+(assets.BUILD_DIR / "portraits").mkdir(parents=True, exist_ok=True)
+app.mount("/assets/portraits", CachedStaticFiles(directory=assets.BUILD_DIR / "portraits", immutable=True), name="assets")
+app.mount("/static", CachedStaticFiles(directory="app/static", compressed_dir=assets.BUILD_DIR / "compressed" / "static"), name="static")
+app.mount("/images", CachedStaticFiles(directory="app/images"), name="images")
+app.mount("/data", CachedStaticFiles(directory="app/data"), name="data")
 templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["asset_url"] = assets.asset_url
 
 @app.get("/")
 def survey_page(request: Request):
@@ -40,6 +111,13 @@ def visual_page(request: Request):
 def admin_page(request: Request, user: str = Depends(get_current_user)):
     return templates.TemplateResponse("admin.html", {"request": request})
 
+@app.get("/metrics", include_in_schema=False)
+def metrics_page():
+    """Métricas en formato de texto Prometheus (requiere METRICS=1)."""
+    if not metrics.METRICS_ENABLED:
+        return PlainTextResponse("metrics disabled (METRICS=1)\n", status_code=404)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/grid")
 def grid_page(request: Request):
     return templates.TemplateResponse("grid.html", {"request": request})
@@ -0,0 +1,199 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from starlette.routing import Match
+
+# Instrumentación opcional (METRICS=1): latencia por ruta, consultas SQL por
+# petición, bytes de respuesta y sub-spans explícitos (p. ej. la serialización
+# JSON de app/fastjson.py).
+# Desactivada no se instala ni middleware ni listeners y span() es un no-op.
+METRICS_ENABLED = os.getenv("METRICS", "0") == "1"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    def __init__(self, name: str, doc: str, buckets, labels: Tuple[str, ...]):
+        self.name = name
+        self.doc = doc
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [recuentos por bucket..., +Inf, suma]
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[idx] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for label_values, series in items:
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            sep = "," if base else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, doc: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, value: float, *label_values: str):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            lines.append(f"{self.name}{{{base}}} {value}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUESTS = Counter("vital_requests_total", "Peticiones por ruta y código", ("method", "route", "status"))
+LATENCY = Histogram("vital_request_duration_seconds", "Latencia por ruta", LATENCY_BUCKETS, ("method", "route"))
+QUERIES = Histogram("vital_request_db_queries", "Consultas SQL por petición", QUERY_BUCKETS, ("route",))
+QUERY_TIME = Histogram("vital_request_db_seconds", "Tiempo en SQL por petición", LATENCY_BUCKETS, ("route",))
+BYTES = Histogram("vital_response_bytes", "Tamaño del cuerpo de respuesta", BYTES_BUCKETS, ("route",))
+SPANS = Histogram("vital_span_seconds", "Sub-spans instrumentados", LATENCY_BUCKETS, ("route", "span"))
+ALL_METRICS = (REQUESTS, LATENCY, QUERIES, QUERY_TIME, BYTES, SPANS)
+
+
+class RequestStats:
+    __slots__ = ("route", "queries", "query_seconds")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("vital_request_stats", default=None)
+
+
+@contextmanager
+def _noop():
+    yield
+
+
+@contextmanager
+def _timed(name: str, stats: RequestStats):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        SPANS.observe(time.perf_counter() - started, stats.route, name)
+
+
+def span(name: str):
+    """Mide un tramo dentro de la petición en curso (no-op si está desactivado)."""
+    if not METRICS_ENABLED:
+        return _noop()
+    stats = _current.get()
+    if stats is None:
+        return _noop()
+    return _timed(name, stats)
+
+
+def _before_cursor_execute(_conn, _cursor, _statement, _parameters, context, _executemany):
+    # en el contexto de la ejecución: si la consulta falla se descarta con él
+    if context is not None:
+        context._vital_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(_conn, _cursor, _statement, _parameters, context, _executemany):
+    started = getattr(context, "_vital_query_start", None)
+    stats = _current.get()
+    if stats is not None and started is not None:
+        stats.queries += 1
+        stats.query_seconds += time.perf_counter() - started
+
+
+def instrument_engine(engine):
+    """Cuenta consultas y tiempo SQL de cada petición (solo con METRICS=1)."""
+    if not METRICS_ENABLED:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: latencia, código, bytes y SQL por plantilla de ruta."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _route_for(self, scope) -> str:
+        for route in scope["app"].router.routes:
+            match, _child = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", scope["path"])
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats(self._route_for(scope))
+        token = _current.set(stats)
+        status = {"code": 500, "bytes": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                status["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            method = scope["method"]
+            REQUESTS.inc(1, method, stats.route, str(status["code"]))
+            LATENCY.observe(elapsed, method, stats.route)
+            QUERIES.observe(stats.queries, stats.route)
+            QUERY_TIME.observe(stats.query_seconds, stats.route)
+            BYTES.observe(status["bytes"], stats.route)
+
+
+def render() -> str:
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
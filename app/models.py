@@ -1,6 +1,8 @@
 from typing import Optional, Dict
-from sqlmodel import SQLModel, Field, Column, JSON
-from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import SQLModel, Field, Column, JSON, Index
+from datetime import datetime, timezone
 
 class Survey(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -9,9 +11,154 @@ class Survey(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Response(SQLModel, table=True):
+    # status + created_at: filtros y orden de /responses, counts y export
+    # status + id: paginación por clave de /pending (after_id)
+    # updated_at: sondeo incremental de /pending (updated_since)
+    # status + lang / codigo_postal: filtros y agrupaciones sin leer el JSON
+    # survey_id + status + id: colas y archivado por encuesta (exposición)
+    __table_args__ = (
+        Index("ix_response_status_created_at", "status", "created_at"),
+        Index("ix_response_status_id", "status", "id"),
+        Index("ix_response_updated_at", "updated_at"),
+        Index("ix_response_status_lang", "status", "lang"),
+        Index("ix_response_status_codigo_postal", "status", "codigo_postal"),
+        Index("ix_response_survey_status_id", "survey_id", "status", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     survey_id: int
-    payload_json: Dict = Field(sa_column=Column(JSON))
+    # JSON en SQLite, JSONB en PostgreSQL
+    payload_json: Dict = Field(sa_column=Column(JSON().with_variant(JSONB(), "postgresql")))
     status: str = "pending"  # 'pending'|'approved'|'rejected'
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # se actualiza al moderar; en filas antiguas se rellena con created_at
+    updated_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
+    # copias desnormalizadas de campos del payload (ver payload_columns)
+    codigo_postal: Optional[str] = Field(default=None, max_length=10)
+    genero: Optional[str] = Field(default=None, max_length=40)
+    personaje_importante: Optional[str] = Field(default=None, max_length=80)
+    lang: Optional[str] = Field(default=None, max_length=8)
+    edad: Optional[int] = None
+
+
+class ChangeLog(SQLModel, table=True):
+    """Registro de escrituras compartido por todos los workers.
+
+    Cada escritura añade una fila en la misma transacción; `seq` es la versión
+    global con la que cada proceso pone al día sus agregados en memoria.
+    `kind` coincide con el nombre del evento SSE correspondiente, salvo
+    response.archived: cada lote archivado se anuncia con un responses.archived.
+    """
+    __tablename__ = "change_log"
+
+    seq: Optional[int] = Field(default=None, primary_key=True)
+    # response.created | response.moderated | response.archived | responses.archived
+    # | responses.reset | aggregates.reseed
+    kind: str
+    response_id: Optional[int] = None
+    status: Optional[str] = None
+    previous: Optional[str] = None
+    codigo_postal: Optional[str] = None
+    origin: Optional[str] = None  # proceso que escribió (sus eventos ya se publicaron)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ResponseRollup(SQLModel, table=True):
+    """Conteo de aprobadas por tramo de 5 minutos × CP × género × personaje.
+
+    Se mantiene en la misma transacción que la moderación (app/rollups.py).
+    Los valores ausentes se guardan como "" para que la clave única funcione
+    (NULL nunca colisiona en un índice único).
+    """
+    __tablename__ = "response_rollup"
+    __table_args__ = (
+        Index("ux_rollup_key", "bucket_start", "codigo_postal", "genero", "personaje_importante", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    bucket_start: datetime
+    codigo_postal: str = Field(default="", max_length=10)
+    genero: str = Field(default="", max_length=40)
+    personaje_importante: str = Field(default="", max_length=80)
+    count: int = 0
+
+
+class ResponseArchive(SQLModel, table=True):
+    """Respuestas retiradas de `response` (app/archive.py).
+
+    Mismas columnas que Response y el mismo id, más cuándo y por qué se
+    archivó. Puede vivir en la misma base o en otra (ARCHIVE_DATABASE_URL),
+    incluso un fichero SQLite por encuesta. SQLite reutiliza los ids más
+    altos tras un borrado, así que una respuesta archivada se identifica
+    por (id, created_at) y la clave propia es `archive_id`.
+    """
+    __tablename__ = "response_archive"
+    __table_args__ = (
+        Index("ux_archive_response", "id", "created_at", unique=True),
+        Index("ix_archive_survey_status_created_at", "survey_id", "status", "created_at"),
+        Index("ix_archive_archived_at", "archived_at"),
+    )
+
+    archive_id: Optional[int] = Field(default=None, primary_key=True)
+    id: int
+    survey_id: int
+    payload_json: Dict = Field(sa_column=Column(JSON().with_variant(JSONB(), "postgresql")))
+    status: str
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    codigo_postal: Optional[str] = Field(default=None, max_length=10)
+    genero: Optional[str] = Field(default=None, max_length=40)
+    personaje_importante: Optional[str] = Field(default=None, max_length=80)
+    lang: Optional[str] = Field(default=None, max_length=8)
+    edad: Optional[int] = None
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
+    reason: Optional[str] = Field(default=None, max_length=40)  # rejected | aged | survey | manual | reset
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Las fechas se guardan en UTC sin zona (datetime.utcnow): convierte a
+    ese formato las que llegan con zona en filtros y cursores."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# campos del payload que se copian a columnas propias
+PAYLOAD_COLUMNS = ("codigo_postal", "genero", "personaje_importante", "lang", "edad")
+
+
+def _first_text(value, limit: int) -> Optional[str]:
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text[:limit] or None
+
+
+def payload_columns(payload: Optional[Dict]) -> Dict:
+    """Valores de las columnas desnormalizadas a partir del payload."""
+    payload = payload or {}
+    postal = _first_text(payload.get("codigo_postal"), 10)
+    if postal and len(postal) == 4:
+        postal = postal.zfill(5)
+    try:
+        edad = int(float(payload.get("edad")))
+    except (TypeError, ValueError, OverflowError):
+        edad = None
+    if edad is not None and not -2 ** 63 <= edad < 2 ** 63:
+        edad = None  # no cabe en la columna INTEGER
+    return {
+        "codigo_postal": postal,
+        "genero": _first_text(payload.get("genero"), 40),
+        "personaje_importante": _first_text(payload.get("personaje_importante"), 80),
+        "lang": _first_text(payload.get("__lang"), 8),
+        "edad": edad,
+    }
+
 
+@event.listens_for(Response, "before_insert")
+@event.listens_for(Response, "before_update")
+def _sync_payload_columns(_mapper, _connection, target: Response):
+    for key, value in payload_columns(target.payload_json).items():
+        setattr(target, key, value)
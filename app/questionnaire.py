@@ -0,0 +1,273 @@
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.cache import file_cached
+
+try:
+    import brotli
+except ImportError:  # dependencia opcional: pip install brotli
+    brotli = None
+
+# questions.json compilado una sola vez (y de nuevo si cambia su mtime):
+#   - un bundle JSON minificado por idioma, con hash de contenido, que el
+#     kiosco cachea para siempre (/api/questionnaire/{lang}.{hash}.json)
+#   - las tablas que usan el resto de módulos (etiquetas, orden, tipos)
+#   - el validador que normaliza cada payload al recibirlo
+# PAYLOAD_VALIDATION: "lenient" (por defecto) normaliza y descarta lo inválido
+# sin rechazar, para no perder envíos de kioscos con un bundle anterior;
+# "strict" rechaza con 422; "off" guarda el payload tal cual.
+QUESTIONS_PATH = Path(__file__).resolve().parent / "static" / "questions.json"
+PAYLOAD_VALIDATION = os.getenv("PAYLOAD_VALIDATION", "lenient")
+BUNDLE_URL = "/api/questionnaire"
+PREFERRED_LANGS = ("es", "eu", "en")
+POSTAL_FIELD = "codigo_postal"
+# clave que marca un payload ya normalizado (su valor es la versión compilada)
+SCHEMA_KEY = "__schema"
+
+
+class PayloadError(ValueError):
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+class FieldSpec:
+    __slots__ = ("id", "type", "required", "multi", "min", "max", "max_length", "values", "labels", "by_label")
+
+    def __init__(self, raw: Dict):
+        self.id = raw["id"]
+        self.type = raw.get("type") or "text"
+        self.required = bool(raw.get("required"))
+        self.multi = bool(raw.get("multi"))
+        self.min = raw.get("min", 1)
+        self.max = raw.get("max")
+        self.max_length = raw.get("maxLength")
+        self.values = tuple(str(o["value"]) for o in raw.get("options") or [] if o.get("value") is not None)
+        # {lang: {valor: etiqueta}} y {etiqueta en minúsculas de cualquier idioma: valor}
+        self.labels: Dict[str, Dict[str, str]] = {}
+        self.by_label: Dict[str, str] = {}
+
+    @property
+    def kind(self) -> str:
+        if self.type in ("number", "rating"):
+            return "int"
+        if self.type == "chips" and self.multi:
+            return "list"
+        return "str"
+
+    @property
+    def has_options(self) -> bool:
+        return self.type in ("select", "chips")
+
+
+class Questionnaire:
+    def __init__(self, data: Dict):
+        self.survey_id = data.get("survey_id", 1)
+        self.title = data.get("title") or {}
+        steps_by_lang = data.get("steps") or {}
+        self.languages = [l for l in data.get("languages") or [] if l.get("code") in steps_by_lang]
+        self.codes = [l["code"] for l in self.languages] or list(steps_by_lang)
+        self.default_lang = next((code for code in PREFERRED_LANGS if code in steps_by_lang), None)
+        if self.default_lang is None and steps_by_lang:
+            self.default_lang = next(iter(steps_by_lang))
+
+        self.fields: Dict[str, FieldSpec] = {}
+        self.question_labels: Dict[str, Dict[str, str]] = {}
+        # pasos en el orden del idioma principal: (id, [campos], jump_if)
+        self.steps = []
+        for lang in [self.default_lang] + [code for code in steps_by_lang if code != self.default_lang]:
+            if lang is None:
+                continue
+            question_labels = self.question_labels.setdefault(lang, {})
+            for step in steps_by_lang.get(lang, []):
+                members = step.get("fields", []) if step.get("type") == "form" else [step]
+                if step.get("comment_field"):
+                    members = members + [step["comment_field"]]
+                ids = []
+                for raw in members:
+                    if not raw.get("id"):
+                        continue
+                    spec = self.fields.get(raw["id"])
+                    if spec is None:
+                        spec = self.fields[raw["id"]] = FieldSpec(raw)
+                    ids.append(spec.id)
+                    if raw.get("label"):
+                        question_labels.setdefault(spec.id, raw["label"])
+                    for option in raw.get("options") or []:
+                        if option.get("value") is None:
+                            continue
+                        value = str(option["value"])
+                        spec.labels.setdefault(lang, {})[value] = option.get("label") or value
+                        if option.get("label"):
+                            spec.by_label.setdefault(str(option["label"]).strip().lower(), value)
+                if lang == self.default_lang and step.get("id"):
+                    self.steps.append((step["id"], ids, step.get("jump_if")))
+
+        minified = {}
+        for code in self.codes:
+            bundle = {
+                "survey_id": self.survey_id,
+                "title": self.title,
+                "languages": self.languages,
+                "lang": code,
+                "steps": steps_by_lang.get(code, []),
+            }
+            minified[code] = json.dumps(bundle, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.bundles = minified
+        self.bundle_hashes = {code: hashlib.sha256(body).hexdigest()[:10] for code, body in minified.items()}
+        self.version = hashlib.sha256(b"".join(minified[code] for code in sorted(minified))).hexdigest()[:10]
+        self.compressed = {code: {"gzip": gzip.compress(body, compresslevel=9, mtime=0)} for code, body in minified.items()}
+        if brotli is not None:
+            for code, body in minified.items():
+                self.compressed[code]["br"] = brotli.compress(body, quality=11)
+
+    # --- tablas derivadas para el resto de módulos ---
+
+    def bundle_url(self, code: str) -> str:
+        return f"{BUNDLE_URL}/{code}.{self.bundle_hashes[code]}.json"
+
+    def manifest(self) -> Dict:
+        return {
+            "version": self.version,
+            "survey_id": self.survey_id,
+            "title": self.title,
+            "languages": [{**lang, "url": self.bundle_url(lang["code"])} for lang in self.languages],
+        }
+
+    def option_labels(self, field_id: str) -> Dict[str, Dict[str, str]]:
+        spec = self.fields.get(field_id)
+        return spec.labels if spec else {}
+
+    def field_order(self) -> List[str]:
+        return list(self.fields)
+
+    def kinds(self) -> Dict[str, str]:
+        return {field_id: spec.kind for field_id, spec in self.fields.items()}
+
+    # --- validación ---
+
+    def _option_value(self, spec: FieldSpec, raw) -> Optional[str]:
+        text = str(raw).strip()
+        if text in spec.values:
+            return text
+        # clientes antiguos enviaban etiquetas en lugar de valores
+        return spec.by_label.get(text.lower())
+
+    def _normalize_field(self, spec: FieldSpec, raw, errors: List[str]):
+        if raw is None or (isinstance(raw, str) and not raw.strip()) or raw == []:
+            return None
+        if spec.type in ("number", "rating"):
+            try:
+                number = int(float(raw))
+            except (TypeError, ValueError, OverflowError):
+                errors.append(f"{spec.id}: no es un número")
+                return None
+            if (spec.min is not None and number < spec.min) or (spec.max is not None and number > spec.max):
+                errors.append(f"{spec.id}: fuera de rango {spec.min}-{spec.max}")
+                return None
+            return number
+        if spec.has_options:
+            items = raw if isinstance(raw, list) else [raw]
+            if not spec.multi and len(items) > 1:
+                errors.append(f"{spec.id}: admite una sola opción")
+                return None
+            values = []
+            for item in items:
+                value = self._option_value(spec, item)
+                if value is None:
+                    errors.append(f"{spec.id}: opción desconocida {item!r}")
+                elif value not in values:
+                    values.append(value)
+            if not values:
+                return None
+            return values if spec.multi else values[0]
+        if isinstance(raw, (list, dict)):
+            errors.append(f"{spec.id}: se esperaba texto")
+            return None
+        text = str(raw).strip()
+        if spec.id == POSTAL_FIELD:
+            text = text.upper()
+            if len(text) == 4 and text.isdigit():
+                text = text.zfill(5)
+        if spec.max_length:
+            text = text[: spec.max_length]
+        return text or None
+
+    def normalize(self, payload, mode: str = PAYLOAD_VALIDATION) -> Dict:
+        """Payload canónico: solo campos conocidos, valores de opción (no
+        etiquetas), números como int, textos recortados, sin las respuestas de
+        pasos saltados por jump_if y con `_labels`/`__labels` en su idioma.
+        Con mode="strict" lanza PayloadError si algo no es válido."""
+        if mode == "off" or not self.fields:
+            return payload
+        if not isinstance(payload, dict):
+            raise PayloadError(["payload debe ser un objeto"])
+        errors: List[str] = []
+        lang = payload.get("__lang") or self.default_lang
+        if lang not in self.codes:
+            errors.append(f"__lang: idioma desconocido {lang!r}")
+            lang = self.default_lang
+
+        values = {}
+        skip_until = None
+        step_ids = [step_id for step_id, _ids, _jump in self.steps]
+        for step_id, ids, jump in self.steps:
+            if skip_until is not None:
+                if step_id != skip_until:
+                    continue
+                skip_until = None
+            for field_id in ids:
+                spec = self.fields[field_id]
+                reported = len(errors)
+                value = self._normalize_field(spec, payload.get(field_id), errors)
+                if value is None:
+                    if spec.required and len(errors) == reported:
+                        errors.append(f"{field_id}: obligatorio")
+                    continue
+                values[field_id] = value
+            if jump and jump.get("target") in step_ids:
+                answer = values.get(step_id)
+                expected = jump.get("value")
+                expected = expected if isinstance(expected, list) else [expected]
+                answers = answer if isinstance(answer, list) else [answer]
+                if any(item in expected for item in answers):
+                    skip_until = jump["target"]
+
+        if errors and mode == "strict":
+            raise PayloadError(errors)
+
+        normalized = {"__lang": lang}
+        question_labels = self.question_labels.get(lang, {})
+        labels = {}
+        for field_id, value in values.items():
+            normalized[field_id] = value
+            spec = self.fields[field_id]
+            if spec.has_options:
+                option_labels = spec.labels.get(lang, {})
+                if isinstance(value, list):
+                    normalized[f"{field_id}_labels"] = [option_labels.get(v, v) for v in value]
+                else:
+                    normalized[f"{field_id}_labels"] = option_labels.get(value, value)
+            if field_id in question_labels:
+                labels[field_id] = question_labels[field_id]
+        normalized["__labels"] = labels
+        normalized[SCHEMA_KEY] = self.version
+        return normalized
+
+
+@file_cached(QUESTIONS_PATH)
+def compiled() -> Questionnaire:
+    """Cuestionario compilado; vacío (sin validación) si no se puede leer."""
+    try:
+        data = json.loads(QUESTIONS_PATH.read_text(encoding="utf-8"))
+    except Exception:
+        data = {}
+    return Questionnaire(data)
+
+
+def is_normalized(payload: Optional[Dict]) -> bool:
+    return bool(payload) and SCHEMA_KEY in payload
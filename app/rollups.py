@@ -0,0 +1,146 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlmodel import Session
+
+from app.models import Response, ResponseArchive, ResponseRollup
+
+# Tablas de resumen para /api/visual/timeline: aprobadas por tramo de
+# ROLLUP_SECONDS × CP × género × personaje. Los pasos mayores (15 min, 1 h,
+# 1 día) se agregan al consultar sobre el índice de bucket_start.
+ROLLUP_SECONDS = 300
+ROLLUP_DIMENSIONS = ("codigo_postal", "genero", "personaje_importante")
+REBUILD_BATCH = 2000
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def bucket_start(value: datetime, seconds: int = ROLLUP_SECONDS) -> datetime:
+    offset = int((value - _EPOCH).total_seconds()) // seconds * seconds
+    return _EPOCH + timedelta(seconds=offset)
+
+
+def _key(row: Response) -> Tuple:
+    return (
+        bucket_start(row.created_at),
+        row.codigo_postal or "",
+        row.genero or "",
+        row.personaje_importante or "",
+    )
+
+
+def _upsert(session: Session, deltas: Counter):
+    """Suma `deltas` a sus filas: INSERT ... ON CONFLICT en SQLite/PostgreSQL."""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    table = ResponseRollup.__table__
+    values = [
+        {"bucket_start": key[0], "codigo_postal": key[1], "genero": key[2], "personaje_importante": key[3], "count": delta}
+        for key, delta in deltas.items()
+    ]
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["bucket_start", *ROLLUP_DIMENSIONS],
+            set_={"count": table.c.count + stmt.excluded.count},
+        )
+        session.execute(stmt, values)
+        return
+    # otros motores: leer y actualizar fila a fila
+    for value in values:
+        existing = session.execute(
+            select(ResponseRollup).where(
+                ResponseRollup.bucket_start == value["bucket_start"],
+                *(getattr(ResponseRollup, dim) == value[dim] for dim in ROLLUP_DIMENSIONS),
+            )
+        ).scalars().first()
+        if existing:
+            existing.count += value["count"]
+            session.add(existing)
+        else:
+            session.add(ResponseRollup(**value))
+
+
+def apply_moderation(session: Session, changes: Iterable[Tuple[Response, Optional[str], str]]):
+    """Actualiza los resúmenes con (fila, estado anterior, estado nuevo).
+
+    Solo cuentan las aprobadas: aprobar suma uno, des-aprobar lo resta. Va en
+    la transacción de la moderación, así que no puede quedar desfasado.
+    """
+    deltas = Counter()
+    for row, previous, status in changes:
+        was, now = previous == "approved", status == "approved"
+        if was != now:
+            deltas[_key(row)] += 1 if now else -1
+    _upsert(session, deltas)
+
+
+def clear(session: Session):
+    session.execute(delete(ResponseRollup))
+
+
+def _approved_deltas(session: Session, table, last_id: int):
+    key = next(iter(table.primary_key.columns))  # id en response, archive_id en el archivo
+    rows = session.execute(
+        select(key, table.c.created_at, *(table.c[dim] for dim in ROLLUP_DIMENSIONS))
+        .where(table.c.status == "approved", key > last_id)
+        .order_by(key)
+        .limit(REBUILD_BATCH)
+    ).all()
+    deltas = Counter(
+        (bucket_start(created_at), cp or "", genero or "", personaje or "")
+        for _id, created_at, cp, genero, personaje in rows
+    )
+    return rows, deltas
+
+
+def rebuild(engine, archives=()) -> int:
+    """Recalcula los resúmenes desde `response` (bases previas, datos
+    sintéticos) y desde los engines de `archives`: archivar no descuenta del
+    timeline, así que las aprobadas archivadas también cuentan."""
+    sources = [(engine, Response.__table__)] + [(archive, ResponseArchive.__table__) for archive in archives]
+    total = 0
+    with Session(engine) as s:
+        clear(s)
+        for source, table in sources:
+            with Session(source) as reader:
+                read = s if source is engine else reader
+                last_id = 0
+                while True:
+                    rows, deltas = _approved_deltas(read, table, last_id)
+                    if not rows:
+                        break
+                    _upsert(s, deltas)
+                    total += len(rows)
+                    last_id = rows[-1][0]
+        s.commit()
+    return total
+
+
+def window_query(start: datetime, end: datetime, dims=ROLLUP_DIMENSIONS):
+    """Filas (bucket_start, *dims, count) en [start, end) con un rango sobre el índice."""
+    columns = [getattr(ResponseRollup, dim) for dim in dims]
+    return (
+        select(ResponseRollup.bucket_start, *columns, func.sum(ResponseRollup.count))
+        .where(ResponseRollup.bucket_start >= start, ResponseRollup.bucket_start < end)
+        .group_by(ResponseRollup.bucket_start, *columns)
+        .order_by(ResponseRollup.bucket_start)
+    )
+
+
+def before_query(start: datetime, dims=ROLLUP_DIMENSIONS):
+    """Acumulado por clave antes de `start` (base del modo acumulativo)."""
+    columns = [getattr(ResponseRollup, dim) for dim in dims]
+    return (
+        select(*columns, func.sum(ResponseRollup.count))
+        .where(ResponseRollup.bucket_start < start)
+        .group_by(*columns)
+    )
@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Response as FastResponse
-from sqlmodel import SQLModel, Session, select, delete
-from app.models import Response
-import csv, io, json
-from datetime import datetime, timezone
-from pathlib import Path
-from functools import lru_cache
-
-BASE_PATH = Path(__file__).resolve().parents[2]
-QUESTIONS_PATH = BASE_PATH / "app" / "static" / "questions.json"
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import true
+from sqlmodel import SQLModel, Session, select, delete, func, update
+from app import aggregates, archive, columnar, events, geometry, questionnaire, rollups
+from app.cache import file_cached
+from app.concurrency import fetch_all
+from app.fastjson import FastJSONResponse
+from app.models import Response, ResponseArchive, naive_utc
+from app.writer import writer
+import csv, io, json, os, tempfile, time, zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
@@ -20,81 +23,156 @@ def _normalize_value(val):
         return json.dumps(val, ensure_ascii=False)
     return val
 
-@lru_cache(maxsize=1)
+@file_cached(questionnaire.QUESTIONS_PATH)
 def _field_info():
     """Devuelve (orden, labels) basado en el archivo de preguntas."""
-    order = []
-    labels = {}
-    try:
-        data = json.loads(QUESTIONS_PATH.read_text(encoding="utf-8"))
-    except Exception:
-        return order, labels
-    steps_by_lang = data.get("steps") or {}
-    preferred_lang = None
-    for lang in ("es", "eu", "en"):
-        if lang in steps_by_lang:
-            preferred_lang = lang
-            break
-    if not preferred_lang and steps_by_lang:
-        preferred_lang = next(iter(steps_by_lang.keys()))
-    steps = steps_by_lang.get(preferred_lang, [])
-
-    def register(field_id, label):
-        if not field_id:
-            return
-        if field_id not in order:
-            order.append(field_id)
-        if label and field_id not in labels:
-            labels[field_id] = label
-
-    for step in steps:
-        if step.get("type") == "form":
-            for sub in step.get("fields", []):
-                register(sub.get("id"), sub.get("label"))
-        else:
-            register(step.get("id"), step.get("label"))
-        comment = step.get("comment_field")
-        if comment:
-            register(comment.get("id"), comment.get("label"))
-    register("__lang", "Idioma / Language")
+    compiled = questionnaire.compiled()
+    order = compiled.field_order() + ["__lang"]
+    labels = dict(compiled.question_labels.get(compiled.default_lang) or {})
+    labels["__lang"] = "Idioma / Language"
     return order, labels
 
+# Paginación de la cola de moderación
+PENDING_PAGE_SIZE = int(os.getenv("PENDING_PAGE_SIZE", "200"))
+PENDING_MAX_LIMIT = 500
+# margen al filtrar por updated_since: cubre transacciones que se confirman
+# con una marca anterior a la de la consulta previa (el panel deduplica por id)
+UPDATED_SINCE_OVERLAP = timedelta(seconds=2)
+
+def _pending_item(r: Response):
+    return {
+        "id": r.id,
+        "payload": r.payload_json,
+        "created_at": r.created_at.isoformat(timespec="seconds"),
+        "survey_id": r.survey_id,
+        "status": r.status,
+    }
+
 @router.get("/pending")
-def pending():
+async def pending(
+    after_id: Optional[int] = None,
+    limit: int = PENDING_PAGE_SIZE,
+    lang: Optional[str] = None,
+    survey_id: Optional[int] = None,
+    updated_since: Optional[datetime] = None,
+):
+    """Cola de moderación en orden de llegada, paginada por id.
+
+    - `after_id`: continúa tras el último id recibido (la cabecera X-Next-Cursor
+      trae la query de la página siguiente).
+    - `updated_since`: solo filas nuevas o modificadas desde esa marca
+      (cabecera X-Updated-Until de la llamada anterior). En ese modo también
+      se devuelven las que salieron de la cola, sin payload y con su estado,
+      para que el panel las quite.
+    """
+    limit = max(1, min(limit, PENDING_MAX_LIMIT))
+    filters = _export_filters("all", None, None, lang, survey_id)
+    if after_id is not None:
+        filters.append(Response.id > after_id)
+    if updated_since is not None:
+        updated_since = naive_utc(updated_since)
+        filters.append(Response.updated_at > updated_since - UPDATED_SINCE_OVERLAP)
+    else:
+        filters.append(Response.status == "pending")
+    until = datetime.utcnow()
+    rows = await fetch_all(select(Response).where(*filters).order_by(Response.id.asc()).limit(limit))
+    items = []
+    for r in rows:
+        if r.status == "pending":
+            items.append(_pending_item(r))
+        else:
+            items.append({"id": r.id, "status": r.status})
+    headers = {"X-Updated-Until": until.isoformat()}
+    if len(rows) == limit:
+        headers["X-Next-Cursor"] = f"after_id={rows[-1].id}"
+    return FastJSONResponse(items, headers=headers)
+
+@router.get("/writer")
+def writer_stats():
+    """Configuración y métricas del group commit de POST /api/responses."""
+    return writer.stats()
+
+@router.post("/geometry/reload")
+def reload_geometry(force: bool = False):
+    """Recarga el índice de CP (zipcode_pix.csv) y recalcula las posiciones
+    de los agregados sin reiniciar el servidor."""
+    index = geometry.reload_index(force=force)
+    # los demás workers resiembran al leer esta entrada de change_log
     with Session(SQLModel.engine) as s:
-        rows = s.exec(select(Response).where(Response.status == "pending").order_by(Response.created_at.asc())).all()
-        return [
-            {
-                "id": r.id,
-                "payload": r.payload_json,
-                "created_at": r.created_at.isoformat(timespec="seconds"),
-                "survey_id": r.survey_id,
-            }
-            for r in rows
-        ]
+        aggregates.log_change(s, "aggregates.reseed")
+        s.commit()
+    aggregates.sync(SQLModel.engine)
+    return {"ok": True, **index.stats()}
+
+@router.post("/rollups/rebuild")
+def rebuild_rollups():
+    """Recalcula response_rollup (timeline) desde las respuestas aprobadas,
+    activas y archivadas."""
+    rows = rollups.rebuild(SQLModel.engine, archive.engines(SQLModel.engine))
+    # nueva versión para que los ETag de /api/visual/timeline caduquen
+    with Session(SQLModel.engine) as s:
+        aggregates.log_change(s, "aggregates.reseed")
+        s.commit()
+    aggregates.sync(SQLModel.engine)
+    return {"ok": True, "approved": rows}
 
 @router.get("/fields")
 def fields():
     order, labels = _field_info()
     return {"order": order, "labels": labels}
 
+# Caché corta de /counts: se invalida en cuanto hay una escritura.
+COUNTS_TTL_SECONDS = float(os.getenv("COUNTS_TTL_SECONDS", "5"))
+_counts_cache = {"version": None, "expires": 0.0, "value": None}
+
+
+def _counts_query():
+    """Un único COUNT/MAX agrupado por estado (usa ix_response_status_created_at)."""
+    return select(Response.status, func.count(), func.max(Response.created_at)).group_by(Response.status)
+
+
+def _counts_from_rows(rows):
+    by_status = {status: (count, latest) for status, count, latest in rows}
+    last_approved = by_status.get("approved", (0, None))[1]
+    return {
+        "total": sum(count for count, _latest in by_status.values()),
+        "approved": by_status.get("approved", (0, None))[0],
+        "pending": by_status.get("pending", (0, None))[0],
+        "rejected": by_status.get("rejected", (0, None))[0],
+        "last_approved_at": last_approved.replace(tzinfo=timezone.utc).isoformat() if last_approved else None,
+    }
+
+
+def _store_counts(version, value):
+    _counts_cache.update(version=version, expires=time.monotonic() + COUNTS_TTL_SECONDS, value=value)
+    return value
+
+
 @router.get("/counts")
-def counts():
-    with Session(SQLModel.engine) as s:
-        total = s.exec(select(Response)).all()
-        approved = [r for r in total if r.status == "approved"]
-        pending = [r for r in total if r.status == "pending"]
-        rejected = [r for r in total if r.status == "rejected"]
-        last_approved_at = None
-        if approved:
-            last_approved_at = max(a.created_at for a in approved).replace(tzinfo=timezone.utc).isoformat()
-        return {
-            "total": len(total),
-            "approved": len(approved),
-            "pending": len(pending),
-            "rejected": len(rejected),
-            "last_approved_at": last_approved_at
-        }
+async def counts():
+    version = aggregates.write_version()
+    cached = _counts_cache
+    if cached["version"] == version and time.monotonic() < cached["expires"]:
+        return cached["value"]
+    return _store_counts(version, _counts_from_rows(await fetch_all(_counts_query())))
+
+BREAKDOWN_FIELDS = ("lang", "genero", "personaje_importante", "codigo_postal", "edad")
+
+@router.get("/breakdown")
+async def breakdown(field: str = "lang", status: str = "approved", limit: int = 100):
+    """Recuento por valor de una columna desnormalizada, agrupado en SQL."""
+    if field not in BREAKDOWN_FIELDS:
+        raise HTTPException(status_code=400, detail=f"field debe ser uno de {', '.join(BREAKDOWN_FIELDS)}")
+    column = getattr(Response, field)
+    filters = _export_filters(status, None, None, None)
+    rows = await fetch_all(
+        select(column, func.count())
+        .where(*filters)
+        .group_by(column)
+        .order_by(func.count().desc())
+        .limit(max(1, min(limit, 1000)))
+    )
+    return {"field": field, "status": status, "items": [{"value": value, "count": count} for value, count in rows]}
 
 @router.patch("/moderate/{response_id}")
 def moderate(response_id: int, action: str):
@@ -103,38 +181,284 @@ def moderate(response_id: int, action: str):
         r = s.get(Response, response_id)
         if not r:
             return {"ok": False}
+        previous = r.status
         r.status = new_status
+        r.updated_at = datetime.utcnow()
         s.add(r)
+        aggregates.log_change(s, "response.moderated", r, previous)
+        rollups.apply_moderation(s, [(r, previous, new_status)])
         s.commit()
+        s.refresh(r)
+        aggregates.sync(SQLModel.engine, known={r.id: r})
+        events.publish("response.moderated", {
+            "id": r.id,
+            "status": r.status,
+            "previous": previous,
+            "codigo_postal": (r.payload_json or {}).get("codigo_postal"),
+        })
     return {"ok": True}
 
+# Moderación en bloque: un UPDATE ... WHERE id IN (...) por tramo dentro de
+# una sola transacción (los tramos respetan el límite de variables de SQLite)
+BULK_MODERATE_MAX = int(os.getenv("BULK_MODERATE_MAX", "5000"))
+BULK_MODERATE_CHUNK = 500
+
+def _int_param(value, name: str) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise HTTPException(status_code=400, detail=f"{name} debe ser un entero")
+
+def _bulk_targets(s: Session, data: Dict, new_status: str) -> List[Response]:
+    """Filas afectadas por `ids` o por `filter` (status, older_than, lang, survey_id)."""
+    ids = data.get("ids")
+    flt = data.get("filter")
+    if ids is not None:
+        try:
+            ids = sorted({int(i) for i in ids})
+        except (TypeError, ValueError, OverflowError):
+            raise HTTPException(status_code=400, detail="ids debe ser una lista de enteros")
+        if len(ids) > BULK_MODERATE_MAX:
+            raise HTTPException(status_code=400, detail=f"máximo {BULK_MODERATE_MAX} ids por petición")
+        rows = []
+        for offset in range(0, len(ids), BULK_MODERATE_CHUNK):
+            chunk = ids[offset:offset + BULK_MODERATE_CHUNK]
+            rows.extend(s.exec(select(Response).where(Response.id.in_(chunk), Response.status != new_status)).all())
+        return rows
+    if not isinstance(flt, dict):
+        raise HTTPException(status_code=400, detail="se necesita ids o filter")
+    filters = _export_filters(flt.get("status") or "pending", None, None, flt.get("lang"))
+    filters.append(Response.status != new_status)
+    if flt.get("older_than"):
+        try:
+            older_than = datetime.fromisoformat(str(flt["older_than"]).replace("Z", "+00:00"))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="older_than no es una fecha ISO")
+        older_than = naive_utc(older_than)
+        filters.append(Response.created_at < older_than)
+    if flt.get("survey_id") is not None:
+        filters.append(Response.survey_id == _int_param(flt["survey_id"], "survey_id"))
+    return s.exec(select(Response).where(*filters).order_by(Response.id).limit(BULK_MODERATE_MAX)).all()
+
+@router.post("/moderate")
+def moderate_bulk(data: Dict):
+    """Aprueba o rechaza varias respuestas en una transacción.
+
+    Cuerpo: {"action": "approve"|"reject", "ids": [...]} o
+    {"action": ..., "filter": {"status": "pending", "older_than": ISO, "lang": "eu", "survey_id": 1}}.
+    Devuelve los ids cambiados y los contadores ya actualizados.
+    """
+    action = data.get("action")
+    if action not in ("approve", "reject"):
+        raise HTTPException(status_code=400, detail="action debe ser approve o reject")
+    new_status = "approved" if action == "approve" else "rejected"
+    now = datetime.utcnow()
+    with Session(SQLModel.engine, expire_on_commit=False) as s:
+        rows = _bulk_targets(s, data, new_status)
+        previous = {r.id: r.status for r in rows}
+        ids = sorted(previous)
+        for offset in range(0, len(ids), BULK_MODERATE_CHUNK):
+            chunk = ids[offset:offset + BULK_MODERATE_CHUNK]
+            s.exec(
+                update(Response)
+                .where(Response.id.in_(chunk))
+                .values(status=new_status, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+        for r in rows:
+            aggregates.log_change(s, "response.moderated", r, previous[r.id], status=new_status)
+        rollups.apply_moderation(s, [(r, previous[r.id], new_status) for r in rows])
+        s.commit()
+    for r in rows:
+        r.status = new_status
+        r.updated_at = now
+    aggregates.sync(SQLModel.engine, known={r.id: r for r in rows})
+    for r in rows:
+        events.publish("response.moderated", {
+            "id": r.id,
+            "status": r.status,
+            "previous": previous[r.id],
+            "codigo_postal": (r.payload_json or {}).get("codigo_postal"),
+        })
+    with Session(SQLModel.engine) as s:
+        current = _store_counts(aggregates.write_version(), _counts_from_rows(s.exec(_counts_query()).all()))
+    return {"ok": True, "status": new_status, "updated": len(ids), "ids": ids, "counts": current}
+
 @router.delete("/reset")
-def reset():
-    """Borra TODAS las respuestas (no elimina tablas)."""
+def reset(archive_first: bool = False):
+    """Borra TODAS las respuestas (no elimina tablas). Con `archive_first=true`
+    antes las pasa al archivo, que sigue siendo exportable."""
+    archived = archive.move(SQLModel.engine, [], "reset", limit=None) if archive_first else 0
     with Session(SQLModel.engine) as s:
         s.exec(delete(Response))
+        rollups.clear(s)
+        aggregates.log_change(s, "responses.reset")
         s.commit()
-    return {"ok": True, "cleared": True}
+    aggregates.sync(SQLModel.engine)
+    events.publish("responses.reset")
+    return {"ok": True, "cleared": True, "archived": archived}
 
-@router.get("/export.csv")
-def export_csv():
-    """Exporta respuestas aprobadas a CSV."""
-    with Session(SQLModel.engine) as s:
-        rows = s.exec(select(Response).where(Response.status == "approved").order_by(Response.created_at.asc())).all()
+@router.get("/archive")
+def archive_stats():
+    """Filas activas y archivadas por encuesta y estado, y la última pasada."""
+    return archive.stats(SQLModel.engine)
+
+@router.post("/archive")
+def archive_now(data: Dict):
+    """Archiva ya un conjunto de respuestas (p. ej. una exposición terminada).
+
+    Cuerpo: {"survey_id": 1, "statuses": ["approved", "rejected"], "older_than": ISO}.
+    Hace falta `survey_id` u `older_than`; sin `statuses` se archiva todo lo
+    que cumpla el resto, también lo pendiente.
+    """
+    filters = []
+    if data.get("survey_id") is not None:
+        filters.append(Response.survey_id == _int_param(data["survey_id"], "survey_id"))
+    if data.get("older_than"):
+        try:
+            older_than = datetime.fromisoformat(str(data["older_than"]).replace("Z", "+00:00"))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="older_than no es una fecha ISO")
+        older_than = naive_utc(older_than)
+        filters.append(Response.created_at < older_than)
+    if not filters:
+        raise HTTPException(status_code=400, detail="se necesita survey_id u older_than")
+    statuses = data.get("statuses")
+    if statuses:
+        if not isinstance(statuses, list) or not set(statuses) <= {"approved", "pending", "rejected"}:
+            raise HTTPException(status_code=400, detail="statuses: lista de approved, pending, rejected")
+        filters.append(Response.status.in_(statuses))
+    moved = archive.move(SQLModel.engine, filters, "survey" if data.get("survey_id") is not None else "manual", limit=None)
+    return {"ok": True, "archived": moved}
+
+@router.post("/maintenance")
+def maintenance(full_vacuum: bool = False):
+    """Aplica la política de retención y compacta la base ahora. `full_vacuum`
+    reescribe el fichero SQLite entero (bloquea las escrituras mientras dura)."""
+    return archive.run(SQLModel.engine, full_vacuum=full_vacuum)
+
+EXPORT_BATCH_SIZE = 500
+EXPORT_FILENAMES = {
+    "approved": "respuestas_aprobadas",
+    "pending": "respuestas_pendientes",
+    "rejected": "respuestas_rechazadas",
+    "all": "respuestas_todas",
+}
+
+
+def _export_filename(status: str, source: str) -> str:
+    name = EXPORT_FILENAMES.get(status, f"respuestas_{status}")
+    return name if source == "hot" else f"{name}_{'archivo' if source == 'archive' else 'con_archivo'}"
+
+
+EXPORT_SOURCES = ("hot", "archive", "all")
+
+
+def _export_filters(
+    status: str,
+    date_from: Optional[datetime],
+    date_to: Optional[datetime],
+    lang: Optional[str],
+    survey_id: Optional[int] = None,
+    model=Response,
+):
+    filters = []
+    date_from, date_to = naive_utc(date_from), naive_utc(date_to)
+    if status != "all":
+        filters.append(model.status == status)
+    if date_from:
+        filters.append(model.created_at >= date_from)
+    if date_to:
+        filters.append(model.created_at <= date_to)
+    if lang:
+        filters.append(model.lang == lang)
+    if survey_id is not None:
+        filters.append(model.survey_id == survey_id)
+    return filters
+
+
+def _export_sources(source: str, status: str, date_from, date_to, lang, survey_id):
+    """(engine, modelo, filtros) a recorrer: `response`, el archivo o ambos
+    (primero el archivo, que tiene lo más antiguo)."""
+    if source not in EXPORT_SOURCES:
+        raise HTTPException(status_code=400, detail=f"source debe ser uno de {', '.join(EXPORT_SOURCES)}")
+    sources = []
+    if source in ("archive", "all"):
+        for engine in archive.engines(SQLModel.engine, survey_id):
+            sources.append((engine, ResponseArchive, _export_filters(status, date_from, date_to, lang, survey_id, ResponseArchive)))
+    if source in ("hot", "all"):
+        sources.append((SQLModel.engine, Response, _export_filters(status, date_from, date_to, lang, survey_id)))
+    return sources
+
+
+def _payload_keys(session: Session, filters, model=Response) -> List[str]:
+    """Claves presentes en los payloads filtrados, por orden de aparición.
+
+    En SQLite (json_each) y PostgreSQL (jsonb_object_keys) se resuelve en la
+    base sin traer los payloads a Python; en otros motores se recorre solo la
+    columna JSON por lotes.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        key = func.jsonb_object_keys(model.payload_json).label("key")
+        inner = select(key, model.id.label("rid")).where(*filters).subquery()
+        stmt = select(inner.c.key).group_by(inner.c.key).order_by(func.min(inner.c.rid))
+        return [k for k in session.exec(stmt) if k]
+    if dialect == "sqlite":
+        keys = func.json_each(model.payload_json).table_valued("key", "id").alias("keys")
+        stmt = (
+            select(keys.c.key)
+            .select_from(model)
+            .join(keys, true())
+            .where(*filters)
+            .group_by(keys.c.key)
+            .order_by(func.min(model.id), func.min(keys.c.id))
+        )
+        return [key for key in session.exec(stmt) if key]
+    seen = {}
+    stmt = select(model.payload_json).where(*filters).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    for payload in session.exec(stmt):
+        for key in (payload or {}).keys():
+            seen.setdefault(key, None)
+    return list(seen)
+
+
+def _export_columns(sources) -> List[str]:
+    """Campos de questions.json y, detrás, las claves extra de los payloads."""
+    order, _labels = _field_info()
+    columns = list(order)
+    seen = set(order)
+    for engine, model, filters in sources:
+        with Session(engine) as s:
+            for key in _payload_keys(s, filters, model):
+                if key not in seen:
+                    seen.add(key)
+                    columns.append(key)
+    return columns
+
+
+def _export_rows(sources):
+    """Filas de cada origen por created_at, con un cursor en streaming."""
+    for engine, model, filters in sources:
+        with Session(engine) as s:
+            stmt = (
+                select(model)
+                .where(*filters)
+                .order_by(model.created_at.asc())
+                .execution_options(yield_per=EXPORT_BATCH_SIZE)
+            )
+            yield from s.exec(stmt)
+
+
+def _csv_chunks(sources, rows_per_chunk: int = 200):
+    """Genera el CSV por trozos recorriendo la tabla con un cursor en streaming."""
     buf = io.StringIO()
     writer = csv.writer(buf)
     base_cols = ["id", "survey_id", "status", "created_at"]
-    order, _labels = _field_info()
-    extra_keys = []
-    existing = set(order)
-    for r in rows:
-        payload = r.payload_json or {}
-        for key in payload.keys():
-            if key not in existing and key not in extra_keys:
-                extra_keys.append(key)
-    header = base_cols + order + extra_keys
-    writer.writerow(header)
-    for r in rows:
+    columns = _export_columns(sources)
+    writer.writerow(base_cols + columns)
+    pending_rows = 0
+    for r in _export_rows(sources):
         p = r.payload_json or {}
         row = [
             r.id,
@@ -142,12 +466,104 @@ def export_csv():
             r.status,
             r.created_at.isoformat(timespec="seconds"),
         ]
-        for key in order + extra_keys:
+        for key in columns:
             row.append(_normalize_value(p.get(key, "")))
         writer.writerow(row)
-    data = buf.getvalue()
-    return FastResponse(
-        content=data,
-        media_type="text/csv",
-        headers={"Content-Disposition": 'attachment; filename="respuestas_aprobadas.csv"'}
+        pending_rows += 1
+        if pending_rows >= rows_per_chunk:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            pending_rows = 0
+    yield buf.getvalue()
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> formato gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@router.get("/export.csv")
+def export_csv(
+    status: str = "approved",
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    lang: Optional[str] = None,
+    gzip: bool = False,
+    survey_id: Optional[int] = None,
+    source: str = "hot",
+):
+    """Exporta respuestas a CSV en streaming (por defecto, las aprobadas).
+
+    Filtros opcionales: `status` (approved|pending|rejected|all), rango
+    `date_from`/`date_to` sobre created_at, idioma (`lang` = `__lang`) y
+    encuesta (`survey_id`). `source`: hot (por defecto), archive o all.
+    Con `gzip=true` se envía comprimido.
+    """
+    sources = _export_sources(source, status, date_from, date_to, lang, survey_id)
+    filename = _export_filename(status, source) + ".csv"
+    chunks = (chunk.encode("utf-8") for chunk in _csv_chunks(sources))
+    if gzip:
+        filename += ".gz"
+        chunks = _gzip_chunks(_csv_chunks(sources))
+    return StreamingResponse(
+        chunks,
+        media_type="application/gzip" if gzip else "text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _columnar_export(fmt: str, status: str, date_from, date_to, lang, survey_id, source):
+    if not columnar.available():
+        raise HTTPException(status_code=501, detail="Exportación columnar no disponible: instala pyarrow")
+    sources = _export_sources(source, status, date_from, date_to, lang, survey_id)
+    sink = tempfile.SpooledTemporaryFile(max_size=32 * 1024 * 1024)
+    columnar.write(_export_rows(sources), _export_columns(sources), fmt, sink, batch_size=EXPORT_BATCH_SIZE)
+    sink.seek(0)
+
+    def chunks():
+        with sink:
+            while True:
+                data = sink.read(64 * 1024)
+                if not data:
+                    break
+                yield data
+
+    filename = _export_filename(status, source) + f".{fmt}"
+    media_type = "application/vnd.apache.parquet" if fmt == "parquet" else "application/vnd.apache.arrow.file"
+    return StreamingResponse(
+        chunks(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
+
+
+@router.get("/export.parquet")
+def export_parquet(
+    status: str = "approved",
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    lang: Optional[str] = None,
+    survey_id: Optional[int] = None,
+    source: str = "hot",
+):
+    """Exporta a Parquet: multiselección como listas, created_at tipado,
+    `__lang` categórico y columnas en el orden de questions.json."""
+    return _columnar_export("parquet", status, date_from, date_to, lang, survey_id, source)
+
+
+@router.get("/export.arrow")
+def export_arrow(
+    status: str = "approved",
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    lang: Optional[str] = None,
+    survey_id: Optional[int] = None,
+    source: str = "hot",
+):
+    """Igual que export.parquet pero en formato Arrow IPC (fichero)."""
+    return _columnar_export("arrow", status, date_from, date_to, lang, survey_id, source)
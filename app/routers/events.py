@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from app import events
+
+router = APIRouter(prefix="/api", tags=["events"])
+
+HEARTBEAT_SECONDS = 15
+
+
+@router.get("/events")
+async def event_stream(request: Request):
+    """Canal SSE con eventos `response.created`, `response.moderated`,
+    `responses.archived` (un lote salió de la tabla activa), `responses.reset`
+    y `resync` (el cliente perdió eventos y debe recargar).
+
+    Los eventos solo llevan ids, estados y código postal: nunca comentarios,
+    así que el canal puede ser público como /api/visual.
+    """
+    sub = events.bus.subscribe()
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                event = await sub.next(HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": ping\n\n"
+                    continue
+                yield events.format_sse(event)
+        finally:
+            events.bus.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
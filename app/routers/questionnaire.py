@@ -0,0 +1,47 @@
+from fastapi import APIRouter, HTTPException, Request, Response as FastResponse
+
+from app.assets import IMMUTABLE
+from app.fastjson import FastJSONResponse
+from app.questionnaire import compiled
+
+router = APIRouter(prefix="/api/questionnaire", tags=["questionnaire"])
+
+
+@router.get("")
+def manifest(request: Request):
+    """Idiomas disponibles con la URL de su bundle (pequeño, se revalida)."""
+    q = compiled()
+    etag = f'W/"questionnaire-{q.version}"'
+    if request.headers.get("if-none-match") == etag:
+        return FastResponse(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    return FastJSONResponse(q.manifest(), headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+@router.get("/{name}")
+def bundle(name: str, request: Request):
+    """Cuestionario minificado de un idioma: /api/questionnaire/{lang}.{hash}.json.
+
+    Con el hash vigente se sirve como inmutable; con uno antiguo se devuelve
+    el actual sin caché larga para que el kiosco no se quede atascado.
+    """
+    lang, _, rest = name.partition(".")
+    q = compiled()
+    if lang not in q.bundles or not rest.endswith(".json"):
+        raise HTTPException(status_code=404, detail="bundle no encontrado")
+    current = q.bundle_hashes[lang]
+    etag = f'"{current}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE if rest[:-len(".json")] == current else "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return FastResponse(status_code=304, headers=headers)
+    body = q.bundles[lang]
+    accepted = request.headers.get("accept-encoding", "")
+    for encoding in ("br", "gzip"):
+        if encoding in accepted and encoding in q.compressed[lang]:
+            body = q.compressed[lang][encoding]
+            headers["Content-Encoding"] = encoding
+            break
+    return FastResponse(body, media_type="application/json", headers=headers)
@@ -1,25 +1,73 @@
-from fastapi import APIRouter
-from typing import Dict
-from sqlmodel import SQLModel, Session, create_engine, select
-from app.models import Response
+from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from typing import Dict, Optional
+from urllib.parse import urlencode
+from sqlalchemy import and_, or_
+from sqlmodel import select
+from app import questionnaire
+from app.concurrency import fetch_all, run_write
+from app.fastjson import FastJSONResponse
+from app.models import Response, naive_utc
+from app.questionnaire import PayloadError
+from app.writer import WRITE_BATCH, persist, writer
 
 router = APIRouter(prefix="/api", tags=["responses"])
 
 @router.post("/responses")
-def create_response(data: Dict):
+async def create_response(data: Dict):
     # data: {"survey_id": 1, "payload": {...}}
-    engine = SQLModel.engine
-    with Session(engine) as s:
-        r = Response(survey_id=data["survey_id"], payload_json=data["payload"], status="pending")
-        s.add(r)
-        s.commit()
-        s.refresh(r)
-        return {"id": r.id, "survey_id": r.survey_id, "payload": r.payload_json, "status": r.status}
+    try:
+        payload = questionnaire.compiled().normalize(data.get("payload"))
+    except PayloadError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors)
+    r = Response(survey_id=data["survey_id"], payload_json=payload, status="pending")
+    if WRITE_BATCH and writer.running:
+        r = await writer.submit(r)
+    else:
+        (r,) = await run_write(persist, [r])
+    return {"id": r.id, "survey_id": r.survey_id, "payload": r.payload_json, "status": r.status}
 
-@router.get("/responses")
-def list_responses(status: str = "approved"):
-    engine = SQLModel.engine
-    with Session(engine) as s:
-        rows = s.exec(select(Response).where(Response.status == status).order_by(Response.created_at.desc()).limit(200)).all()
-        return [{"id": r.id, "survey_id": r.survey_id, "payload": r.payload_json, "status": r.status} for r in rows]
+# Paginación por clave de /responses: (created_at, id) descendente
+RESPONSES_PAGE_SIZE = 200
+RESPONSES_MAX_LIMIT = 500
 
+@router.get("/responses")
+async def list_responses(
+    status: str = "approved",
+    limit: int = RESPONSES_PAGE_SIZE,
+    before_created_at: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    lang: Optional[str] = None,
+    survey_id: Optional[int] = None,
+):
+    """Respuestas más recientes primero. Para la página siguiente se pasan
+    `before_created_at` y `before_id` de la última fila (cabecera X-Next-Cursor)."""
+    limit = max(1, min(limit, RESPONSES_MAX_LIMIT))
+    filters = [Response.status == status]
+    if lang:
+        filters.append(Response.lang == lang)
+    if survey_id is not None:
+        filters.append(Response.survey_id == survey_id)
+    if before_created_at is not None:
+        before_created_at = naive_utc(before_created_at)
+        if before_id is not None:
+            filters.append(or_(
+                Response.created_at < before_created_at,
+                and_(Response.created_at == before_created_at, Response.id < before_id),
+            ))
+        else:
+            filters.append(Response.created_at < before_created_at)
+    elif before_id is not None:
+        filters.append(Response.id < before_id)
+    rows = await fetch_all(
+        select(Response).where(*filters).order_by(Response.created_at.desc(), Response.id.desc()).limit(limit)
+    )
+    headers = {}
+    if len(rows) == limit:
+        last = rows[-1]
+        headers["X-Next-Cursor"] = urlencode({
+            "before_created_at": last.created_at.isoformat(),
+            "before_id": last.id,
+        })
+    items = [{"id": r.id, "survey_id": r.survey_id, "payload": r.payload_json, "status": r.status} for r in rows]
+    return FastJSONResponse(items, headers=headers)
@@ -0,0 +1,159 @@
+from fastapi import APIRouter, Request, Response as FastResponse
+from typing import Optional
+
+from app import questionnaire
+from app.aggregates import IncrementalAggregate, register
+from app.cache import file_cached
+from app.concurrency import run_cpu
+from app.models import Response
+
+router = APIRouter(prefix="/api/stats", tags=["stats"])
+
+# mismos tramos (y claves) que ageBuckets de survey.js
+AGE_BUCKETS = [
+    ("10_17", "10-17", 17),
+    ("18_25", "18-25", 25),
+    ("26_35", "26-35", 35),
+    ("36_45", "36-45", 45),
+    ("46_55", "46-55", 55),
+    ("56_65", "56-65", 65),
+    ("66_plus", "66+", None),
+]
+OPTION_FIELDS = ("genero", "personaje_importante")
+
+
+def _age_bucket(value) -> Optional[str]:
+    try:
+        age = int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return None
+    for key, _label, upper in AGE_BUCKETS:
+        if upper is None or age <= upper:
+            return key
+    return None
+
+
+def _rating(value) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _option_value(value) -> str:
+    if isinstance(value, list):
+        value = value[0] if value else ""
+    return str(value or "").strip()
+
+
+@file_cached(questionnaire.QUESTIONS_PATH)
+def _option_labels_by_lang():
+    """{lang: {campo: {valor: etiqueta}}} para los campos de OPTION_FIELDS."""
+    compiled = questionnaire.compiled()
+    mapping = {code: {} for code in compiled.codes}
+    for field_id in OPTION_FIELDS:
+        for lang, labels in compiled.option_labels(field_id).items():
+            mapping.setdefault(lang, {})[field_id] = labels
+    return mapping
+
+
+class StatsStore(IncrementalAggregate):
+    """Distribuciones de las respuestas aprobadas para la pantalla final."""
+
+    def __init__(self):
+        super().__init__()
+        self._reset()
+
+    def build(self, row: Response):
+        if row.status != "approved":
+            return None
+        payload = row.payload_json or {}
+        return (
+            _rating(payload.get("valoracion_exposicion")),
+            _age_bucket(payload.get("edad")),
+            _option_value(payload.get("genero")),
+            _option_value(payload.get("personaje_importante")),
+        )
+
+    def _bump(self, rating, age, gender, character, delta):
+        self.total += delta
+        if rating is not None:
+            self.rating_count += delta
+            self.rating_sum += rating * delta
+        for counts, key in ((self.ages, age), (self.genders, gender), (self.characters, character)):
+            if not key:
+                continue
+            counts[key] = counts.get(key, 0) + delta
+            if counts[key] <= 0:
+                del counts[key]
+
+    def _add(self, record):
+        self._bump(*record, 1)
+
+    def _remove(self, record):
+        self._bump(*record, -1)
+
+    def _reset(self):
+        self.total = 0
+        self.rating_count = 0
+        self.rating_sum = 0
+        self.ages = {}
+        self.genders = {}
+        self.characters = {}
+        self._cache = {}
+
+    def summary(self, lang: str):
+        """Resumen etiquetado en `lang`; se reutiliza mientras no cambie el cursor."""
+        with self._lock:
+            cursor = self.cursor
+            cached = self._cache.get(lang)
+            if cached and cached["cursor"] == cursor:
+                return cached
+            labels = _option_labels_by_lang().get(lang) or {}
+
+            def options(field, counts):
+                field_labels = labels.get(field) or {}
+                items = [
+                    {"value": value, "label": field_labels.get(value, value), "count": count}
+                    for value, count in counts.items()
+                ]
+                return sorted(items, key=lambda item: (-item["count"], item["value"]))
+
+            value = {
+                "lang": lang,
+                "cursor": cursor,
+                "total": self.total,
+                "rating": {
+                    "count": self.rating_count,
+                    "avg": round(self.rating_sum / self.rating_count, 2) if self.rating_count else None,
+                },
+                "age": [
+                    {"key": key, "label": label, "count": self.ages[key]}
+                    for key, label, _upper in AGE_BUCKETS
+                    if self.ages.get(key)
+                ],
+                "gender": options("genero", self.genders),
+                "character": options("personaje_importante", self.characters),
+            }
+            self._cache[lang] = value
+            return value
+
+
+stats_store = register(StatsStore())
+
+
+@router.get("/summary")
+async def stats_summary(request: Request, response: FastResponse, lang: str = "es"):
+    """Distribuciones de valoración, personaje, edad y género de todas las
+    respuestas aprobadas, con etiquetas en `lang`. ETag por versión."""
+    if lang not in _option_labels_by_lang():
+        lang = "es"
+    etag = f'W/"stats-{lang}-{stats_store.cursor}"'
+    if request.headers.get("if-none-match") == etag:
+        return FastResponse(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    value = await run_cpu(stats_store.summary, lang)
+    response.headers["ETag"] = f'W/"stats-{lang}-{value["cursor"]}"'
+    response.headers["Cache-Control"] = "no-cache"
+    return value
@@ -1,19 +1,18 @@
-from fastapi import APIRouter
-from sqlmodel import SQLModel, Session, select
-from app.models import Response
-from pathlib import Path
-from functools import lru_cache
-import csv
-from datetime import datetime
-import json
+from fastapi import APIRouter, HTTPException, Query, Request, Response as FastResponse
+from typing import Optional
+from app import aggregates, assets, questionnaire, rollups
+from app.aggregates import IncrementalAggregate, register
+from app.concurrency import fetch_all, run_cpu
+from app.fastjson import FastJSONResponse, dumps
+from app.metrics import span
+from app.geometry import BASE_HEIGHT, BASE_WIDTH, get_index
+from app.models import Response, naive_utc
+from datetime import datetime, timedelta
+import random
+import threading
 
 router = APIRouter(prefix="/api/visual", tags=["visual"])
 
-ZIP_CSV = Path(__file__).resolve().parents[2] / "app" / "data" / "zipcode_pix.csv"
-BASE_WIDTH = 1920
-BASE_HEIGHT = 1080
-BASE_CENTER = (BASE_WIDTH / 2, BASE_HEIGHT / 2)
-ALAVA_COORD = (42.8467, -2.6720)
 CHARACTER_IMAGE_BASE = "/images/personajes"
 CHARACTER_CARDS = {
     "simon_de_anda": {"label": "Simón de Anda", "image": "Simon de Anda R.jpg"},
@@ -54,67 +53,9 @@ COMMENT_FIELDS = {
     "conoces_vital_comentario",
 }
 
-QUESTIONS_PATH = Path(__file__).resolve().parents[2] / "app" / "static" / "questions.json"
 
-
-@lru_cache(maxsize=1)
 def _asociaciones_labels_by_lang():
-    mapping = {}
-    try:
-        data = json.loads(QUESTIONS_PATH.read_text(encoding="utf-8"))
-    except Exception:
-        return mapping
-    steps_by_lang = data.get("steps") or {}
-    for lang, steps in steps_by_lang.items():
-        for step in steps:
-            if step.get("id") != "asociaciones_alava":
-                continue
-            opts = step.get("options") or []
-            mapping[lang] = {opt.get("value"): opt.get("label") for opt in opts if opt.get("value")}
-    return mapping
-
-
-@lru_cache(maxsize=1)
-def _load_zip_mapping():
-    """
-    Returns {cp: {"codigo_postal": cp, "label": name, "x": avgX, "y": avgY}}
-    """
-    mapping = {}
-    if not ZIP_CSV.exists():
-        return mapping
-    with ZIP_CSV.open(newline="", encoding="utf-8") as fh:
-        reader = csv.DictReader(fh)
-        for row in reader:
-            cp = (row.get("cod_postal") or "").strip()
-            if not cp:
-                continue
-            if len(cp) == 4:
-                cp = cp.zfill(5)
-            entry = mapping.setdefault(
-                cp,
-                {
-                    "codigo_postal": cp,
-                    "label": row.get("denominacion_cp", cp),
-                    "points": [],
-                },
-            )
-            try:
-                entry["points"].append(
-                    (
-                        float(row.get("x_px", 0.0)),
-                        float(row.get("y_px", 0.0)),
-                    )
-                )
-            except (TypeError, ValueError):
-                continue
-    for cp, entry in mapping.items():
-        pts = entry.pop("points", [])
-        if not pts:
-            entry["x"] = entry["y"] = None
-            continue
-        entry["x"] = sum(p[0] for p in pts) / len(pts)
-        entry["y"] = sum(p[1] for p in pts) / len(pts)
-    return mapping
+    return questionnaire.compiled().option_labels("asociaciones_alava")
 
 
 def _normalize_postal(cp: str) -> str:
@@ -123,197 +64,687 @@ def _normalize_postal(cp: str) -> str:
         value = value.zfill(5)
     return value
 
-# Aproximación de centroides provinciales (lat, lon) para códigos fuera de Álava.
-PROVINCE_CENTROIDS = {
-    "01": (42.8467, -2.6720),  # Álava
-    "02": (38.9833, -1.85),    # Albacete
-    "03": (38.3452, -0.4810),  # Alicante
-    "04": (36.8340, -2.4637),  # Almería
-    "05": (40.6566, -4.6810),  # Ávila
-    "06": (38.8786, -6.9703),  # Badajoz
-    "07": (39.6953, 3.0176),   # Baleares (Palma)
-    "08": (41.3874, 2.1686),   # Barcelona
-    "09": (42.3439, -3.6969),  # Burgos
-    "10": (39.4753, -6.3710),  # Cáceres
-    "11": (36.5164, -6.2994),  # Cádiz
-    "12": (39.9864, -0.0513),  # Castellón
-    "13": (38.9849, -3.9291),  # Ciudad Real
-    "14": (37.8847, -4.7792),  # Córdoba
-    "15": (43.3623, -8.4115),  # A Coruña
-    "16": (40.0704, -2.1374),  # Cuenca
-    "17": (41.9794, 2.8214),   # Girona
-    "18": (37.1773, -3.5986),  # Granada
-    "19": (40.6333, -3.1667),  # Guadalajara
-    "20": (43.3183, -1.9812),  # Gipuzkoa
-    "21": (37.2614, -6.9447),  # Huelva
-    "22": (42.1361, -0.4089),  # Huesca
-    "23": (37.7796, -3.7849),  # Jaén
-    "24": (42.5987, -5.5671),  # León
-    "25": (41.6176, 0.6200),   # Lleida
-    "26": (42.4627, -2.4440),  # La Rioja
-    "27": (43.0097, -7.5560),  # Lugo
-    "28": (40.4168, -3.7038),  # Madrid
-    "29": (36.7213, -4.4214),  # Málaga
-    "30": (37.9922, -1.1307),  # Murcia
-    "31": (42.8196, -1.6440),  # Navarra
-    "32": (42.3383, -7.8639),  # Ourense
-    "33": (43.3619, -5.8494),  # Asturias
-    "34": (42.0097, -4.5288),  # Palencia
-    "35": (28.0997, -15.4134), # Las Palmas
-    "36": (42.4333, -8.6444),  # Pontevedra
-    "37": (40.9701, -5.6635),  # Salamanca
-    "38": (28.4682, -16.2546), # Santa Cruz de Tenerife
-    "39": (43.4623, -3.8099),  # Cantabria
-    "40": (40.9429, -4.1088),  # Segovia
-    "41": (37.3891, -5.9845),  # Sevilla
-    "42": (41.7660, -2.4790),  # Soria
-    "43": (41.1189, 1.2445),   # Tarragona
-    "44": (40.3440, -1.1069),  # Teruel
-    "45": (39.8628, -4.0273),  # Toledo
-    "46": (39.4699, -0.3763),  # Valencia
-    "47": (41.6523, -4.7286),  # Valladolid
-    "48": (43.2630, -2.9350),  # Bizkaia
-    "49": (41.5033, -5.7440),  # Zamora
-    "50": (41.6488, -0.8891),  # Zaragoza
-    "51": (35.8894, -5.3213),  # Ceuta
-    "52": (35.2923, -2.9381),  # Melilla
-}
+def _visible_payload(row: Response) -> dict:
+    """Payload tal y como se muestra en /points (sin comentarios si está pendiente)."""
+    payload_raw = row.payload_json or {}
+    if row.status == "pending":
+        payload = {k: v for k, v in payload_raw.items() if k not in COMMENT_FIELDS}
+    else:
+        payload = dict(payload_raw)
+    if not payload.get("asociaciones_alava_labels"):
+        raw_vals = payload_raw.get("asociaciones_alava_values") or payload_raw.get("asociaciones_alava")
+        if raw_vals:
+            lang = payload_raw.get("__lang")
+            labels_map = _asociaciones_labels_by_lang().get(lang) or {}
+            vals_list = raw_vals if isinstance(raw_vals, list) else [raw_vals]
+            payload["asociaciones_alava_labels"] = [
+                labels_map.get(v, v) for v in vals_list if isinstance(v, str)
+            ]
+            payload["asociaciones_alava_values"] = vals_list
+    return payload
 
-def _bearing_and_distance_km(lat1, lon1, lat2, lon2):
-    from math import radians, sin, cos, atan2, sqrt
-    R = 6371.0
-    phi1, phi2 = radians(lat1), radians(lat2)
-    dphi = radians(lat2 - lat1)
-    dlambda = radians(lon2 - lon1)
-    a = sin(dphi/2)**2 + cos(phi1)*cos(phi2)*sin(dlambda/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    distance = R * c
-    y = sin(dlambda) * cos(phi2)
-    x = cos(phi1)*sin(phi2) - sin(phi1)*cos(phi2)*cos(dlambda)
-    bearing = atan2(y, x)
-    return bearing, distance
-
-def _fallback_external_position(cp: str):
-    """Return a pseudo-position on the edge pointing toward the origin province."""
-    if not cp:
-        return None
-    prefix = cp[:2]
-    coords = PROVINCE_CENTROIDS.get(prefix)
-    if not coords:
-        return None
-    bearing, dist_km = _bearing_and_distance_km(ALAVA_COORD[0], ALAVA_COORD[1], coords[0], coords[1])
-    # Escala la distancia para empujar más hacia el borde (0.4 a 0.95 del radio)
-    from math import cos, sin
-    radius_base = min(BASE_WIDTH, BASE_HEIGHT) / 2
-    dist_norm = min(dist_km / 900, 1.0)  # 900 km ~ empuja a borde
-    # Empuja un poco más lejos de la masa central (más de la mitad del radio)
-    radius = radius_base * (0.55 + 0.6 * dist_norm)
-    cx, cy = BASE_CENTER
-    x = cx + radius * sin(bearing)  # x aumenta hacia el este
-    y = cy - radius * cos(bearing)  # y aumenta hacia el sur en pantalla
-    # Mantener dentro de los límites de la imagen
-    x = max(0, min(BASE_WIDTH, x))
-    y = max(0, min(BASE_HEIGHT, y))
-    return x, y
 
+COMMENT_SNIPPET_CHARS = 280
 
-@router.get("/points")
-def postal_points(status: str = "approved"):
-    """Return aggregated responses with pixel positions for each postal code.
 
-    - status="approved" (por defecto): solo aprobadas.
-    - status="pending": solo pendientes.
-    - status="all": aprobadas + pendientes (comentarios de pendientes se ocultan).
-    """
-    mapping = _load_zip_mapping()
-    with Session(SQLModel.engine) as session:
-        if status == "all":
-            rows = session.exec(select(Response).where(Response.status.in_(["approved", "pending"]))).all()
-        else:
-            rows = session.exec(select(Response).where(Response.status == status)).all()
-    labels_by_lang = _asociaciones_labels_by_lang()
-    buckets = {}
-    character_counts = {}
-    for row in rows:
-        payload_raw = row.payload_json or {}
-        payload = payload_raw
-        if row.status == "pending":
-            payload = {k: v for k, v in payload_raw.items() if k not in COMMENT_FIELDS}
-        if not payload.get("asociaciones_alava_labels"):
-            raw_vals = payload_raw.get("asociaciones_alava_values") or payload_raw.get("asociaciones_alava")
-            if raw_vals:
-                lang = payload_raw.get("__lang")
-                labels_map = labels_by_lang.get(lang) or {}
-                vals_list = raw_vals if isinstance(raw_vals, list) else [raw_vals]
-                payload["asociaciones_alava_labels"] = [
-                    labels_map.get(v, v) for v in vals_list if isinstance(v, str)
-                ]
-                payload["asociaciones_alava_values"] = vals_list
-        character = (payload.get("personaje_importante") or "").strip()
-        if character:
-            character_counts[character] = character_counts.get(character, 0) + 1
-        postal_raw = payload.get("codigo_postal")
-        if not postal_raw:
+def _comment_snippets(payload: dict):
+    """Comentarios de texto libre de una respuesta, recortados para los globos."""
+    labels = payload.get("__labels") or {}
+    snippets = []
+    for field in sorted(COMMENT_FIELDS):
+        value = payload.get(field)
+        if not isinstance(value, str) or len(value.strip()) <= 2:
             continue
-        postal = _normalize_postal(str(postal_raw))
-        entry = mapping.get(postal)
-        if not entry or entry.get("x") is None or entry.get("y") is None:
-            fallback_xy = _fallback_external_position(postal)
-            if not fallback_xy:
-                continue
-            entry = {
-                "codigo_postal": postal,
-                "label": f"CP {postal}",
-                "x": fallback_xy[0],
-                "y": fallback_xy[1],
-                "external": True,
-            }
-        bucket = buckets.setdefault(
+        text = value.strip()
+        if len(text) > COMMENT_SNIPPET_CHARS:
+            text = text[:COMMENT_SNIPPET_CHARS - 1].rstrip() + "…"
+        snippets.append({"field": field, "label": labels.get(field), "text": text})
+    return snippets
+
+
+def _association_words(payload: dict):
+    raw = payload.get("asociaciones_alava_labels") or payload.get("asociaciones_alava")
+    if isinstance(raw, str):
+        raw = raw.replace(";", ",").split(",")
+    if not isinstance(raw, list):
+        return []
+    return [w.strip().lower() for w in raw if isinstance(w, str) and w.strip()]
+
+
+class PostalPointsStore(IncrementalAggregate):
+    """Buckets por estado y código postal que alimentan /api/visual/points."""
+
+    def __init__(self):
+        super().__init__()
+        self._buckets = {}
+        self._characters = {}
+        # ids con comentarios por estado (lista + posición para quitar en O(1))
+        self._commented = {}
+        # versión del último cambio por (estado, CP) y por estado para personajes
+        self._bucket_versions = {}
+        self._character_versions = {}
+
+    def build(self, row: Response):
+        payload = _visible_payload(row)
+        postal = None
+        position = None
+        postal_raw = payload.get("codigo_postal")
+        if postal_raw:
+            postal = _normalize_postal(str(postal_raw))
+            position = get_index().position(postal)
+        return {
+            "id": row.id,
+            "status": row.status,
+            "created_at": row.created_at,
+            "character": (payload.get("personaje_importante") or "").strip(),
+            "gender": str(payload.get("genero") or "").strip(),
+            "postal": postal if position else None,
+            "position": position,
+            "comments": _comment_snippets(payload),
+            "entry": {
+                "id": row.id,
+                "created_at": row.created_at.isoformat(timespec="seconds"),
+                "status": row.status,
+                "payload": payload,
+            },
+        }
+
+    def _add(self, record):
+        status = record["status"]
+        character = record["character"]
+        if character:
+            counts = self._characters.setdefault(status, {})
+            counts[character] = counts.get(character, 0) + 1
+            self._character_versions[status] = self.version
+        postal = record["postal"]
+        if not postal:
+            return
+        self._bucket_versions[(status, postal)] = self.version
+        position = record["position"]
+        bucket = self._buckets.setdefault(status, {}).setdefault(
             postal,
             {
                 "codigo_postal": postal,
-                "label": entry.get("label", postal),
-                "x": entry.get("x"),
-                "y": entry.get("y"),
+                "label": position.get("label", postal),
+                "x": position.get("x"),
+                "y": position.get("y"),
+                "external": bool(position.get("external")),
                 "count": 0,
-                "genders": set(),
-                "responses": [],
                 "gender_counts": {},
-                "external": bool(entry.get("external")),
+                "records": {},
                 "latest_at": None,
             },
         )
         bucket["count"] += 1
-        gender = str(payload.get("genero") or "").strip()
+        gender = record["gender"]
         if gender:
-            bucket["genders"].add(gender)
             bucket["gender_counts"][gender] = bucket["gender_counts"].get(gender, 0) + 1
-        bucket["responses"].append(
-            {
-                "id": row.id,
-                "created_at": row.created_at.isoformat(timespec="seconds"),
-                "status": row.status,
-                "payload": payload,
-            }
+        bucket["records"][record["id"]] = record
+        if not bucket["latest_at"] or record["created_at"] > bucket["latest_at"]:
+            bucket["latest_at"] = record["created_at"]
+        if record["comments"]:
+            ids, positions = self._commented.setdefault(status, ([], {}))
+            positions[record["id"]] = len(ids)
+            ids.append(record["id"])
+
+    def _remove(self, record):
+        status = record["status"]
+        character = record["character"]
+        if character:
+            counts = self._characters.get(status, {})
+            counts[character] = counts.get(character, 0) - 1
+            if counts[character] <= 0:
+                counts.pop(character, None)
+            self._character_versions[status] = self.version
+        postal = record["postal"]
+        if not postal:
+            return
+        self._bucket_versions[(status, postal)] = self.version
+        buckets = self._buckets.get(status, {})
+        bucket = buckets.get(postal)
+        if not bucket:
+            return
+        bucket["records"].pop(record["id"], None)
+        bucket["count"] -= 1
+        if record["comments"]:
+            ids, positions = self._commented.get(status, ([], {}))
+            pos = positions.pop(record["id"], None)
+            if pos is not None:
+                last = ids.pop()
+                if last != record["id"]:
+                    ids[pos] = last
+                    positions[last] = pos
+        gender = record["gender"]
+        if gender:
+            bucket["gender_counts"][gender] -= 1
+            if bucket["gender_counts"][gender] <= 0:
+                bucket["gender_counts"].pop(gender, None)
+        if bucket["count"] <= 0:
+            buckets.pop(postal, None)
+        elif bucket["latest_at"] == record["created_at"]:
+            bucket["latest_at"] = max(r["created_at"] for r in bucket["records"].values())
+
+    def _reset(self):
+        self._buckets = {}
+        self._characters = {}
+        self._commented = {}
+        self._bucket_versions = {}
+        self._character_versions = {}
+
+    def snapshot(self, statuses, since: Optional[int] = None, include_responses: bool = True):
+        """Combina los buckets de los estados pedidos (coste ~ nº de CP).
+
+        Con `since` solo devuelve los CP modificados después de esa versión,
+        la lista de CP que han quedado vacíos y los personajes solo si cambiaron
+        (None en caso contrario). Sin `include_responses` se omiten las
+        respuestas anidadas (resumen compacto).
+        """
+        with self._lock:
+            changed = None
+            removed = []
+            if since is not None:
+                changed = set()
+                for (status, postal), version in self._bucket_versions.items():
+                    if status in statuses and version > since:
+                        changed.add(postal)
+                for postal in sorted(changed):
+                    if not any(postal in self._buckets.get(status, {}) for status in statuses):
+                        removed.append(postal)
+            merged = {}
+            character_counts = {}
+            for status in statuses:
+                for postal, bucket in self._buckets.get(status, {}).items():
+                    if changed is not None and postal not in changed:
+                        continue
+                    out = merged.get(postal)
+                    if out is None:
+                        out = merged[postal] = {
+                            "codigo_postal": bucket["codigo_postal"],
+                            "label": bucket["label"],
+                            "x": bucket["x"],
+                            "y": bucket["y"],
+                            "count": 0,
+                            "gender_counts": {},
+                            "records": [],
+                            "external": bucket["external"],
+                            "latest_at": None,
+                        }
+                    out["count"] += bucket["count"]
+                    for gender, count in bucket["gender_counts"].items():
+                        out["gender_counts"][gender] = out["gender_counts"].get(gender, 0) + count
+                    if include_responses:
+                        out["records"].extend(bucket["records"].values())
+                    if not out["latest_at"] or bucket["latest_at"] > out["latest_at"]:
+                        out["latest_at"] = bucket["latest_at"]
+                for character, count in self._characters.get(status, {}).items():
+                    character_counts[character] = character_counts.get(character, 0) + count
+            if since is not None and all(self._character_versions.get(status, 0) <= since for status in statuses):
+                character_counts = None
+            cursor = self.cursor
+        points = []
+        for bucket in merged.values():
+            latest_at = bucket["latest_at"].isoformat() if isinstance(bucket["latest_at"], datetime) else None
+            if not include_responses:
+                points.append(
+                    {
+                        "codigo_postal": bucket["codigo_postal"],
+                        "label": bucket["label"],
+                        "x": bucket["x"],
+                        "y": bucket["y"],
+                        "count": bucket["count"],
+                        "gender_counts": bucket["gender_counts"],
+                        "latest_at": latest_at,
+                        "external": bucket["external"],
+                    }
+                )
+                continue
+            records = bucket.pop("records")
+            if len(statuses) > 1:
+                records.sort(key=lambda r: r["id"])
+            points.append(
+                {
+                    "codigo_postal": bucket["codigo_postal"],
+                    "label": bucket["label"],
+                    "x": bucket["x"],
+                    "y": bucket["y"],
+                    "count": bucket["count"],
+                    "genders": sorted(bucket["gender_counts"].keys()),
+                    "responses": [r["entry"] for r in records],
+                    "gender_counts": bucket["gender_counts"],
+                    "external": bucket["external"],
+                    "latest_at": latest_at,
+                }
+            )
+        return points, character_counts, removed, cursor
+
+    def bucket_page(self, postal: str, statuses, offset: int, limit: int):
+        """Respuestas de un CP, de la más reciente a la más antigua."""
+        with self._lock:
+            records = []
+            for status in statuses:
+                bucket = self._buckets.get(status, {}).get(postal)
+                if bucket:
+                    records.extend(bucket["records"].values())
+        records.sort(key=lambda r: r["id"], reverse=True)
+        return len(records), [r["entry"] for r in records[offset:offset + limit]]
+
+    def sample_comments(self, statuses, n: int):
+        """Elige al azar hasta `n` respuestas con comentarios sin recorrer el resto."""
+        with self._lock:
+            pools = [(status, self._commented.get(status, ([], {}))[0]) for status in statuses]
+            total = sum(len(ids) for _status, ids in pools)
+            picks = random.sample(range(total), min(n, total)) if total else []
+            samples = []
+            for pick in picks:
+                for status, ids in pools:
+                    if pick < len(ids):
+                        samples.append(self._records[ids[pick]])
+                        break
+                    pick -= len(ids)
+        items = []
+        for record in samples:
+            position = record["position"]
+            items.append(
+                {
+                    "id": record["id"],
+                    "codigo_postal": record["postal"],
+                    "label": position.get("label", record["postal"]),
+                    "x": position.get("x"),
+                    "y": position.get("y"),
+                    "external": bool(position.get("external")),
+                    "created_at": record["entry"]["created_at"],
+                    "messages": record["comments"],
+                    "words": _association_words(record["entry"]["payload"]),
+                }
+            )
+        return items
+
+
+points_store = register(PostalPointsStore())
+
+
+def _asociaciones_value_lookup():
+    """(valores conocidos, {etiqueta en minúsculas de cualquier idioma: valor})."""
+    spec = questionnaire.compiled().fields.get("asociaciones_alava")
+    if spec is None:
+        return set(), {}
+    return set(spec.values), spec.by_label
+
+
+def _association_values(payload: dict):
+    """Valores de opción de asociaciones_alava (los labels antiguos se traducen a valor)."""
+    if questionnaire.is_normalized(payload):
+        return tuple(payload.get("asociaciones_alava") or ())
+    raw = payload.get("asociaciones_alava_values") or payload.get("asociaciones_alava")
+    if isinstance(raw, str):
+        raw = raw.replace(";", ",").split(",")
+    if not isinstance(raw, list):
+        return ()
+    known, by_label = _asociaciones_value_lookup()
+    values = []
+    for item in raw:
+        if not isinstance(item, str) or not item.strip():
+            continue
+        word = item.strip()
+        if word not in known:
+            word = by_label.get(word.lower(), word.lower())
+        if word not in values:
+            values.append(word)
+    return tuple(values)
+
+
+class WordsStore(IncrementalAggregate):
+    """Frecuencia de asociaciones_alava por estado e idioma para la nube de /grid."""
+
+    def __init__(self):
+        super().__init__()
+        self._counts = {}
+
+    def build(self, row: Response):
+        payload = row.payload_json or {}
+        lang = payload.get("__lang") or ""
+        values = _association_values(payload)
+        if not values:
+            return None
+        return (row.status, lang, values)
+
+    def _bump(self, record, delta):
+        status, lang, values = record
+        per_status = self._counts.setdefault(status, {})
+        # "" = todos los idiomas fusionados por valor de opción
+        for key in {lang, ""}:
+            counts = per_status.setdefault(key, {})
+            for value in values:
+                counts[value] = counts.get(value, 0) + delta
+                if counts[value] <= 0:
+                    del counts[value]
+
+    def _add(self, record):
+        self._bump(record, 1)
+
+    def _remove(self, record):
+        self._bump(record, -1)
+
+    def _reset(self):
+        self._counts = {}
+
+    def top(self, statuses, lang: Optional[str], n: int, min_count: int):
+        with self._lock:
+            merged = {}
+            for status in statuses:
+                for value, count in self._counts.get(status, {}).get(lang or "", {}).items():
+                    merged[value] = merged.get(value, 0) + count
+            cursor = self.cursor
+        items = sorted(
+            ((value, count) for value, count in merged.items() if count >= min_count),
+            key=lambda item: (-item[1], item[0]),
+        )[:n]
+        return items, cursor
+
+
+words_store = register(WordsStore())
+
+
+def _points_etag(kind: str, status: str, cursor: str) -> str:
+    return f'W/"{kind}-{status}-{cursor}"'
+
+
+# JSON ya codificado por (tipo, estado, since, cursor): varias pantallas que
+# sondean el mismo estado reciben el mismo buffer sin volver a serializar.
+POINTS_ENCODED_CACHE_MAX = 32
+_points_encoded = {}
+_points_encoded_lock = threading.Lock()
+
+
+def _encoded_points(kind: str, status: str, since_version: Optional[int], include_responses: bool):
+    key = (kind, status, since_version, points_store.cursor)
+    cached = _points_encoded.get(key)
+    if cached is not None:
+        return cached
+    with span("points_snapshot"):
+        points, character_counts, removed, cursor = points_store.snapshot(
+            _statuses_for(status), since_version, include_responses
         )
-        # track la fecha más reciente del bucket
-        if not bucket["latest_at"] or row.created_at > bucket["latest_at"]:
-            bucket["latest_at"] = row.created_at
-    # finalize genders as list
-    points = []
-    for data in buckets.values():
-        data["genders"] = sorted(list(data["genders"]))
-        if isinstance(data.get("latest_at"), datetime):
-            data["latest_at"] = data["latest_at"].isoformat()
-        points.append(data)
-    characters = _format_character_cards(character_counts)
-    return {
+    payload = {
         "points": points,
-        "characters": characters,
         "base_size": {"width": BASE_WIDTH, "height": BASE_HEIGHT},
+        "cursor": cursor,
+        "delta": since_version is not None,
+    }
+    if since_version is not None:
+        payload["removed"] = removed
+    if character_counts is not None:
+        with span("character_cards"):
+            payload["characters"] = _format_character_cards(character_counts)
+    with span("json_encode"):
+        body = dumps(payload)
+    value = (cursor, body)
+    with _points_encoded_lock:
+        current = points_store.cursor
+        for stale in [k for k in _points_encoded if k[3] != current]:
+            _points_encoded.pop(stale, None)
+        if cursor == current:
+            while len(_points_encoded) >= POINTS_ENCODED_CACHE_MAX:
+                _points_encoded.pop(next(iter(_points_encoded)))
+            _points_encoded[(kind, status, since_version, cursor)] = value
+    return value
+
+
+async def _points_response(request: Request, status: str, since: Optional[str], include_responses: bool):
+    # 304 y buffers ya codificados se resuelven en el bucle; solo la
+    # serialización de un estado nuevo pasa a los hilos de CPU
+    kind = "points" if include_responses else "summary"
+    etag = _points_etag(kind, status, points_store.cursor)
+    if request.headers.get("if-none-match") == etag:
+        return FastResponse(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    since_version = points_store.parse_cursor(since)
+    cached = _points_encoded.get((kind, status, since_version, points_store.cursor))
+    if cached is None:
+        cached = await run_cpu(_encoded_points, kind, status, since_version, include_responses)
+    cursor, body = cached
+    return FastJSONResponse(
+        body,
+        headers={"ETag": _points_etag(kind, status, cursor), "Cache-Control": "no-cache"},
+    )
+
+
+def _statuses_for(status: str):
+    return ["approved", "pending"] if status == "all" else [status]
+
+
+@router.get("/points")
+async def postal_points(
+    request: Request,
+    status: str = "approved",
+    since: Optional[str] = None,
+):
+    """Return aggregated responses with pixel positions for each postal code.
+
+    - status="approved" (por defecto): solo aprobadas.
+    - status="pending": solo pendientes.
+    - status="all": aprobadas + pendientes (comentarios de pendientes se ocultan).
+
+    Se sirve desde `points_store`, que se mantiene al crear/moderar respuestas.
+    La respuesta lleva `cursor` y un ETag: con `If-None-Match` se contesta 304
+    si nada cambió, y con `since=<cursor>` solo se envían los CP modificados
+    (`removed` lista los que quedaron vacíos). Un cursor caducado (p. ej. tras
+    un reset o reinicio) devuelve el estado completo con `delta: false`.
+    """
+    return await _points_response(request, status, since, include_responses=True)
+
+
+@router.get("/points/summary")
+async def postal_points_summary(
+    request: Request,
+    status: str = "approved",
+    since: Optional[str] = None,
+):
+    """Igual que /points pero sin respuestas anidadas: solo CP, etiqueta,
+    posición, conteos por género, `latest_at` y `external`. Admite el mismo
+    cursor/ETag. El detalle se pide por CP a /points/{codigo_postal}/responses.
+    """
+    return await _points_response(request, status, since, include_responses=False)
+
+
+@router.get("/points/{codigo_postal}/responses")
+async def postal_point_responses(codigo_postal: str, status: str = "approved", offset: int = 0, limit: int = 50):
+    """Respuestas paginadas de un CP (más recientes primero)."""
+    postal = _normalize_postal(codigo_postal)
+    offset = max(offset, 0)
+    limit = max(1, min(limit, 200))
+    total, items = await run_cpu(points_store.bucket_page, postal, _statuses_for(status), offset, limit)
+    return {
+        "codigo_postal": postal,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "responses": items,
     }
 
 
+@router.get("/words")
+async def words(
+    request: Request,
+    response: FastResponse,
+    status: str = "approved",
+    lang: Optional[str] = None,
+    top: int = 12,
+    min_count: int = 1,
+):
+    """Asociaciones más mencionadas con su recuento y etiquetas por idioma.
+
+    Sin `lang` se fusionan los tres idiomas por valor de opción."""
+    top = max(1, min(top, 100))
+    etag = f'W/"words-{status}-{lang or "all"}-{top}-{min_count}-{words_store.cursor}"'
+    if request.headers.get("if-none-match") == etag:
+        return FastResponse(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    items, cursor = await run_cpu(words_store.top, _statuses_for(status), lang, top, max(1, min_count))
+    labels_by_lang = _asociaciones_labels_by_lang()
+    response.headers["ETag"] = f'W/"words-{status}-{lang or "all"}-{top}-{min_count}-{cursor}"'
+    response.headers["Cache-Control"] = "no-cache"
+    return {
+        "cursor": cursor,
+        "words": [
+            {
+                "value": value,
+                "count": count,
+                "labels": {code: labels.get(value, value) for code, labels in labels_by_lang.items()},
+            }
+            for value, count in items
+        ],
+    }
+
+
+# /timeline: pasos admitidos (múltiplos del tramo de 5 min de response_rollup)
+TIMELINE_STEPS = {"5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "1d": 86400}
+TIMELINE_MAX_BUCKETS = 2000
+TIMELINE_DEFAULT_SPAN = timedelta(hours=24)
+
+
+def _timeline_step(step: str) -> int:
+    seconds = TIMELINE_STEPS.get(step)
+    if seconds is None:
+        try:
+            seconds = int(step)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"step debe ser {', '.join(TIMELINE_STEPS)} o segundos")
+    if seconds < rollups.ROLLUP_SECONDS or seconds % rollups.ROLLUP_SECONDS:
+        raise HTTPException(status_code=400, detail=f"step debe ser múltiplo de {rollups.ROLLUP_SECONDS} s")
+    return seconds
+
+
+def _timeline_time(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} no es una fecha ISO")
+    return naive_utc(parsed)
+
+
+@router.get("/timeline")
+async def timeline(
+    request: Request,
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = None,
+    step: str = "5m",
+    mode: str = "window",
+    by: str = ",".join(rollups.ROLLUP_DIMENSIONS),
+):
+    """Aprobadas por tramo de tiempo para reproducir el día en /grid.
+
+    Lee response_rollup con un rango sobre su índice (nunca la tabla de
+    respuestas). Formato en columnas: `keys` guarda los valores distintos de
+    cada dimensión de `by` y cada fila de `rows` es
+    [tramo, índice de clave por dimensión..., conteo]. `totals` es el total
+    por tramo. Con mode=window el conteo es el del tramo; con
+    mode=cumulative es el acumulado de esa clave (incluido lo anterior a
+    `from`) y solo aparece en los tramos en los que cambia.
+    """
+    if mode not in ("window", "cumulative"):
+        raise HTTPException(status_code=400, detail="mode debe ser window o cumulative")
+    dims = tuple(dim for dim in (part.strip() for part in by.split(",")) if dim)
+    unknown = [dim for dim in dims if dim not in rollups.ROLLUP_DIMENSIONS]
+    if unknown or len(set(dims)) != len(dims):
+        raise HTTPException(status_code=400, detail=f"by admite {', '.join(rollups.ROLLUP_DIMENSIONS)}")
+    seconds = _timeline_step(step)
+    end = _timeline_time(to, "to") or datetime.utcnow()
+    start = _timeline_time(from_, "from") or end - TIMELINE_DEFAULT_SPAN
+    start = rollups.bucket_start(start, seconds)
+    end = rollups.bucket_start(end, seconds) + timedelta(seconds=seconds)
+    buckets = int((end - start).total_seconds()) // seconds
+    if buckets <= 0 or buckets > TIMELINE_MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"el rango debe tener entre 1 y {TIMELINE_MAX_BUCKETS} tramos")
+
+    version = aggregates.synced_seq()
+    etag = f'W/"timeline-{version}-{start:%Y%m%d%H%M}-{buckets}-{seconds}-{mode}-{",".join(dims)}"'
+    if request.headers.get("if-none-match") == etag:
+        return FastResponse(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    rows = await fetch_all(rollups.window_query(start, end, dims))
+    base = await fetch_all(rollups.before_query(start, dims)) if mode == "cumulative" else []
+    payload = await run_cpu(_timeline_payload, rows, base, start, end, seconds, buckets, mode, dims)
+    payload["cursor"] = version
+    return FastJSONResponse(payload, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def _timeline_payload(rows, base, start, end, seconds, buckets, mode, dims):
+    """Pasa las filas de response_rollup al formato en columnas de /timeline."""
+    keys = {dim: [] for dim in dims}
+    key_index = {dim: {} for dim in dims}
+
+    def encode(values):
+        encoded = []
+        for dim, value in zip(dims, values):
+            index = key_index[dim].get(value)
+            if index is None:
+                index = key_index[dim][value] = len(keys[dim])
+                keys[dim].append(value)
+            encoded.append(index)
+        return tuple(encoded)
+
+    window = {}
+    for bucket_at, *values, count in rows:
+        bucket = int((bucket_at - start).total_seconds()) // seconds
+        key = (bucket, encode(values))
+        window[key] = window.get(key, 0) + int(count or 0)
+
+    totals = [0] * buckets
+    out = []
+    if mode == "window":
+        for (bucket, key), count in sorted(window.items()):
+            if count:
+                out.append([bucket, *key, count])
+                totals[bucket] += count
+    else:
+        running = {}
+        for *values, count in base:
+            running[encode(values)] = int(count or 0)
+        base_total = sum(running.values())
+        for (bucket, key), count in sorted(window.items()):
+            if count:
+                running[key] = running.get(key, 0) + count
+                out.append([bucket, *key, running[key]])
+                totals[bucket] += count
+        acc = base_total
+        for bucket in range(buckets):
+            acc += totals[bucket]
+            totals[bucket] = acc
+
+    positions = None
+    if "codigo_postal" in dims:
+        index = get_index()
+        positions = []
+        for postal in keys["codigo_postal"]:
+            entry = index.position(_normalize_postal(postal)) if postal else None
+            positions.append([entry["x"], entry["y"]] if entry else None)
+
+    payload = {
+        "from": start.isoformat(timespec="seconds"),
+        "to": end.isoformat(timespec="seconds"),
+        "step": seconds,
+        "buckets": buckets,
+        "mode": mode,
+        "by": list(dims),
+        "keys": keys,
+        "positions": positions,
+        "rows": out,
+        "totals": totals,
+    }
+    return payload
+
+
+@router.get("/comments")
+async def comment_sampler(status: str = "approved", n: int = 20):
+    """Muestra aleatoria de comentarios (campos de COMMENT_FIELDS) con su CP y
+    posición, para los globos del timeline de /grid. Las pendientes nunca
+    aportan comentarios porque se ocultan al agregarlas.
+    """
+    n = max(1, min(n, 100))
+    return {"items": await run_cpu(points_store.sample_comments, _statuses_for(status), n)}
+
+
 def _format_character_cards(counts: dict[str, int]):
     if not counts:
         return []
@@ -323,17 +754,24 @@ def _format_character_cards(counts: dict[str, int]):
     for character_id, count in sorted_counts:
         meta = CHARACTER_CARDS.get(character_id, {})
         image_name = meta.get("image")
+        built = assets.portrait(image_name) if image_name else None
         entry = {
             "id": character_id,
             "label": meta.get("label", _prettify_character(character_id)),
             "count": count,
             "percentage": round((count / total) * 100, 1) if total else 0,
-            "image": f"{CHARACTER_IMAGE_BASE}/{image_name}" if image_name else None,
+            "image": built["image"] if built else (f"{CHARACTER_IMAGE_BASE}/{image_name}" if image_name else None),
+            "srcset": built["srcset"] if built else None,
         }
         formatted.append(entry)
     return formatted
 
 
+def character_image_names():
+    """Retratos de CHARACTER_CARDS, para el paso de build de app/assets.py."""
+    return [meta["image"] for meta in CHARACTER_CARDS.values() if meta.get("image")]
+
+
 def _prettify_character(value: str) -> str:
     if not value:
         return ""
@@ -8,6 +8,14 @@ const lastEl = document.getElementById('last');
 
 const btnExport = document.getElementById('btn-export');
 const btnReset = document.getElementById('btn-reset');
+const bulkAll = document.getElementById('bulk-all');
+const bulkCount = document.getElementById('bulk-count');
+const bulkApprove = document.getElementById('bulk-approve');
+const bulkReject = document.getElementById('bulk-reject');
+const bulkMinutes = document.getElementById('bulk-minutes');
+const bulkLang = document.getElementById('bulk-lang');
+const bulkFilterApprove = document.getElementById('bulk-filter-approve');
+const bulkFilterReject = document.getElementById('bulk-filter-reject');
 let fieldOrder = [];
 let fieldLabels = {};
 
@@ -23,9 +31,7 @@ function minsAgo(iso) {
   return `hace ${mins} min`;
 }
 
-async function fetchCounts() {
-  const res = await fetch('/api/admin/counts', { cache: 'no-store' });
-  const data = await res.json();
+function renderCounts(data) {
   cTotal.textContent = data.total;
   cApproved.textContent = data.approved;
   cPending.textContent = data.pending;
@@ -33,16 +39,68 @@ async function fetchCounts() {
   lastEl.textContent = `Última aprobación: ${minsAgo(data.last_approved_at)}`;
 }
 
-async function fetchPending() {
-  const res = await fetch('/api/admin/pending', { cache: 'no-store' });
-  const data = await res.json();
+async function fetchCounts() {
+  const res = await fetch('/api/admin/counts', { cache: 'no-store' });
+  renderCounts(await res.json());
+}
+
+// Cola de moderación: una carga completa paginada y después solo cambios
+// (updated_since); las filas que salen de la cola llegan sin payload.
+const pendingById = new Map();
+const selected = new Set();
+let pendingUntil = null;
+
+async function fetchPendingPages(query) {
+  let next = query;
+  let until = null;
+  const rows = [];
+  while (next !== null) {
+    const res = await fetch(`/api/admin/pending?${next}`, { cache: 'no-store' });
+    if (!res.ok) throw new Error(`pending ${res.status}`);
+    rows.push(...await res.json());
+    until = until || res.headers.get('X-Updated-Until');
+    const cursor = res.headers.get('X-Next-Cursor');
+    next = cursor ? [query, cursor].filter(Boolean).join('&') : null;
+  }
+  return { rows, until };
+}
+
+async function fetchPending(full = false) {
+  const incremental = !full && pendingUntil;
+  const query = incremental ? `updated_since=${encodeURIComponent(pendingUntil)}` : '';
+  let page;
+  try {
+    page = await fetchPendingPages(query);
+  } catch (err) {
+    console.warn('No se pudo cargar la cola', err);
+    return;
+  }
+  if (!incremental) pendingById.clear();
+  let changed = !incremental;
+  for (const r of page.rows) {
+    if (r.status === 'pending') {
+      if (!pendingById.has(r.id)) changed = true;
+      pendingById.set(r.id, r);
+    } else if (pendingById.delete(r.id)) {
+      changed = true;
+    }
+  }
+  if (page.until) pendingUntil = page.until;
+  if (changed) renderPending();
+}
+
+function renderPending() {
   ul.innerHTML = '';
-  for (const r of data) {
+  const rows = [...pendingById.values()].sort((a, b) => a.id - b.id);
+  for (const id of [...selected]) {
+    if (!pendingById.has(id)) selected.delete(id);
+  }
+  for (const r of rows) {
     const li = document.createElement('li');
     li.className = 'moderation-card';
     li.innerHTML = `
       <div class="card-head">
-        <strong>#${r.id}</strong>
+        <label><input type="checkbox" data-select="${r.id}" ${selected.has(r.id) ? 'checked' : ''} /><strong>#${r.id}</strong></label>
         <span>${new Date(r.created_at).toLocaleString()}</span>
         <span>${r.payload?.__lang ? `Lang: ${r.payload.__lang}` : ''}</span>
         <span class="actions">
@@ -56,6 +114,33 @@ async function fetchPending() {
     `;
     ul.appendChild(li);
   }
+  updateSelection();
+}
+
+function updateSelection() {
+  bulkCount.textContent = `${selected.size} seleccionadas`;
+  bulkApprove.disabled = bulkReject.disabled = selected.size === 0;
+  bulkAll.checked = selected.size > 0 && selected.size === pendingById.size;
+}
+
+// Moderación en bloque: una sola petición y los contadores vienen en la respuesta
+async function moderateBulk(body) {
+  const res = await fetch('/api/admin/moderate', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body),
+  });
+  if (!res.ok) {
+    alert('No se pudo moderar la selección');
+    return;
+  }
+  const data = await res.json();
+  data.ids.forEach(id => {
+    pendingById.delete(id);
+    selected.delete(id);
+  });
+  renderPending();
+  renderCounts(data.counts);
 }
 
 function renderPayload(payload = {}) {
@@ -85,11 +170,44 @@ function renderField(key, value) {
   return `<div><strong>${label}:</strong> <span>${display || '—'}</span></div>`;
 }
 
+ul.addEventListener('change', (e) => {
+  const id = Number(e.target.dataset.select);
+  if (!id) return;
+  if (e.target.checked) selected.add(id); else selected.delete(id);
+  updateSelection();
+});
+
+bulkAll.addEventListener('change', () => {
+  selected.clear();
+  if (bulkAll.checked) pendingById.forEach((_r, id) => selected.add(id));
+  renderPending();
+});
+
+[[bulkApprove, 'approve'], [bulkReject, 'reject']].forEach(([btn, action]) => {
+  btn.addEventListener('click', () => {
+    if (!selected.size) return;
+    moderateBulk({ action, ids: [...selected] });
+  });
+});
+
+[[bulkFilterApprove, 'approve'], [bulkFilterReject, 'reject']].forEach(([btn, action]) => {
+  btn.addEventListener('click', () => {
+    const minutes = Number(bulkMinutes.value) || 0;
+    const lang = bulkLang.value;
+    const verb = action === 'approve' ? 'aprobar' : 'rechazar';
+    if (!confirm(`¿${verb} todas las pendientes de más de ${minutes} min${lang ? ` en ${lang}` : ''}?`)) return;
+    const filter = { status: 'pending', older_than: new Date(Date.now() - minutes * 60000).toISOString() };
+    if (lang) filter.lang = lang;
+    moderateBulk({ action, filter });
+  });
+});
+
 ul.addEventListener('click', async (e) => {
-  if (e.target.tagName === 'BUTTON') {
+  if (e.target.tagName === 'BUTTON' && e.target.dataset.a) {
     const id = e.target.dataset.id;
     const a = e.target.dataset.a;
     await fetch(`/api/admin/moderate/${id}?action=${a}`, { method: 'PATCH' });
+    if (pendingById.delete(Number(id))) renderPending();
     fetchPending();
     fetchCounts();
   }
@@ -105,7 +223,7 @@ btnReset.addEventListener('click', async () => {
   const res = await fetch('/api/admin/reset', { method: 'DELETE' });
   if (res.ok) {
     alert('Base reiniciada');
-    fetchPending();
+    fetchPending(true);
     fetchCounts();
   }
 });
@@ -122,10 +240,47 @@ async function initFields() {
   }
 }
 
+// Eventos SSE: la cola se refresca al llegar una respuesta o moderación.
+// Mientras el canal está abierto el sondeo solo actúa como respaldo lento.
+let eventsLive = false;
+let eventTimer = null;
+let eventFull = false;
+function refreshAll(full = false) {
+  fetchPending(full);
+  fetchCounts();
+}
+function listenEvents() {
+  if (!window.EventSource) return;
+  const source = new EventSource('/api/events');
+  source.onopen = () => { eventsLive = true; };
+  source.onerror = () => { eventsLive = false; };
+  ['response.created', 'response.moderated', 'responses.archived', 'responses.reset', 'resync'].forEach(type => {
+    const full = type !== 'response.created' && type !== 'response.moderated';
+    source.addEventListener(type, () => {
+      eventFull = eventFull || full;
+      if (eventTimer) clearTimeout(eventTimer);
+      eventTimer = setTimeout(() => {
+        refreshAll(eventFull);
+        eventFull = false;
+      }, 200);
+    });
+  });
+}
+
 (async function init(){
   await initFields();
   fetchCounts();
-  fetchPending();
-  setInterval(fetchCounts, 5000);
-  setInterval(fetchPending, 2000);
+  fetchPending(true);
+  listenEvents();
+  let ticks = 0;
+  setInterval(() => {
+    ticks += 1;
+    if (eventsLive) {
+      if (ticks % 15 === 0) refreshAll();
+      return;
+    }
+    // recarga completa de vez en cuando por si se perdió algún cambio
+    fetchPending(ticks % 150 === 0);
+    if (ticks % 3 === 0) fetchCounts();
+  }, 2000);
 })();
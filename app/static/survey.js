@@ -90,6 +90,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
   let cfg = null;
   let stepsByLang = {};
+  let bundleUrls = {};
   let currentLang = null;
   let locale = I18N.es;
   let activeSteps = [];
@@ -149,17 +150,6 @@ document.addEventListener('DOMContentLoaded', () => {
   ];
   const characterPalette = ['var(--accent)', '#ffd5e4', '#66d399', '#9b7df0', '#ffcf5c'];
 
-  function bucketAge(age) {
-    if (age == null || Number.isNaN(age)) return null;
-    if (age <= 17) return '10_17';
-    if (age <= 25) return '18_25';
-    if (age <= 35) return '26_35';
-    if (age <= 45) return '36_45';
-    if (age <= 55) return '46_55';
-    if (age <= 65) return '56_65';
-    return '66_plus';
-  }
-
   function normalizeGenderKey(value) {
     if (!value) return '';
     const v = `${value}`.trim().toLowerCase();
@@ -338,10 +328,10 @@ document.addEventListener('DOMContentLoaded', () => {
     });
   }
 
-  function startSurvey(lang) {
+  async function startSurvey(lang) {
     currentLang = lang;
     applyLocale(lang);
-    activeSteps = (stepsByLang[lang] || []).slice();
+    activeSteps = (await loadSteps(lang).catch(() => [])).slice();
     TOTAL_STEPS = activeSteps.length;
     if (!TOTAL_STEPS) {
       const unavailable = 'Idioma no disponible / Hizkuntza ez dago eskuragarri / Language not available';
@@ -682,14 +672,8 @@ document.addEventListener('DOMContentLoaded', () => {
       if (stepIndex === TOTAL_STEPS - 1) {
         btnNext.disabled = true;
         statusEl.textContent = locale.statusSending;
-        const rawAssoc = Array.isArray(answers.asociaciones_alava) ? answers.asociaciones_alava.slice() : null;
+        // el servidor normaliza el payload (valores de opción, etiquetas, saltos)
         fillOptionLabels();
-        if (rawAssoc) {
-          answers.asociaciones_alava_values = rawAssoc;
-        }
-        if (Array.isArray(answers.asociaciones_alava_labels) && answers.asociaciones_alava_labels.length) {
-          answers.asociaciones_alava = answers.asociaciones_alava_labels.slice();
-        }
         answers.__lang = currentLang;
         answers.__labels = { ...questionLabels };
         try {
@@ -738,56 +722,32 @@ document.addEventListener('DOMContentLoaded', () => {
     return res.json();
   }
 
-  function buildSummary(rows) {
-    const ageCounts = {};
-    const genderCounts = {};
-    const characterCounts = {};
-    const ratings = [];
-    (rows || []).forEach(row => {
-      const payload = row.payload || {};
-      const age = Number(payload.edad);
-      const ageBucket = bucketAge(age);
-      if (ageBucket) ageCounts[ageBucket] = (ageCounts[ageBucket] || 0) + 1;
-
-      const genderRaw = payload.genero_labels ?? payload.genero;
-      const gender = Array.isArray(genderRaw) ? genderRaw[0] : genderRaw;
-      if (gender) genderCounts[gender] = (genderCounts[gender] || 0) + 1;
-
-      const rating = Number(payload.valoracion_exposicion);
-      if (!Number.isNaN(rating)) ratings.push(rating);
-
-      const characterRaw = payload.personaje_importante_labels ?? payload.personaje_importante;
-      const character = Array.isArray(characterRaw) ? characterRaw[0] : characterRaw;
-      if (character) characterCounts[character] = (characterCounts[character] || 0) + 1;
-    });
-
-    const ageSegments = ageBuckets
-      .map(b => ({ label: b.label, value: ageCounts[b.key] || 0, color: b.color }))
-      .filter(seg => seg.value > 0);
-    const genderSegments = Object.entries(genderCounts)
-      .map(([label, value]) => ({
-        label: localizeGenderLabel(label),
-        value,
-        color: genderColors[normalizeGenderKey(label)] || 'var(--accent)'
-      }))
-      .sort((a, b) => b.value - a.value);
-    const characterSegments = Object.entries(characterCounts)
-      .sort((a, b) => b[1] - a[1])
+  // /api/stats/summary ya trae las distribuciones agregadas y etiquetadas
+  function buildSummary(stats) {
+    const ageColors = Object.fromEntries(ageBuckets.map(b => [b.key, b.color]));
+    const ageSegments = (stats.age || [])
+      .map(a => ({ label: a.label, value: a.count, color: ageColors[a.key] || 'var(--accent)' }));
+    const genderSegments = (stats.gender || [])
+      .map(g => ({
+        label: g.label || localizeGenderLabel(g.value),
+        value: g.count,
+        color: genderColors[normalizeGenderKey(g.value)] || 'var(--accent)'
+      }));
+    const characterSegments = (stats.character || [])
       .slice(0, 4)
-      .map(([label, value], idx) => ({
-        label: prettifyCharacterLabel(label),
-        value,
+      .map((c, idx) => ({
+        label: c.label || prettifyCharacterLabel(c.value),
+        value: c.count,
         color: characterPalette[idx % characterPalette.length]
       }));
-    const ratingCount = ratings.length;
-    const ratingAvg = ratingCount ? ratings.reduce((acc, v) => acc + v, 0) / ratingCount : 0;
+    const rating = stats.rating || {};
     return {
-      total: Array.isArray(rows) ? rows.length : 0,
+      total: stats.total || 0,
       ageSegments,
       genderSegments,
       characterSegments,
-      ratingAvg,
-      ratingCount
+      ratingAvg: rating.avg || 0,
+      ratingCount: rating.count || 0
     };
   }
 
@@ -914,10 +874,9 @@ document.addEventListener('DOMContentLoaded', () => {
     if (statsMeta) statsMeta.textContent = locale.statsMeta;
     miniStats.innerHTML = '';
     try {
-      const res = await fetch('/api/responses?status=approved', { cache: 'no-store' });
+      const res = await fetch(`/api/stats/summary?lang=${encodeURIComponent(currentLang || 'es')}`, { cache: 'no-cache' });
       if (!res.ok) throw new Error('Server error');
-      const rows = await res.json();
-      const summary = buildSummary(rows);
+      const summary = buildSummary(await res.json());
       renderMiniStats(summary);
     } catch (err) {
       console.error('miniStats error', err);
@@ -930,11 +889,26 @@ document.addEventListener('DOMContentLoaded', () => {
     renderLanguageSelector();
   });
 
+  // Bundles por idioma con hash en la URL: el navegador los guarda en caché
+  // y solo el manifiesto (pequeño) se revalida en cada carga.
+  async function loadSteps(lang) {
+    if (stepsByLang[lang]) return stepsByLang[lang];
+    const url = bundleUrls[lang];
+    if (!url) return [];
+    const res = await fetch(url);
+    if (!res.ok) return [];
+    const bundle = await res.json();
+    stepsByLang[lang] = bundle.steps || [];
+    return stepsByLang[lang];
+  }
+
   (async function init() {
-    const r = await fetch('/static/questions.json', { cache: 'no-store' });
+    const r = await fetch('/api/questionnaire', { cache: 'no-cache' });
     cfg = await r.json();
     surveyId = cfg.survey_id || 1;
-    stepsByLang = cfg.steps || {};
+    stepsByLang = {};
+    bundleUrls = Object.fromEntries((cfg.languages || []).map(l => [l.code, l.url]));
     renderLanguageSelector();
+    Object.keys(bundleUrls).forEach(lang => loadSteps(lang).catch(() => {}));
   })();
 });
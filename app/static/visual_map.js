@@ -7,14 +7,28 @@ const genderPalette = { man: '#4f9cff', woman: '#ff557d', nonbinary: '#f4f1d0',
 let backgroundHidden = false;
 let characterScoreTimer;
 let currentCharacterSnapshot = '';
+const pointsByCp = new Map();
+let pointsCursor = null;
+let pointsEtag = null;
+let lastCharacters = [];
 
 async function fetchPoints() {
   try {
-    const res = await fetch('/api/visual/points', { cache: 'no-store' });
+    // Pide solo los cambios desde el último cursor; 304 si no hay novedades.
+    const query = pointsCursor ? `?since=${encodeURIComponent(pointsCursor)}` : '';
+    const headers = pointsEtag ? { 'If-None-Match': pointsEtag } : {};
+    const res = await fetch(`/api/visual/points/summary${query}`, { cache: 'no-store', headers });
+    if (res.status === 304) return;
     if (!res.ok) throw new Error('Network');
     const data = await res.json();
-    renderPoints(data.points || []);
-    renderCharacters(data.characters || []);
+    pointsEtag = res.headers.get('ETag');
+    pointsCursor = data.cursor || null;
+    if (!data.delta) pointsByCp.clear();
+    (data.removed || []).forEach(cp => pointsByCp.delete(cp));
+    (data.points || []).forEach(p => pointsByCp.set(p.codigo_postal, p));
+    if (Array.isArray(data.characters)) lastCharacters = data.characters;
+    renderPoints(Array.from(pointsByCp.values()));
+    renderCharacters(lastCharacters);
   } catch (err) {
     console.error('Error cargando puntos', err);
     totalCountEl.textContent = 'No se pudieron cargar los datos.';
@@ -124,6 +138,10 @@ function buildCharacterCards(characters) {
     if (character.image) {
       const img = document.createElement('img');
       img.src = character.image;
+      if (character.srcset) {
+        img.srcset = character.srcset;
+        img.sizes = '160px';
+      }
       img.alt = character.label;
       img.loading = 'lazy';
       card.appendChild(img);
@@ -182,7 +200,7 @@ function cycleCharacterScores() {
 }
 
 function renderGenderNodes(marker, point, coreRadius) {
-  const genders = point.genders || [];
+  const genders = point.genders || Object.keys(point.gender_counts || {}).sort();
   if (!genders.length) return;
   const baseGap = 30;
   const step = (Math.PI * 2) / genders.length;
@@ -237,8 +255,32 @@ function getGenderCount(point, gender) {
   return (point.responses || []).filter(r => r.payload?.genero === gender).length;
 }
 
-fetchPoints();
-setInterval(fetchPoints, 15000);
+// Eventos SSE: refresco inmediato ante altas/moderaciones; el sondeo de
+// respaldo se espacia mientras el canal está abierto.
+let eventsLive = false;
+let lastFetchAt = 0;
+let eventTimer = null;
+function refreshPoints() {
+  lastFetchAt = Date.now();
+  fetchPoints();
+}
+if (window.EventSource) {
+  const source = new EventSource('/api/events');
+  source.onopen = () => { eventsLive = true; };
+  source.onerror = () => { eventsLive = false; };
+  ['response.created', 'response.moderated', 'responses.archived', 'responses.reset', 'resync'].forEach(type => {
+    source.addEventListener(type, () => {
+      if (eventTimer) clearTimeout(eventTimer);
+      eventTimer = setTimeout(refreshPoints, 250);
+    });
+  });
+}
+
+refreshPoints();
+setInterval(() => {
+  const gap = eventsLive ? 60000 : 15000;
+  if (Date.now() - lastFetchAt >= gap) refreshPoints();
+}, 5000);
 
 
 let animationFrame;
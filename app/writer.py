@@ -0,0 +1,141 @@
+import asyncio
+import os
+import time
+from typing import List, Optional
+
+from sqlmodel import SQLModel, Session
+
+from app import aggregates, events
+from app.concurrency import run_write
+from app.models import Response
+
+# Group commit opcional para ráfagas de envíos desde varios kioscos: las
+# respuestas se encolan y un escritor en segundo plano las guarda en una sola
+# transacción cada WRITE_BATCH_MAX_DELAY_MS o cada WRITE_BATCH_MAX_ROWS filas.
+WRITE_BATCH = os.getenv("WRITE_BATCH", "0") == "1"
+WRITE_BATCH_MAX_ROWS = int(os.getenv("WRITE_BATCH_MAX_ROWS", "50"))
+WRITE_BATCH_MAX_DELAY_MS = float(os.getenv("WRITE_BATCH_MAX_DELAY_MS", "10"))
+
+
+def persist(rows: List[Response]) -> List[Response]:
+    """Inserta las filas en una transacción y propaga a agregados y eventos."""
+    with Session(SQLModel.engine, expire_on_commit=False) as s:
+        s.add_all(rows)
+        s.flush()
+        for r in rows:
+            aggregates.log_change(s, "response.created", r)
+        s.commit()
+    aggregates.sync(SQLModel.engine, known={r.id: r for r in rows})
+    for r in rows:
+        events.publish("response.created", {
+            "id": r.id,
+            "status": r.status,
+            "codigo_postal": (r.payload_json or {}).get("codigo_postal"),
+        })
+    return rows
+
+
+class BatchWriter:
+    def __init__(self, max_rows: int = WRITE_BATCH_MAX_ROWS, max_delay_ms: float = WRITE_BATCH_MAX_DELAY_MS):
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.rows = 0
+        self.errors = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.last_commit_ms = 0.0
+        self.total_commit_ms = 0.0
+        self.total_wait_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, row: Response) -> Response:
+        """Encola la fila y espera a que su lote se confirme (devuelve la fila con id)."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.perf_counter() + self.max_delay
+            stopping = False
+            while len(batch) < self.max_rows:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch):
+        started = time.perf_counter()
+        try:
+            await run_write(persist, [row for row, _future, _queued in batch])
+        except Exception as exc:
+            self.errors += 1
+            for _row, future, _queued in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        finished = time.perf_counter()
+        self.batches += 1
+        self.rows += len(batch)
+        self.last_batch_size = len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+        self.last_commit_ms = (finished - started) * 1000
+        self.total_commit_ms += self.last_commit_ms
+        for row, future, queued in batch:
+            self.total_wait_ms += (finished - queued) * 1000
+            if not future.done():
+                future.set_result(row)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": WRITE_BATCH,
+            "running": self.running,
+            "max_rows": self.max_rows,
+            "max_delay_ms": self.max_delay * 1000,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "batches": self.batches,
+            "rows": self.rows,
+            "errors": self.errors,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "avg_batch_size": round(self.rows / self.batches, 2) if self.batches else 0,
+            "last_commit_ms": round(self.last_commit_ms, 3),
+            "avg_commit_ms": round(self.total_commit_ms / self.batches, 3) if self.batches else 0,
+            "avg_ack_ms": round(self.total_wait_ms / self.rows, 3) if self.rows else 0,
+        }
+
+
+writer = BatchWriter()
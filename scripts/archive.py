@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""Aplica la política de retención (app/archive.py) y compacta la base.
+
+Pensado para cron cuando hay varios workers (con ARCHIVE_INTERVAL_SECONDS=0
+en el servidor). Los workers en marcha se ponen al día por change_log.
+
+Uso:
+    python scripts/archive.py
+    python scripts/archive.py --survey-id 1 --status approved --status rejected
+    python scripts/archive.py --vacuum-full
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="URL de la base (por defecto DATABASE_URL)")
+    parser.add_argument("--survey-id", type=int, help="archiva todas las respuestas de esta encuesta")
+    parser.add_argument("--status", action="append", choices=("approved", "pending", "rejected"),
+                        help="con --survey-id, solo estos estados (repetible)")
+    parser.add_argument("--vacuum-full", action="store_true", help="VACUUM completo tras archivar")
+    args = parser.parse_args(argv)
+
+    from app import archive
+    from app.db import DATABASE_URL, build_engine, ensure_schema
+    from app.models import Response
+
+    engine = build_engine(args.db or DATABASE_URL)
+    ensure_schema(engine)
+    if args.survey_id is not None:
+        filters = [Response.survey_id == args.survey_id]
+        if args.status:
+            filters.append(Response.status.in_(args.status))
+        moved = archive.move(engine, filters, "survey", limit=None)
+        summary = {"archived": {"survey": moved}, "compact": archive.compact(engine, analyze=bool(moved), full=args.vacuum_full)}
+    else:
+        summary = archive.run(engine, full_vacuum=args.vacuum_full)
+    print(json.dumps(summary, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""Benchmark de los endpoints de sondeo con datos sintéticos.
+
+Para cada tamaño crea una base SQLite desechable, la llena con
+scripts/synth_data.py, siembra los agregados y mide latencias (p50/p95/p99),
+pico de memoria (tracemalloc) y tamaño de respuesta por endpoint. La app se
+arranca con su lifespan, y las latencias se separan en frías (tras un envío),
+calientes (buffers en caché) y revalidaciones 304.
+
+Uso:
+    python scripts/benchmark.py --sizes 1000,10000 --repeat 30 --output bench.json
+
+El JSON resultante se puede comparar entre versiones con `diff` o jq.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)  # app.main monta estáticos con rutas relativas
+
+ENDPOINTS = [
+    ("points_all", "/api/visual/points?status=all"),
+    ("points_summary", "/api/visual/points/summary?status=all"),
+    ("counts", "/api/admin/counts"),
+    ("pending", "/api/admin/pending"),
+    ("export_csv", "/api/admin/export.csv"),
+]
+AUTH = (os.getenv("ADMIN_USER", "admin"), os.getenv("ADMIN_PASS", "admin"))
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def _summary(timings):
+    return {
+        "p50": round(_percentile(timings, 50), 3),
+        "p95": round(_percentile(timings, 95), 3),
+        "p99": round(_percentile(timings, 99), 3),
+        "max": round(max(timings), 3),
+        "mean": round(statistics.fmean(timings), 3),
+    }
+
+
+def _timed_get(client, path, headers=None):
+    started = time.perf_counter()
+    res = client.get(path, auth=AUTH, headers=headers or {})
+    return (time.perf_counter() - started) * 1000, res
+
+
+def _measure(client, path, repeat, write):
+    """Tres medidas por endpoint:
+    - cold: primera petición tras una escritura (cachés y buffers invalidados)
+    - warm: peticiones repetidas sin escrituras (buffers ya codificados)
+    - not_modified: revalidación con If-None-Match, si el endpoint da ETag
+    """
+    cold = []
+    for _ in range(repeat):
+        write()
+        elapsed, res = _timed_get(client, path)
+        cold.append(elapsed)
+    write()
+    tracemalloc.start()
+    client.get(path, auth=AUTH)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    warm = []
+    for _ in range(repeat):
+        elapsed, res = _timed_get(client, path)
+        warm.append(elapsed)
+    result = {
+        "status": res.status_code,
+        "bytes": len(res.content),
+        "ms": {"cold": _summary(cold), "warm": _summary(warm)},
+        "peak_kb": round(peak / 1024, 1),
+    }
+    etag = res.headers.get("etag")
+    if etag:
+        revalidated = [_timed_get(client, path, {"If-None-Match": etag})[0] for _ in range(repeat)]
+        result["ms"]["not_modified"] = _summary(revalidated)
+    return result
+
+
+def run(sizes, repeat, seed, endpoints):
+    tmpdir = tempfile.mkdtemp(prefix="vital_bench_")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tmpdir}/boot.db")
+    from fastapi.testclient import TestClient
+    from sqlmodel import SQLModel
+
+    from app import aggregates
+    from app.db import build_async_engine, build_engine, ensure_schema
+    from app.main import app
+    from scripts.synth_data import SyntheticSurvey, populate
+
+    survey = SyntheticSurvey(seed=seed + 1)
+
+    def write():
+        # envío real por la API: pasa por el writer y la sincronización de agregados
+        client.post("/api/responses", json={"survey_id": survey.survey_id, "payload": survey.payload()})
+
+    results = {}
+    # con el contexto se ejecuta el lifespan, como en producción: writer,
+    # sincronización periódica, recursos y cuestionario compilado
+    with TestClient(app) as client:
+        for size in sizes:
+            url = f"sqlite:///{tmpdir}/bench_{size}.db"
+            engine = build_engine(url)
+            ensure_schema(engine)
+            started = time.perf_counter()
+            populate(engine, size, seed=seed)
+            populate_ms = (time.perf_counter() - started) * 1000
+            SQLModel.engine = engine
+            if SQLModel.async_engine is not None:
+                SQLModel.async_engine = build_async_engine(url)
+            started = time.perf_counter()
+            aggregates.seed(engine)
+            seed_ms = (time.perf_counter() - started) * 1000
+            entry = {"populate_ms": round(populate_ms, 1), "seed_ms": round(seed_ms, 1), "endpoints": {}}
+            for name, path in endpoints:
+                measured = entry["endpoints"][name] = _measure(client, path, repeat, write)
+                print(f"[{size}] {name}: cold p50={measured['ms']['cold']['p50']} ms "
+                      f"warm p50={measured['ms']['warm']['p50']} ms bytes={measured['bytes']}", file=sys.stderr)
+            results[str(size)] = entry
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000", help="tamaños separados por comas")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", default="", help="endpoints a medir (nombres separados por comas)")
+    parser.add_argument("--output", default="-", help="fichero JSON de salida ('-' = stdout)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    only = {s.strip() for s in args.only.split(",") if s.strip()}
+    endpoints = [(name, path) for name, path in ENDPOINTS if not only or name in only]
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": run(sizes, args.repeat, args.seed, endpoints),
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output == "-":
+        print(text)
+    else:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
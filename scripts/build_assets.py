@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+"""Genera los recursos de /assets y las copias precomprimidas de /static.
+
+El servidor hace lo mismo al arrancar (solo lo que falte); este script sirve
+para adelantarlo en el despliegue o tras cambiar retratos.
+
+Uso:
+    python scripts/build_assets.py
+"""
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app import assets  # noqa: E402
+from app.routers.visual import character_image_names  # noqa: E402
+
+
+def main():
+    summary = assets.build(character_image_names())
+    summary["build_dir"] = str(assets.BUILD_DIR)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""Genera respuestas sintéticas realistas a partir de app/static/questions.json.
+
+Uso:
+    python scripts/synth_data.py --count 10000 --db /tmp/encuesta_synth.db
+"""
+import argparse
+import csv
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.geometry import PROVINCE_CENTROIDS, ZIP_CSV  # noqa: E402
+from app.questionnaire import compiled  # noqa: E402
+
+QUESTIONS_PATH = ROOT / "app" / "static" / "questions.json"
+STATUS_WEIGHTS = {"approved": 0.7, "pending": 0.2, "rejected": 0.1}
+WORDS = (
+    "exposición interesante territorio historia personajes álava vitoria mapa museo "
+    "futuro voces aprender familia paisaje cultura innovación memoria gente"
+).split()
+
+
+def _load_postal_codes():
+    codes = []
+    if ZIP_CSV.exists():
+        with ZIP_CSV.open(newline="", encoding="utf-8") as fh:
+            for row in csv.DictReader(fh):
+                cp = (row.get("cod_postal") or "").strip()
+                if cp:
+                    codes.append(cp.zfill(5))
+    if not codes:
+        # sin el CSV: rango aproximado de CP alaveses
+        codes = [f"01{n:03d}" for n in range(1, 521, 7)]
+    return sorted(set(codes))
+
+
+def _text(rng: random.Random, min_words=3, max_words=25):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))).capitalize()
+
+
+class SyntheticSurvey:
+    """Recorre los pasos de un idioma como lo haría survey.js, incluido el
+    salto condicional de «¿Eres de Álava?». Los payloads salen normalizados
+    igual que en POST /api/responses."""
+
+    def __init__(self, seed: int = 42, external_ratio: float = 0.15, comment_ratio: float = 0.4):
+        self.rng = random.Random(seed)
+        config = json.loads(QUESTIONS_PATH.read_text(encoding="utf-8"))
+        self.survey_id = config.get("survey_id", 1)
+        self.steps_by_lang = config.get("steps") or {}
+        self.langs = list(self.steps_by_lang)
+        self.postal_codes = _load_postal_codes()
+        self.external_prefixes = [p for p in PROVINCE_CENTROIDS if p != "01"]
+        self.external_ratio = external_ratio
+        self.comment_ratio = comment_ratio
+        self.questionnaire = compiled()
+
+    def _postal(self):
+        if self.rng.random() < self.external_ratio:
+            return f"{self.rng.choice(self.external_prefixes)}{self.rng.randint(1, 999):03d}"
+        return self.rng.choice(self.postal_codes)
+
+    def _answer(self, field, answers):
+        rng = self.rng
+        field_id = field.get("id")
+        field_type = field.get("type")
+        options = field.get("options") or []
+        if field_id == "codigo_postal":
+            answers[field_id] = self._postal()
+        elif field_type == "number":
+            answers[field_id] = rng.randint(field.get("min", 1), field.get("max", 99))
+        elif field_type == "rating":
+            answers[field_id] = rng.randint(field.get("min", 1), field.get("max", 10))
+        elif field_type in ("select", "chips") and options:
+            if field.get("multi"):
+                picked = rng.sample(options, rng.randint(1, min(3, len(options))))
+                answers[field_id] = [o["value"] for o in picked]
+            else:
+                answers[field_id] = rng.choice(options)["value"]
+        elif field_type in ("text", "textarea"):
+            if field.get("required") or rng.random() < self.comment_ratio:
+                answers[field_id] = _text(rng)
+
+    def payload(self):
+        lang = self.rng.choice(self.langs)
+        steps = self.steps_by_lang[lang]
+        index_by_id = {step.get("id"): idx for idx, step in enumerate(steps)}
+        answers = {"__lang": lang}
+        idx = 0
+        while idx < len(steps):
+            step = steps[idx]
+            fields = step.get("fields", []) if step.get("type") == "form" else [step]
+            for field in fields:
+                self._answer(field, answers)
+            comment = step.get("comment_field")
+            if comment and self.rng.random() < self.comment_ratio:
+                answers[comment["id"]] = _text(self.rng)
+            jump = step.get("jump_if")
+            if jump and answers.get(step.get("id")) == jump.get("value") and jump.get("target") in index_by_id:
+                idx = index_by_id[jump["target"]]
+            else:
+                idx += 1
+        # mismos valores, etiquetas y __schema que un envío real
+        return self.questionnaire.normalize(answers, mode="lenient")
+
+    def status(self):
+        roll = self.rng.random()
+        acc = 0.0
+        for status, weight in STATUS_WEIGHTS.items():
+            acc += weight
+            if roll < acc:
+                return status
+        return "approved"
+
+
+def populate(engine, count: int, seed: int = 42, days: int = 7, batch_size: int = 2000):
+    """Inserta `count` respuestas repartidas en los últimos `days` días."""
+    from sqlmodel import Session
+
+    from app import rollups
+    from app.models import Response
+
+    survey = SyntheticSurvey(seed=seed)
+    start = datetime.utcnow() - timedelta(days=days)
+    step = timedelta(days=days) / max(count, 1)
+    with Session(engine) as s:
+        for offset in range(0, count, batch_size):
+            rows = []
+            for i in range(offset, min(offset + batch_size, count)):
+                rows.append(
+                    Response(
+                        survey_id=survey.survey_id,
+                        payload_json=survey.payload(),
+                        status=survey.status(),
+                        created_at=start + step * i,
+                    )
+                )
+            s.add_all(rows)
+            s.commit()
+    rollups.rebuild(engine)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--db", default="encuesta_synth.db", help="fichero SQLite de destino")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    from app.db import build_engine, ensure_schema
+
+    engine = build_engine(f"sqlite:///{args.db}")
+    ensure_schema(engine)
+    populate(engine, args.count, seed=args.seed, days=args.days)
+    print(f"{args.count} respuestas sintéticas en {args.db}")
+
+
+if __name__ == "__main__":
+    main()
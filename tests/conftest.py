@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+# la app crea el engine al importarse: base temporal y sin tareas periódicas
+_TMP = tempfile.mkdtemp(prefix="vital-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP}/encuesta.db"
+os.environ.setdefault("SYNC_INTERVAL_SECONDS", "0")
+os.environ.setdefault("ARCHIVE_PAUSE_SECONDS", "0")
+os.chdir(ROOT)  # los estáticos se montan con rutas relativas
+sys.path.insert(0, str(ROOT))
+
+AUTH = ("admin", "admin")
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def post(client):
+    def post(survey_id=1, **payload):
+        body = {"__lang": "es", "codigo_postal": "01001", "genero": "woman", "personaje_importante": "naipera"}
+        body.update(payload)
+        response = client.post("/api/responses", json={"survey_id": survey_id, "payload": body})
+        assert response.status_code == 200, response.text
+        return response.json()
+    return post
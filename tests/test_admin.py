@@ -0,0 +1,46 @@
+from sqlmodel import Session, SQLModel
+
+from app.models import Response
+from app.writer import persist
+from tests.conftest import AUTH
+
+
+def _counts(client):
+    res = client.get("/api/admin/counts", auth=AUTH)
+    assert res.status_code == 200
+    return res.json()
+
+
+def test_counts_follow_writes(client, post):
+    before = _counts(client)
+    response_id = post()["id"]
+    after_post = _counts(client)
+    assert after_post["pending"] == before["pending"] + 1
+    assert after_post["total"] == before["total"] + 1
+
+    client.patch(f"/api/admin/moderate/{response_id}?action=approve", auth=AUTH)
+    after_approve = _counts(client)
+    assert after_approve["pending"] == before["pending"]
+    assert after_approve["approved"] == before["approved"] + 1
+    assert after_approve["last_approved_at"] is not None
+    assert after_approve["total"] == sum(after_approve[key] for key in ("approved", "pending", "rejected"))
+
+
+def _breakdown(client, field):
+    items = client.get("/api/admin/breakdown", params={"field": field}, auth=AUTH).json()["items"]
+    return {item["value"]: item["count"] for item in items}
+
+
+def test_payload_columns_and_breakdown(client, post):
+    response_id = post(survey_id=93, codigo_postal="1005", edad="41", genero="man", __lang="eu")["id"]
+    (legacy,) = persist([Response(survey_id=93, payload_json={"edad": "1e30", "genero": ["woman"]}, status="pending")])
+    with Session(SQLModel.engine) as s:
+        row = s.get(Response, response_id)
+        assert (row.codigo_postal, row.edad, row.genero, row.lang) == ("01005", 41, "man", "eu")
+        old = s.get(Response, legacy.id)
+        assert (old.edad, old.genero) == (None, "woman")
+
+    before = _breakdown(client, "edad").get(41, 0)
+    client.patch(f"/api/admin/moderate/{response_id}?action=approve", auth=AUTH)
+    assert _breakdown(client, "edad").get(41, 0) == before + 1
+    assert client.get("/api/admin/breakdown", params={"field": "payload_json"}, auth=AUTH).status_code == 400
@@ -0,0 +1,88 @@
+from sqlmodel import Session, SQLModel, select
+from sqlalchemy import func
+
+from app import aggregates
+from app.models import ChangeLog, Response
+from app.routers.visual import points_store
+from tests.conftest import AUTH
+
+
+def _last_seq(s):
+    return s.exec(select(func.max(ChangeLog.seq))).one() or 0
+
+
+def test_late_commit_below_synced_seq_is_applied(client, post):
+    engine = SQLModel.engine
+    aggregates.sync(engine)
+    with Session(engine) as s:
+        base = _last_seq(s)
+        late_row = Response(survey_id=1, payload_json={"__lang": "es", "codigo_postal": "01001"})
+        s.add(late_row)
+        s.commit()
+        s.refresh(late_row)
+        late_id = late_row.id
+        # base+2 se confirma antes que base+1, como con dos transacciones en PostgreSQL
+        s.add(ChangeLog(seq=base + 2, kind="aggregates.noop", origin="test"))
+        s.commit()
+    aggregates.sync(engine)
+    assert aggregates.synced_seq() == base + 2
+    assert base + 1 in aggregates._gaps
+
+    with Session(engine) as s:
+        s.add(ChangeLog(seq=base + 1, kind="response.created", response_id=late_id, status="pending", origin="test"))
+        s.commit()
+    aggregates.sync(engine)
+
+    assert base + 1 not in aggregates._gaps
+    assert late_id in points_store._records
+    assert points_store.version == aggregates.synced_seq() == base + 2
+
+
+def test_purge_keeps_reset_epoch(client, post, monkeypatch):
+    engine = SQLModel.engine
+    client.delete("/api/admin/reset", auth=AUTH)
+    epoch = aggregates._stores[0].epoch
+    assert epoch != "0"
+
+    monkeypatch.setattr(aggregates, "CHANGE_LOG_KEEP", 0)
+    monkeypatch.setattr(aggregates, "_syncs", 99)
+    post()  # escritura + sync que dispara la purga
+    with Session(engine) as s:
+        assert s.exec(select(ChangeLog).where(ChangeLog.seq == int(epoch))).first() is not None
+
+    aggregates.seed(engine)
+    assert aggregates._stores[0].epoch == epoch
+
+
+def test_failing_build_does_not_jam_sync(client, post, monkeypatch):
+    from app.routers.stats import stats_store
+
+    bad_id = post()["id"]
+    assert bad_id in points_store._records
+    original = points_store.build
+
+    def build(row):
+        if row.id == bad_id:
+            raise RuntimeError("fila corrupta")
+        return original(row)
+
+    monkeypatch.setattr(points_store, "build", build)
+    # build() falla antes de tocar el agregado
+    with Session(SQLModel.engine) as s:
+        row = s.get(Response, bad_id)
+    version = points_store.version
+    try:
+        points_store.apply(row)
+    except RuntimeError:
+        pass
+    assert bad_id in points_store._records and points_store.version == version
+
+    # en sync la fila se descarta de ese agregado y el cursor avanza igual
+    assert client.patch(f"/api/admin/moderate/{bad_id}?action=approve", auth=AUTH).status_code == 200
+    assert bad_id not in points_store._records
+    assert bad_id in stats_store._records
+    assert points_store.version == aggregates.synced_seq()
+
+    next_id = post()["id"]
+    assert next_id in points_store._records
+    assert points_store.version == aggregates.synced_seq()
@@ -0,0 +1,66 @@
+from datetime import datetime
+
+from sqlmodel import Session, SQLModel, select
+
+from app import archive
+from app.models import Response, ResponseArchive
+from tests.conftest import AUTH
+
+
+def _timeline_total(client):
+    return sum(client.get("/api/visual/timeline?step=1h").json()["totals"])
+
+
+def test_archiving_keeps_timeline_totals(client, post):
+    ids = [post()["id"], post(genero="man")["id"]]
+    for response_id in ids:
+        client.patch(f"/api/admin/moderate/{response_id}?action=approve", auth=AUTH)
+    before = _timeline_total(client)
+    assert before >= 2
+
+    assert archive.move(SQLModel.engine, [Response.id.in_(ids)], "manual", limit=None) == 2
+
+    assert _timeline_total(client) == before
+    with Session(SQLModel.engine) as s:
+        assert s.exec(select(Response).where(Response.id.in_(ids))).all() == []
+        assert len(s.exec(select(ResponseArchive).where(ResponseArchive.id.in_(ids))).all()) == 2
+    rebuilt = client.post("/api/admin/rollups/rebuild", auth=AUTH)
+    assert rebuilt.status_code == 200
+    assert _timeline_total(client) == before
+
+
+def test_moderation_after_selection_is_not_archived(client, post):
+    response_id = post()["id"]
+    client.patch(f"/api/admin/moderate/{response_id}?action=reject", auth=AUTH)
+    filters = [Response.status == "rejected"]
+    # el lote se eligió como rechazada, pero se aprueba antes del borrado
+    client.patch(f"/api/admin/moderate/{response_id}?action=approve", auth=AUTH)
+
+    moved = archive._move_survey(SQLModel.engine, 1, [response_id], filters, "rejected", datetime.utcnow())
+
+    assert moved == 0
+    with Session(SQLModel.engine) as s:
+        row = s.get(Response, response_id)
+        assert row.status == "approved"
+        archived = select(ResponseArchive).where(
+            ResponseArchive.id == response_id, ResponseArchive.created_at == row.created_at
+        )
+        assert s.exec(archived).first() is None
+
+
+def test_move_without_seeded_aggregates_skips_sync(client, post, monkeypatch):
+    from app import aggregates
+
+    response_id = post()["id"]
+    calls = []
+    # como en scripts/archive.py: el proceso nunca sembró los agregados
+    monkeypatch.setattr(aggregates, "_seeded", False)
+    monkeypatch.setattr(aggregates, "sync", lambda *args, **kwargs: calls.append(args))
+
+    assert archive.move(SQLModel.engine, [Response.id == response_id], "manual", limit=None) == 1
+    assert calls == []
+
+
+def test_archive_now_validates_survey_id(client):
+    res = client.post("/api/admin/archive", json={"survey_id": "expo"}, auth=AUTH)
+    assert res.status_code == 400
@@ -0,0 +1,41 @@
+from app import assets
+from app.assets import IMMUTABLE, REVALIDATE
+from tests.conftest import AUTH
+
+
+def test_only_current_version_is_immutable(client):
+    url = assets.asset_url("static", "survey.js")
+    assert "?v=" in url
+    assert client.get(url).headers["cache-control"] == IMMUTABLE
+    assert client.get("/static/survey.js?v=0123abcd").headers["cache-control"] == REVALIDATE
+    assert client.get("/static/survey.js").headers["cache-control"] == REVALIDATE
+
+
+def test_accept_encoding_tokens(client):
+    def encoding(header):
+        res = client.get("/static/survey.js", headers={"Accept-Encoding": header})
+        assert res.status_code == 200
+        return res.headers.get("content-encoding")
+
+    assert encoding("gzip") == "gzip"
+    assert encoding("br;q=0, gzip;q=0.5") == "gzip"
+    assert encoding("gzip;q=0") is None
+    assert encoding("x-gzip-like") is None
+    assert encoding("identity") is None
+
+
+def test_character_cards_use_built_portraits(client, post):
+    response_id = post(personaje_importante="manuel_iradier")["id"]
+    client.patch(f"/api/admin/moderate/{response_id}?action=approve", auth=AUTH)
+    cards = client.get("/api/visual/points").json()["characters"]
+    card = next(card for card in cards if card["id"] == "manuel_iradier")
+    assert card["image"].startswith(assets.PORTRAIT_URL + "/")
+
+    image = client.get(card["image"])
+    assert image.status_code == 200
+    assert image.headers["cache-control"] == IMMUTABLE
+    if assets.Image is not None:
+        assert card["image"].endswith(f".{assets.PORTRAIT_DEFAULT_WIDTH}.jpg")
+        candidates = [item.rsplit(" ", 1) for item in card["srcset"].split(", ")]
+        assert [width for _url, width in candidates] == [f"{w}w" for w in assets.PORTRAIT_WIDTHS]
+        assert all(url.endswith(".webp") for url, _width in candidates)
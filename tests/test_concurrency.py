@@ -0,0 +1,47 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import func
+from sqlmodel import Session, SQLModel, select
+
+from app import concurrency
+from app.db import DATABASE_URL, build_async_engine
+from app.models import Response
+
+
+def test_busy_cpu_pool_does_not_block_writes(monkeypatch):
+    monkeypatch.setitem(concurrency._LIMITS, "cpu", 1)
+    release = threading.Event()
+
+    async def scenario():
+        busy = asyncio.create_task(concurrency.run_cpu(release.wait, 5))
+        await asyncio.sleep(0.05)
+        queued = asyncio.create_task(concurrency.run_cpu(lambda: "cpu"))
+        # el único hilo de CPU está ocupado, pero escrituras y lecturas tienen el suyo
+        assert await asyncio.wait_for(concurrency.run_write(lambda: "write"), 1) == "write"
+        assert await asyncio.wait_for(concurrency.run_read(lambda: "read"), 1) == "read"
+        assert not queued.done()
+        release.set()
+        assert await busy is True
+        assert await queued == "cpu"
+
+    asyncio.run(scenario())
+
+
+def test_fetch_all_with_async_engine(client, post, monkeypatch):
+    pytest.importorskip("aiosqlite")
+    post()
+    with Session(SQLModel.engine) as s:
+        expected = s.exec(select(func.count()).select_from(Response)).one()
+
+    async def scenario():
+        engine = build_async_engine(DATABASE_URL)
+        assert engine is not None
+        monkeypatch.setattr(SQLModel, "async_engine", engine, raising=False)
+        try:
+            return await concurrency.fetch_all(select(func.count()).select_from(Response))
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(scenario()) == [expected]
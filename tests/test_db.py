@@ -0,0 +1,29 @@
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from app.db import build_engine
+
+
+def _pragma(engine, name):
+    with engine.connect() as conn:
+        return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_tuned_profile_enables_wal_and_pool(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path}/tuned.db", profile="tuned")
+    try:
+        assert isinstance(engine.pool, QueuePool)
+        assert _pragma(engine, "journal_mode") == "wal"
+        assert _pragma(engine, "synchronous") == 1  # NORMAL
+        assert _pragma(engine, "busy_timeout") > 0
+        assert _pragma(engine, "temp_store") == 2  # MEMORY
+    finally:
+        engine.dispose()
+
+
+def test_basic_profile_keeps_defaults(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path}/basic.db", profile="basic")
+    try:
+        assert _pragma(engine, "journal_mode") == "delete"
+    finally:
+        engine.dispose()
@@ -0,0 +1,42 @@
+import asyncio
+
+from app import events
+from app.models import Response
+from app.writer import persist
+
+
+def test_bus_delivers_across_threads_and_resyncs_on_overflow():
+    async def scenario():
+        bus = events.EventBus(maxsize=2)
+        sub = bus.subscribe()
+        # las rutas sync publican desde el threadpool
+        await asyncio.to_thread(bus.publish, "response.created", {"id": 1})
+        first = await sub.next(1)
+        assert first["type"] == "response.created" and first["data"] == {"id": 1}
+
+        for i in range(5):
+            bus.publish("response.created", {"id": i})
+        await asyncio.sleep(0)
+        assert (await sub.next(1))["type"] == "resync"
+        assert await sub.next(0.01) is None
+
+        bus.unsubscribe(sub)
+        assert bus.subscriber_count == 0
+
+    asyncio.run(scenario())
+
+
+def test_created_event_has_no_comments(client):
+    async def scenario():
+        sub = events.bus.subscribe()
+        try:
+            payload = {"__lang": "es", "codigo_postal": "01001", "comentario_exposicion": "privado"}
+            (row,) = await asyncio.to_thread(persist, [Response(survey_id=1, payload_json=payload, status="pending")])
+            event = await sub.next(1)
+        finally:
+            events.bus.unsubscribe(sub)
+        assert event["type"] == "response.created"
+        assert event["data"] == {"id": row.id, "status": "pending", "codigo_postal": "01001"}
+        assert "privado" not in events.format_sse(event)
+
+    asyncio.run(scenario())
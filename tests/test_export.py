@@ -0,0 +1,56 @@
+import io
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlmodel import Session, SQLModel
+
+from app.models import Response
+from app.writer import persist
+from tests.conftest import AUTH
+
+
+def test_export_date_filters_accept_offsets(client, post):
+    response_id = post()["id"]
+    with Session(SQLModel.engine) as s:
+        created_at = s.get(Response, response_id).created_at  # UTC sin zona
+    # mismo instante expresado en +02:00: [created_at, created_at] debe incluir la fila
+    local = created_at.replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=2)))
+    params = {"status": "all", "date_from": local.isoformat(), "date_to": (local + timedelta(seconds=1)).isoformat()}
+    lines = client.get("/api/admin/export.csv", params=params, auth=AUTH).text.splitlines()
+    assert any(line.startswith(f"{response_id},") for line in lines[1:])
+
+    # una hora antes en UTC, pero escrito en +02:00, queda fuera
+    earlier = (created_at - timedelta(hours=1)).replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=2)))
+    params = {"status": "all", "date_to": earlier.isoformat()}
+    lines = client.get("/api/admin/export.csv", params=params, auth=AUTH).text.splitlines()
+    assert not any(line.startswith(f"{response_id},") for line in lines[1:])
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_columnar_export_reads_back(client, fmt):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    survey_id = 77 if fmt == "parquet" else 78
+    payload = {"__lang": "es", "codigo_postal": "01001", "edad": "1e400", "valoracion_exposicion": 10 ** 20, "id": "x"}
+    ok = {"__lang": "eu", "codigo_postal": "01002", "edad": "34"}
+    rows = persist([
+        Response(survey_id=survey_id, payload_json=payload, status="pending"),
+        Response(survey_id=survey_id, payload_json=ok, status="pending"),
+    ])
+
+    res = client.get(f"/api/admin/export.{fmt}", params={"status": "all", "survey_id": survey_id}, auth=AUTH)
+    assert res.status_code == 200, res.text
+    if fmt == "parquet":
+        table = pa.parquet.read_table(io.BytesIO(res.content))
+    else:
+        table = pa.ipc.open_file(pa.BufferReader(res.content)).read_all()
+
+    assert len(set(table.column_names)) == len(table.column_names)
+    data = table.to_pydict()
+    assert data["id"] == [r.id for r in rows]
+    assert data["payload_id"] == ["x", None]
+    assert data["edad"] == [None, 34]
+    assert data["valoracion_exposicion"] == [None, None]
+    assert data["__lang"] == ["es", "eu"]
@@ -0,0 +1,23 @@
+import json
+
+from app import fastjson
+from app.models import Response
+from app.writer import persist
+
+BIG = 123456789012345678901234567890
+
+
+def test_dumps_falls_back_for_wide_ints_and_int_keys():
+    assert json.loads(fastjson.dumps({"n": BIG, 1: "uno"})) == {"n": BIG, "1": "uno"}
+
+
+def test_points_survive_unnormalized_big_int(client):
+    payload = {"__lang": "es", "codigo_postal": "01001", "personaje_importante": "naipera", "extra": BIG}
+    (row,) = persist([Response(survey_id=1, payload_json=payload, status="pending")])
+
+    points = client.get("/api/visual/points?status=all")
+    assert points.status_code == 200
+    entries = [entry for point in points.json()["points"] for entry in point["responses"]]
+    assert BIG in [entry["payload"].get("extra") for entry in entries if entry["id"] == row.id]
+    detail = client.get("/api/visual/points/01001/responses?status=all")
+    assert detail.status_code == 200
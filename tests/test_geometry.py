@@ -0,0 +1,36 @@
+import os
+
+from app import geometry
+from tests.conftest import AUTH
+
+CSV_HEADER = "cod_postal,denominacion_cp,x_px,y_px\n"
+
+
+def test_index_centroids_and_binary_cache(tmp_path):
+    csv_path, cache_path = tmp_path / "zip.csv", tmp_path / "zip.idx"
+    csv_path.write_text(CSV_HEADER + "01001,Vitoria,100,200\n01001,Vitoria,300,400\n1002,Vitoria,10,20\n")
+
+    index = geometry.build_index(csv_path, cache_path)
+    assert index.origin == "csv" and cache_path.exists()
+    assert index.position("01001")["x"] == 200 and index.position("01001")["y"] == 300
+    assert index.position("01002")["label"] == "Vitoria"
+    outside = index.position("28001")
+    assert outside["external"] and outside["label"] == "CP 28001"
+    assert index.position("99999") is None
+
+    assert geometry.build_index(csv_path, cache_path).origin == "cache"
+    csv_path.write_text(CSV_HEADER + "01003,Vitoria,1,2\n")
+    os.utime(csv_path, ns=(1, 1))
+    rebuilt = geometry.build_index(csv_path, cache_path)
+    assert rebuilt.origin == "csv" and set(rebuilt.postal) == {"01003"}
+
+
+def test_reload_endpoint_reseeds_aggregates(client, post):
+    post(codigo_postal="28004")
+    cursor = client.get("/api/visual/points?status=all").json()["cursor"]
+    res = client.post("/api/admin/geometry/reload?force=true", auth=AUTH)
+    assert res.status_code == 200
+    assert res.json()["ok"] and res.json()["provinces"] == len(geometry.PROVINCE_CENTROIDS)
+    after = client.get("/api/visual/points?status=all").json()
+    assert after["cursor"] != cursor
+    assert any(point["codigo_postal"] == "28004" for point in after["points"])
@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy import create_engine, event, text
+
+from app import metrics
+
+
+def test_failed_query_does_not_skew_timings():
+    engine = create_engine("sqlite://")
+    event.listen(engine, "before_cursor_execute", metrics._before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", metrics._after_cursor_execute)
+    stats = metrics.RequestStats("/test")
+    token = metrics._current.set(stats)
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(Exception):
+                conn.execute(text("SELECT * FROM no_existe"))
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+            assert "vital_query_start" not in conn.info
+    finally:
+        metrics._current.reset(token)
+    assert stats.queries == 2
+    assert 0 <= stats.query_seconds < 1
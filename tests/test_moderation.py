@@ -0,0 +1,31 @@
+from tests.conftest import AUTH
+
+
+def test_bulk_moderation_by_ids_and_filter(client, post):
+    first, second, third = (post(survey_id=90)["id"] for _ in range(3))
+
+    res = client.post("/api/admin/moderate", json={"action": "approve", "ids": [first, second, second]}, auth=AUTH)
+    assert res.status_code == 200
+    body = res.json()
+    assert body["ids"] == [first, second] and body["updated"] == 2
+    assert body["counts"] == client.get("/api/admin/counts", auth=AUTH).json()
+
+    # ya aprobadas: no se cuentan otra vez
+    again = client.post("/api/admin/moderate", json={"action": "approve", "ids": [first]}, auth=AUTH).json()
+    assert again["updated"] == 0
+
+    flt = {"status": "pending", "survey_id": 90}
+    res = client.post("/api/admin/moderate", json={"action": "reject", "filter": flt}, auth=AUTH)
+    assert res.json()["ids"] == [third]
+    assert res.json()["counts"]["rejected"] == body["counts"]["rejected"] + 1
+
+
+def test_bulk_moderation_rejects_bad_input(client):
+    for body in (
+        {"action": "approve", "filter": {"survey_id": "uno"}},
+        {"action": "approve", "filter": {"older_than": "ayer"}},
+        {"action": "approve", "ids": ["x"]},
+        {"action": "approve"},
+        {"action": "borrar", "ids": [1]},
+    ):
+        assert client.post("/api/admin/moderate", json=body, auth=AUTH).status_code == 400, body
@@ -0,0 +1,38 @@
+import pytest
+
+from app.questionnaire import PayloadError, compiled
+
+# payload tal y como lo enviaba survey.js antes del bundle compilado:
+# etiquetas en lugar de valores, edad como texto y campos que ya no existen
+LEGACY_PAYLOAD = {
+    "__lang": "es",
+    "codigo_postal": "1002",
+    "edad": "34",
+    "genero": "Mujer",
+    "asociaciones_alava": ["Innovación"],
+    "asociaciones_alava_values": ["innovacion"],
+    "campo_retirado": "x",
+}
+
+
+def test_legacy_payload_is_accepted(client):
+    response = client.post("/api/responses", json={"survey_id": 1, "payload": LEGACY_PAYLOAD})
+    assert response.status_code == 200
+    payload = response.json()["payload"]
+    assert payload["codigo_postal"] == "01002"
+    assert payload["edad"] == 34
+    assert payload["genero"] == "woman"
+    assert payload["asociaciones_alava"] == ["innovacion"]
+    assert "campo_retirado" not in payload and "asociaciones_alava_values" not in payload
+    assert payload["__schema"] == compiled().version
+
+
+def test_lenient_drops_invalid_values():
+    payload = compiled().normalize({"__lang": "es", "edad": 200, "genero": "desconocido"}, mode="lenient")
+    assert "edad" not in payload and "genero" not in payload
+
+
+def test_strict_is_opt_in():
+    with pytest.raises(PayloadError) as exc:
+        compiled().normalize(LEGACY_PAYLOAD, mode="strict")
+    assert any(error.endswith("obligatorio") for error in exc.value.errors)
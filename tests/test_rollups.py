@@ -0,0 +1,41 @@
+from sqlmodel import Session, SQLModel, select
+
+from app.models import ResponseRollup
+from tests.conftest import AUTH
+
+
+def _rollup_count(postal):
+    with Session(SQLModel.engine) as s:
+        rows = s.exec(select(ResponseRollup).where(ResponseRollup.codigo_postal == postal)).all()
+    return len(rows), sum(row.count for row in rows)
+
+
+def _timeline_count(client, postal, **params):
+    body = client.get("/api/visual/timeline", params={"by": "codigo_postal", **params}).json()
+    if postal not in body["keys"]["codigo_postal"]:
+        return 0
+    index = body["keys"]["codigo_postal"].index(postal)
+    counts = [row[2] for row in body["rows"] if row[1] == index]
+    return counts[-1] if params.get("mode") == "cumulative" else sum(counts)
+
+
+def test_rollups_upsert_and_feed_the_timeline(client, post):
+    ids = [post(codigo_postal="28005", genero="man", personaje_importante="naipera")["id"] for _ in range(3)]
+    for response_id in ids:
+        client.patch(f"/api/admin/moderate/{response_id}?action=approve", auth=AUTH)
+    rows, total = _rollup_count("28005")
+    assert total == 3 and rows <= 2  # una fila por tramo de 5 min, no por respuesta
+
+    client.patch(f"/api/admin/moderate/{ids[0]}?action=reject", auth=AUTH)
+    assert _rollup_count("28005")[1] == 2
+    assert _timeline_count(client, "28005") == 2
+    assert _timeline_count(client, "28005", step="1h", mode="cumulative") == 2
+
+    assert client.post("/api/admin/rollups/rebuild", auth=AUTH).status_code == 200
+    assert _rollup_count("28005")[1] == 2
+    assert _timeline_count(client, "28005", step="1d") == 2
+
+
+def test_timeline_validates_parameters(client):
+    for params in ({"step": "7m"}, {"step": "60"}, {"mode": "sum"}, {"by": "edad"}, {"from": "ayer"}):
+        assert client.get("/api/visual/timeline", params=params).status_code == 400, params
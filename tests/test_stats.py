@@ -0,0 +1,20 @@
+from app.models import Response
+from app.writer import persist
+from tests.conftest import AUTH
+
+
+def test_summary_ignores_overflowing_numbers(client):
+    # fila antigua (o con PAYLOAD_VALIDATION=off): el payload no se normalizó
+    payload = {"__lang": "es", "codigo_postal": "01001", "edad": "1e400", "valoracion_exposicion": "1e400"}
+    (row,) = persist([Response(survey_id=1, payload_json=payload, status="pending")])
+    before = client.get("/api/stats/summary").json()
+
+    approved = client.patch(f"/api/admin/moderate/{row.id}?action=approve", auth=AUTH)
+    assert approved.status_code == 200
+
+    summary = client.get("/api/stats/summary")
+    assert summary.status_code == 200
+    body = summary.json()
+    assert body["total"] == before["total"] + 1
+    assert body["rating"]["count"] == before["rating"]["count"]
+    assert sum(item["count"] for item in body["age"]) == sum(item["count"] for item in before["age"])
@@ -0,0 +1,107 @@
+from tests.conftest import AUTH
+
+
+def _points(client, status="approved", **params):
+    res = client.get("/api/visual/points", params={"status": status, **params})
+    assert res.status_code == 200
+    return res
+
+
+def _point(body, postal):
+    return next((point for point in body["points"] if point["codigo_postal"] == postal), None)
+
+
+def test_points_follow_creation_and_moderation(client, post):
+    response_id = post(codigo_postal="28001", genero="man", comentario_exposicion="Muy interesante")["id"]
+    assert _point(_points(client).json(), "28001") is None
+
+    pending = _point(_points(client, "all").json(), "28001")
+    assert pending["count"] == 1 and pending["gender_counts"] == {"man": 1}
+    # los comentarios de las pendientes no se publican
+    assert "comentario_exposicion" not in pending["responses"][0]["payload"]
+
+    client.patch(f"/api/admin/moderate/{response_id}?action=approve", auth=AUTH)
+    approved = _point(_points(client).json(), "28001")
+    assert [entry["id"] for entry in approved["responses"]] == [response_id]
+    assert approved["responses"][0]["payload"]["comentario_exposicion"] == "Muy interesante"
+
+    client.patch(f"/api/admin/moderate/{response_id}?action=reject", auth=AUTH)
+    assert _point(_points(client).json(), "28001") is None
+    assert _point(_points(client, "all").json(), "28001") is None
+
+
+def test_points_etag_and_since_delta(client, post):
+    first = _points(client)
+    etag, cursor = first.headers["etag"], first.json()["cursor"]
+    assert client.get("/api/visual/points", headers={"If-None-Match": etag}).status_code == 304
+
+    response_id = post(codigo_postal="28002")["id"]
+    client.patch(f"/api/admin/moderate/{response_id}?action=approve", auth=AUTH)
+    assert client.get("/api/visual/points", headers={"If-None-Match": etag}).status_code == 200
+    delta = _points(client, since=cursor).json()
+    assert delta["delta"] is True
+    assert [point["codigo_postal"] for point in delta["points"]] == ["28002"]
+    assert delta["removed"] == []
+
+    client.patch(f"/api/admin/moderate/{response_id}?action=reject", auth=AUTH)
+    delta = _points(client, since=delta["cursor"]).json()
+    assert delta["points"] == [] and delta["removed"] == ["28002"]
+
+    # tras un reset los cursores anteriores caducan: estado completo
+    stale = delta["cursor"]
+    client.delete("/api/admin/reset", auth=AUTH)
+    full = _points(client, since=stale).json()
+    assert full["delta"] is False and full["points"] == []
+    assert full["cursor"].split(".")[0] != stale.split(".")[0]
+
+
+def test_summary_detail_and_comment_sampler(client, post):
+    ids = []
+    for text in ("uno", "dos", "tres"):
+        response_id = post(codigo_postal="28003", comentario_exposicion=f"comentario {text}")["id"]
+        client.patch(f"/api/admin/moderate/{response_id}?action=approve", auth=AUTH)
+        ids.append(response_id)
+    hidden = post(codigo_postal="28003", comentario_exposicion="sin moderar")["id"]
+
+    summary = client.get("/api/visual/points/summary").json()
+    point = _point(summary, "28003")
+    assert point["count"] == 3 and "responses" not in point
+
+    page = client.get("/api/visual/points/28003/responses", params={"limit": 2}).json()
+    assert page["total"] == 3
+    assert [entry["id"] for entry in page["responses"]] == ids[:0:-1]
+    rest = client.get("/api/visual/points/28003/responses", params={"offset": 2, "limit": 2}).json()
+    assert [entry["id"] for entry in rest["responses"]] == ids[:1]
+
+    items = client.get("/api/visual/comments", params={"status": "all", "n": 100}).json()["items"]
+    sampled = {item["id"]: item for item in items}
+    assert set(ids) <= set(sampled) and hidden not in sampled
+    assert sampled[ids[0]]["messages"][0]["text"] == "comentario uno"
+    assert sampled[ids[0]]["codigo_postal"] == "28003"
+
+
+def _words(client, **params):
+    body = client.get("/api/visual/words", params={"top": 100, **params}).json()
+    return {word["value"]: word for word in body["words"]}
+
+
+def _count(words, value):
+    return words[value]["count"] if value in words else 0
+
+
+def test_words_index_follows_moderation(client, post):
+    before_eu, before_all = _words(client, lang="eu"), _words(client)
+    response_id = post(__lang="eu", asociaciones_alava=["tecnologia", "talento"])["id"]
+    assert _count(_words(client, lang="eu"), "tecnologia") == _count(before_eu, "tecnologia")
+
+    client.patch(f"/api/admin/moderate/{response_id}?action=approve", auth=AUTH)
+    after_eu, after_all = _words(client, lang="eu"), _words(client)
+    assert _count(after_eu, "tecnologia") == _count(before_eu, "tecnologia") + 1
+    assert _count(after_all, "talento") == _count(before_all, "talento") + 1
+    assert after_eu["tecnologia"]["labels"]["eu"] == "Teknologia"
+
+    res = client.get("/api/visual/words", params={"lang": "eu"})
+    assert client.get("/api/visual/words", params={"lang": "eu"}, headers={"If-None-Match": res.headers["etag"]}).status_code == 304
+
+    client.patch(f"/api/admin/moderate/{response_id}?action=reject", auth=AUTH)
+    assert _count(_words(client, lang="eu"), "tecnologia") == _count(before_eu, "tecnologia")
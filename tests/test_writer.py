@@ -0,0 +1,49 @@
+import asyncio
+
+from sqlmodel import Session, SQLModel, select
+
+from app import writer as writer_module
+from app.models import Response
+from app.writer import BatchWriter
+
+
+def _row(**payload):
+    return Response(survey_id=1, payload_json={"__lang": "es", "codigo_postal": "01001", **payload}, status="pending")
+
+
+def test_batch_writer_groups_commits(client):
+    async def scenario():
+        batch_writer = BatchWriter(max_rows=3, max_delay_ms=500)
+        batch_writer.start()
+        try:
+            return await asyncio.gather(*(batch_writer.submit(_row()) for _ in range(5))), batch_writer.stats()
+        finally:
+            await batch_writer.stop()
+
+    rows, stats = asyncio.run(scenario())
+    ids = [row.id for row in rows]
+    assert all(ids) and len(set(ids)) == 5
+    assert stats["rows"] == 5 and stats["batches"] == 2
+    assert stats["max_batch_size"] == 3 and stats["last_batch_size"] == 2
+    with Session(SQLModel.engine) as s:
+        assert len(s.exec(select(Response).where(Response.id.in_(ids))).all()) == 5
+
+
+def test_batch_writer_fails_the_whole_batch(client, monkeypatch):
+    def broken(rows):
+        raise RuntimeError("disco lleno")
+
+    monkeypatch.setattr(writer_module, "persist", broken)
+
+    async def scenario():
+        batch_writer = BatchWriter(max_rows=2, max_delay_ms=500)
+        batch_writer.start()
+        try:
+            results = await asyncio.gather(*(batch_writer.submit(_row()) for _ in range(2)), return_exceptions=True)
+        finally:
+            await batch_writer.stop()
+        return results, batch_writer.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert stats["errors"] == 1 and stats["rows"] == 0